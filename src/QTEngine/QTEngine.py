@@ -17,8 +17,17 @@ from src.QTEngine.src.text_processing import (
 )
 from src.QTEngine.src.performance import profile_function
 from src.QTEngine.src.data_loader import load_data, DataLoader
+from src.QTEngine.src.dictionary_registry import DictionaryRegistry
 from src.QTEngine.src.translation_engine import TranslationEngine
 
+# Engine attribute holding each registry dictionary
+DICTIONARY_ATTRIBUTES = {
+    'Names2': 'names2',
+    'Names': 'names',
+    'VietPhrase': 'viet_phrase',
+    'ChinesePhienAm': 'chinese_phien_am'
+}
+
 class QTEngine(TranslationEngine):
     """
     A translation engine for converting Chinese text to Sino-Vietnamese.
@@ -69,6 +78,9 @@ class QTEngine(TranslationEngine):
             self.logger.info("Loading dictionary data from singleton DataLoader")
             self.names2, self.names, self.viet_phrase, self.chinese_phien_am, self.loading_info = self.data_loader.loaded_data or self.data_loader.load_data()
         
+        # Follow reloads, wherever they are triggered from
+        DictionaryRegistry().subscribe(self._on_dictionary_published)
+        
         # Mark as initialized
         QTEngine._initialized = True
         
@@ -115,19 +127,32 @@ class QTEngine(TranslationEngine):
         Returns:
             Tuple[str, TranslationMapping]: Translated text and mapping info
         """
-        # Convert Traditional to Simplified if necessary
-        simplified_text = self.chinese_converter.auto_convert_to_simplified(text)
-        if simplified_text is None:
-            simplified_text = text
+        return self._translate_simplified(text)
+    
+    def _translate_simplified(self, text: str) -> Tuple[str, TranslationMapping]:
+        """
+        Convert text to Simplified Chinese and translate it.
+        
+        When the conversion changed the text, the mapping keeps the text and
+        the offsets back to it, so its blocks can be located in what is shown.
+        
+        Args:
+            text (str): Text to translate
             
-        # Process and return translation with mapping
-        return process_paragraph(
+        Returns:
+            Tuple[str, TranslationMapping]: Translated text and mapping info
+        """
+        simplified_text, offsets = self.chinese_converter.convert_with_offsets(text)
+        translated_text, mapping = process_paragraph(
             simplified_text,
             self.names2,
             self.names,
             self.viet_phrase,
             self.chinese_phien_am
         )
+        if simplified_text != text:
+            mapping.set_source(text, offsets)
+        return translated_text, mapping
     
     def translate_with_mapping(self, text: str, force_refresh: bool = False) -> Tuple[str, TranslationMapping]:
         """
@@ -148,19 +173,8 @@ class QTEngine(TranslationEngine):
                 # Ensure data is reloaded before translation
                 self.refresh_data(force_reload=True)
                 
-                # Convert Traditional to Simplified if necessary
-                simplified_text = self.chinese_converter.auto_convert_to_simplified(text)
-                if simplified_text is None:
-                    simplified_text = text
-                
                 # Get fresh translation directly without caching
-                return process_paragraph(
-                    simplified_text,
-                    self.names2,
-                    self.names,
-                    self.viet_phrase,
-                    self.chinese_phien_am
-                )
+                return self._translate_simplified(text)
             
             # Use cached translation if not forcing refresh
             return self._translate_with_mapping_cached(text)
@@ -168,6 +182,26 @@ class QTEngine(TranslationEngine):
             self.logger.error(f"Translation with mapping failed: {e}")
             raise
     
+    def detect_source_script(self, sample: str) -> bool:
+        """
+        Detect once whether the current book is in Traditional Chinese.
+        
+        Simplified books then skip OpenCC for every paragraph without a
+        Traditional character. Cached translations are dropped when the
+        script changes, as they were converted for the previous book.
+        
+        Args:
+            sample (str): Text from the start of the book
+        
+        Returns:
+            bool: Whether the book is in Traditional Chinese
+        """
+        previous = self.chinese_converter.source_is_traditional
+        is_traditional = self.chinese_converter.detect_source_script(sample)
+        if previous is not None and previous != is_traditional:
+            self._translate_with_mapping_cached.cache_clear()
+        return is_traditional
+    
     def validate_translation(self, original: str, translated: str) -> bool:
         """
         Validate the quality of translation.
@@ -207,22 +241,9 @@ class QTEngine(TranslationEngine):
                 self._translate_with_mapping_cached.cache_clear()
             
             if specific_file:
-                # Only reload the specific dictionary and maintain others
-                filepath = os.path.join(self.data_loader.data_dir, specific_file)
-                if not os.path.exists(filepath):
-                    return
-                
-                # Load with optimized method based on file type
-                if specific_file == 'Names2.txt':
-                    self.names2 = self._reload_trie(filepath)
-                elif specific_file == 'Names.txt':
-                    self.names = self._reload_trie(filepath)
-                elif specific_file == 'VietPhrase.txt':
-                    self.viet_phrase = self._reload_trie(filepath)
-                elif specific_file == 'ChinesePhienAmWords.txt':
-                    data = self.data_loader.load_dictionary(filepath)
-                    self.chinese_phien_am.update(data)
-                
+                # Reloads the file only if it changed since it was loaded, the
+                # new dictionary reaches this engine through the registry
+                self.data_loader.load_data(specific_file=specific_file)
                 self.logger.info(f"Translation data refreshed successfully for {specific_file}")
             else:
                 # Full reload with optimized loading
@@ -242,18 +263,20 @@ class QTEngine(TranslationEngine):
             self.logger.error(f"Data refresh failed: {e}")
             raise
                 
-    def _reload_trie(self, filepath: str) -> Trie:
-        """Helper method to efficiently reload a Trie structure."""
-        try:
-            trie = Trie()
-            data = self.data_loader.load_dictionary(filepath)
-            # Use batch insert for better performance
-            words = [(key, value) for key, value in data.items()]
-            trie.batch_insert(words)
-            return trie
-        except Exception as e:
-            self.logger.error(f"Failed to reload trie from {filepath}: {e}")
-            raise
+    def _on_dictionary_published(self, name: str, dictionary: Any):
+        """
+        Use a new version of a dictionary published in the registry.
+        
+        Args:
+            name (str): Dictionary name
+            dictionary (Any): New version of the dictionary
+        """
+        attribute = DICTIONARY_ATTRIBUTES.get(name)
+        if attribute is None or getattr(self, attribute, None) is dictionary:
+            return
+        setattr(self, attribute, dictionary)
+        self._translate_with_mapping_cached.cache_clear()
+        self.logger.info(f"Using new version of {name}")
     
     def get_translation_metadata(self) -> Dict[str, Any]:
         """
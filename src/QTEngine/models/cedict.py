@@ -0,0 +1,49 @@
+import sys
+from typing import Optional
+
+class CedictEntry:
+    """
+    One CC-CEDICT entry.
+
+    The same record is stored under its traditional and simplified
+    headwords. Pinyin strings are interned, as many entries share them.
+    """
+    __slots__ = ['traditional', 'simplified', 'pinyin', 'definition']
+
+    def __init__(self, traditional: str, simplified: str, pinyin: str, definition: str):
+        self.traditional = traditional
+        self.simplified = simplified
+        self.pinyin = pinyin
+        self.definition = definition
+
+    def __str__(self) -> str:
+        """Format the entry as a CC-CEDICT line."""
+        return f"{self.traditional} {self.simplified} [{self.pinyin}] {self.definition}"
+
+    def __repr__(self) -> str:
+        return f"CedictEntry({str(self)!r})"
+
+def parse_cedict_line(line: str) -> Optional[CedictEntry]:
+    """
+    Parse a line of the CC-CEDICT file.
+
+    Args:
+        line (str): Line in the form "traditional simplified [pinyin] /definition/"
+
+    Returns:
+        Optional[CedictEntry]: The entry, or None for comments and malformed lines
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    parts = line.split(' ', 2)  # Split into traditional, simplified, and rest
+    if len(parts) < 3:
+        return None
+    traditional, simplified, rest = parts
+
+    pinyin_end = rest.find(']')
+    if pinyin_end == -1:
+        return None
+    if simplified == traditional:
+        simplified = traditional  # Share the string
+    return CedictEntry(traditional, simplified, sys.intern(rest[1:pinyin_end]), rest[pinyin_end + 2:])
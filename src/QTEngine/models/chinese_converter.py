@@ -1,64 +1,188 @@
-from typing import Optional
+from array import array
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
 import opencc
 import re
 
+CJK_PATTERN = re.compile(r'[\u4e00-\u9fff]')
+
+# Code point ranges probed for characters with a different Simplified form
+# when the t2s dictionaries cannot be read
+TABLE_RANGES = ((0x3400, 0x4dc0), (0x4e00, 0xa000), (0xf900, 0xfb00))
+
+# Minimum share of Traditional-only characters among CJK characters of a Traditional text
+MIN_TRADITIONAL_RATIO = 0.02
+
 class ChineseConverter:
     def __init__(self):
         # Initialize converters
         self.t2s = opencc.OpenCC('t2s')  # Traditional to Simplified
         self.s2t = opencc.OpenCC('s2t')  # Simplified to Traditional
-        
-        # Common Traditional-only characters
-        self.traditional_chars = set('繁體國說壽麗華實現觀點愛爾蘭寫藝術')
-    
+
+        # Script of the current book, None until detect_source_script is called
+        self.source_is_traditional: Optional[bool] = None
+
+        # Built on first use, see _build_patterns
+        self._convertible_pattern: Optional[re.Pattern] = None
+        self._traditional_only_pattern: Optional[re.Pattern] = None
+
+    def _dictionary_keys(self) -> Optional[List[str]]:
+        """
+        Return the keys of the t2s dictionaries, characters and phrases such as 沈默.
+
+        Returns:
+            Optional[List[str]]: Every key, None if the dictionaries of this
+            OpenCC package cannot be read
+        """
+        self.t2s.convert('')  # Loads the dictionaries
+        groups = getattr(self.t2s, '_dict_chain_data', None)
+        if not groups:
+            return None
+        keys = []
+        for group in groups:
+            for dictionary in group:
+                if not isinstance(dictionary, tuple) or not isinstance(dictionary[-1], dict):
+                    return None
+                keys.extend(dictionary[-1])
+        return keys
+
+    def _build_patterns(self) -> None:
+        """
+        Find the characters that t2s changes, on their own or in a phrase.
+
+        Keys are converted in a single call separated by newlines, so each
+        line maps to one key. Some phrases are converted although none of
+        their characters is on its own, 沈默 becomes 沉默, so the characters
+        t2s changes in each phrase are convertible too.
+
+        Characters whose Simplified form converts back to them are only
+        written in Traditional texts; the others, such as 乾 or 吒, also
+        occur in Simplified ones.
+
+        If the dictionaries cannot be read, the characters of TABLE_RANGES
+        are probed one by one instead, and all of them are treated as
+        convertible since the phrases are unknown.
+        """
+        keys = self._dictionary_keys()
+        if keys is None:
+            chars = [chr(code) for start, end in TABLE_RANGES for code in range(start, end)]
+        else:
+            chars = [key for key in keys if len(key) == 1]
+        converted = self.t2s.convert('\n'.join(chars)).split('\n')
+        pairs = [(char, simplified) for char, simplified in zip(chars, converted) if char != simplified]
+        round_trip = self.s2t.convert('\n'.join(simplified for _, simplified in pairs)).split('\n')
+
+        if keys is None:
+            self._convertible_pattern = re.compile(
+                '[' + ''.join(f'{chr(start)}-{chr(end - 1)}' for start, end in TABLE_RANGES) + ']'
+            )
+        else:
+            convertible = {char for char, _ in pairs}
+            phrases = [key for key in keys if len(key) > 1]
+            for phrase, simplified in zip(phrases, self.t2s.convert('\n'.join(phrases)).split('\n')):
+                if len(simplified) != len(phrase):
+                    convertible.update(phrase)
+                else:
+                    convertible.update(char for char, new in zip(phrase, simplified) if char != new)
+            self._convertible_pattern = re.compile('[' + ''.join(sorted(convertible)) + ']')
+        self._traditional_only_pattern = re.compile(
+            '[' + ''.join(char for (char, _), back in zip(pairs, round_trip) if back == char) + ']'
+        )
+
+    @property
+    def convertible_pattern(self) -> re.Pattern:
+        """Pattern matching any character that t2s converts, alone or in a phrase."""
+        if self._convertible_pattern is None:
+            self._build_patterns()
+        return self._convertible_pattern
+
+    @property
+    def traditional_only_pattern(self) -> re.Pattern:
+        """Pattern matching the characters that t2s converts and s2t restores."""
+        if self._traditional_only_pattern is None:
+            self._build_patterns()
+        return self._traditional_only_pattern
+
     def has_chinese(self, text: str) -> bool:
         """Check if the text contains Chinese characters."""
-        chinese_pattern = re.compile(r'[\u4e00-\u9fff]')
-        return bool(chinese_pattern.search(text))
-    
+        return bool(CJK_PATTERN.search(text))
+
     def is_traditional(self, text: str) -> bool:
         """
-        Detect if the Chinese text is Traditional Chinese by checking for
-        the presence of Traditional-specific characters.
+        Detect if the Chinese text is Traditional Chinese from the share of
+        its characters that are only written in Traditional Chinese.
         """
-        if not self.has_chinese(text):
+        chinese_count = len(CJK_PATTERN.findall(text))
+        if not chinese_count:
             return False
-            
-        # Convert text to simplified
-        simplified = self.t2s.convert(text)
-        
-        # If the conversion changes the text, it's likely Traditional
-        if simplified != text:
-            # Double check by looking for Traditional-specific characters
-            for char in text:
-                if char in self.traditional_chars:
-                    return True
-            
-            # If no specific Traditional chars found but text changed, still likely Traditional
-            return True
-            
-        return False
-    
+        return len(self.traditional_only_pattern.findall(text)) >= max(1, chinese_count * MIN_TRADITIONAL_RATIO)
+
+    def detect_source_script(self, sample: str) -> bool:
+        """
+        Detect the script of a book once from a sample of its text.
+
+        Args:
+            sample (str): Text from the book, a few thousand characters are enough
+
+        Returns:
+            bool: Whether the book is in Traditional Chinese
+        """
+        self.source_is_traditional = self.is_traditional(sample)
+        return self.source_is_traditional
+
     def convert_to_simplified(self, text: str) -> str:
         """Convert Chinese text to Simplified Chinese."""
         if not self.has_chinese(text):
             return text
         return self.t2s.convert(text)
-    
+
     def convert_to_traditional(self, text: str) -> str:
         """Convert Chinese text to Traditional Chinese."""
         if not self.has_chinese(text):
             return text
         return self.s2t.convert(text)
-    
+
     def auto_convert_to_simplified(self, text: str) -> Optional[str]:
         """
         Automatically detect if the text is Traditional Chinese and convert to Simplified if it is.
         Returns None if no Chinese characters are found.
+
+        In a Traditional book every text goes through OpenCC phrase conversion.
+        Otherwise only texts that contain a convertible character do; the rest
+        of a Simplified book is returned unchanged.
         """
         if not self.has_chinese(text):
             return None
-            
-        # Always convert to simplified to ensure consistency
-        simplified = self.convert_to_simplified(text)
-        return simplified if simplified != text else text
+
+        if not self.source_is_traditional and not self.convertible_pattern.search(text):
+            return text
+        return self.t2s.convert(text)
+
+    def convert_with_offsets(self, text: str) -> Tuple[str, Optional[array]]:
+        """
+        Convert text like auto_convert_to_simplified and map positions back to text.
+
+        OpenCC converts phrase by phrase and nearly always keeps the length,
+        in which case every position is unchanged. Otherwise the unchanged
+        characters are aligned and the positions inside each converted run
+        are spread over the run it replaced.
+
+        Args:
+            text (str): Text to convert
+
+        Returns:
+            Tuple[str, Optional[array]]: Converted text and the position in text of
+            each of its positions plus its end, or None when positions are unchanged
+        """
+        simplified = self.auto_convert_to_simplified(text)
+        if simplified is None or len(simplified) == len(text):
+            return text if simplified is None else simplified, None
+
+        offsets = array('i')
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, text, simplified, autojunk=False).get_opcodes():
+            if tag == 'equal':
+                offsets.extend(range(i1, i2))
+            else:
+                offsets.extend(i1 + (j - j1) * (i2 - i1) // (j2 - j1) for j in range(j1, j2))
+        offsets.append(len(text))
+        return simplified, offsets
@@ -131,6 +131,53 @@ class Trie:
                 longest_value = current.value
         return longest_prefix, longest_value
 
+    def find_prefixes(self, text: str) -> List[Tuple[int, str]]:
+        """
+        Find every word that is a prefix of the text in a single walk.
+        
+        Args:
+            text (str): Text to find prefixes in
+        
+        Returns:
+            List[Tuple[int, str]]: Length and value of each matching prefix, shortest first
+        """
+        current = self.root
+        matches = []
+        for length, char in enumerate(text, 1):
+            current = current.children.get(char)
+            if current is None:
+                break
+            if current.is_end_of_word:
+                matches.append((length, current.value))
+        return matches
+
+    def find_words_with_prefix(self, prefix: str, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """
+        Find the words that start with a prefix, in code point order.
+
+        Args:
+            prefix (str): Start of the words to find
+            limit (Optional[int]): Maximum number of words to return
+
+        Returns:
+            List[Tuple[str, str]]: (word, value) of each matching word, the prefix itself first
+        """
+        current = self.root
+        for char in prefix:
+            current = current.children.get(char)
+            if current is None:
+                return []
+        words = []
+        stack = [(prefix, current)]
+        while stack and (limit is None or len(words) < limit):
+            word, node = stack.pop()
+            if node.is_end_of_word:
+                words.append((word, node.value))
+            # Pushed in reverse so the smallest character is visited first
+            for char, child in sorted(node.children.items(), reverse=True):
+                stack.append((word + char, child))
+        return words
+
     def remove(self, word: str) -> bool:
         """
         Remove a word from the Trie.
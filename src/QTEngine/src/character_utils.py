@@ -1,4 +1,5 @@
-from typing import Set, Dict
+import regex
+from typing import Set, Dict, List, Tuple
 from src.QTEngine.src.ReplaceChar import SPECIAL_CHARS
 
 # Comprehensive set of Latin characters including various language variants
@@ -8,6 +9,21 @@ LATIN_CHARS: Set[str] = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXY
                   'áéíóúýàèìòùâêîôûãõñäëïöüÿçß'  # French, German, Spanish, Portuguese
                   'ÁÉÍÓÚÝÀÈÌÒÙÂÊÎÔÛÃÕÑÄËÏÖÜŸÇSS')  # Uppercase variants
 
+# Splits a line into runs in one pass: Latin text, letters without case
+# (Han, kana, ...) and letter numerals that are looked up in the
+# dictionaries, and everything else (digits, punctuation, symbols, emoji).
+_LATIN_CLASS = regex.escape(''.join(sorted(LATIN_CHARS)))
+TEXT_RUN_PATTERN = regex.compile(
+    '(?P<latin>[' + _LATIN_CLASS + ']+)'
+    r'|(?P<dictionary>[\p{Lo}\p{Lm}\p{Nl}]+)'
+    '|(?P<other>[^' + _LATIN_CLASS + r'\p{Lo}\p{Lm}\p{Nl}]+)'
+)
+
+# Single characters are replaced in one str.translate pass. Longer keys,
+# such as "､ " which must win over "､", are replaced before it.
+SPECIAL_CHAR_TABLE: Dict[int, str] = str.maketrans({han: viet for han, viet in SPECIAL_CHARS.items() if len(han) == 1})
+MULTI_CHAR_REPLACEMENTS: List[Tuple[str, str]] = [(han, viet) for han, viet in SPECIAL_CHARS.items() if len(han) > 1]
+
 def replace_special_chars(text: str) -> str:
     """
     Replace special characters in the text with their Vietnamese equivalents.
@@ -18,6 +34,7 @@ def replace_special_chars(text: str) -> str:
     Returns:
         str: The text with special characters replaced.
     """
-    for han, viet in SPECIAL_CHARS.items():
-        text = text.replace(han, viet)
-    return text
+    for han, viet in MULTI_CHAR_REPLACEMENTS:
+        if han in text:
+            text = text.replace(han, viet)
+    return text.translate(SPECIAL_CHAR_TABLE)
@@ -2,12 +2,14 @@ import os
 import time
 import logging
 import hashlib
-import mmap
 from typing import Tuple, Dict, Any, Optional, List, Union, BinaryIO
 from functools import lru_cache, wraps
 from datetime import datetime, timedelta
 
 from src.QTEngine.models.trie import Trie
+from src.QTEngine.models.cedict import CedictEntry, parse_cedict_line
+from src.QTEngine.src.dictionary_parser import read_dictionary_file
+from src.QTEngine.src.dictionary_registry import DictionaryRegistry, file_stat
 import src.QTEngine.config as config
 from concurrent.futures import ThreadPoolExecutor
 
@@ -18,6 +20,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Registry name of each dictionary, in the order of the loaded_data tuple
+REGISTRY_NAMES = {
+    'names2': 'Names2',
+    'names': 'Names',
+    'viet_phrase': 'VietPhrase',
+    'chinese_phien_am': 'ChinesePhienAm'
+}
+
+# Dictionary key of each data file
+DATA_FILE_KEYS = {
+    'Names2.txt': 'names2',
+    'Names.txt': 'names',
+    'VietPhrase.txt': 'viet_phrase',
+    'ChinesePhienAmWords.txt': 'chinese_phien_am'
+}
+
 class DataLoadError(Exception):
     """Custom exception for data loading errors."""
     pass
@@ -118,6 +136,7 @@ class DataLoader:
                 self.last_load_time = None
                 self.loaded_data = None
                 self._load_count = 0  # Track number of load attempts
+                self.registry = DictionaryRegistry()
                 DataLoader._initialized = True
                 logger.info(f"DataLoader initialized with data_dir: {self.data_dir}")
 
@@ -134,27 +153,15 @@ class DataLoader:
         chunk_size = len(lines) // num_workers + 1
         chunks = [lines[i:i + chunk_size] for i in range(0, len(lines), chunk_size)]
         
-        def process_chunk(chunk_lines: List[str]) -> List[Tuple[str, str]]:
+        def process_chunk(chunk_lines: List[str]) -> List[Tuple[str, CedictEntry]]:
             entries = []
             for line in chunk_lines:
-                parts = line.split(' ', 2)
-                if len(parts) >= 3:
-                    traditional, simplified, rest = parts
-                    pinyin_end = rest.find(']')
-                    if pinyin_end != -1:
-                        pinyin = rest[1:pinyin_end]
-                        definition = rest[pinyin_end + 2:]
-                        entry_data = str({
-                            'traditional': traditional,
-                            'simplified': simplified,
-                            'pinyin': pinyin,
-                            'definition': definition
-                        })
-                        # Add both entries at once to reduce function calls
-                        entries.extend([
-                            (traditional, entry_data),
-                            (simplified, entry_data)
-                        ] if simplified != traditional else [(traditional, entry_data)])
+                entry = parse_cedict_line(line)
+                if entry is not None:
+                    # Both headwords point at the same record
+                    entries.append((entry.traditional, entry))
+                    if entry.simplified != entry.traditional:
+                        entries.append((entry.simplified, entry))
             return entries
         
         # Process chunks in parallel with progress tracking
@@ -174,63 +181,14 @@ class DataLoader:
         logger.info(f"CEDICT loaded in {load_time:.2f}s")
         return trie
         
-    def _mmap_read_lines(self, file_path: str) -> List[str]:
-        """Read lines from a file using memory mapping for better performance."""
-        lines = []
-        with open(file_path, 'rb') as f:
-            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-                # Process the file in chunks using memory mapping
-                current_line = bytearray()
-                for chunk in iter(lambda: mm.read(1024*1024), b''):  # 1MB chunks
-                    current_line.extend(chunk)
-                    while b'\n' in current_line:
-                        line, rest = current_line.split(b'\n', 1)
-                        try:
-                            decoded_line = line.decode('utf-8')
-                            if decoded_line.strip():  # Skip empty lines
-                                lines.append(decoded_line)
-                        except UnicodeDecodeError:
-                            logger.warning(f"Skipping invalid UTF-8 line in {file_path}")
-                        current_line = rest
-
-                # Handle the last line if any
-                if current_line:
-                    try:
-                        decoded_line = current_line.decode('utf-8')
-                        if decoded_line.strip():
-                            lines.append(decoded_line)
-                    except UnicodeDecodeError:
-                        logger.warning(f"Skipping invalid UTF-8 line in {file_path}")
-        return lines
-
     def load_dictionary(self, file_path: str, is_chinese_phien_am: bool = False) -> Dict[str, str]:
-        """Load a dictionary file efficiently using buffered reading."""
-        entries = {}
-        line_count = 0
-        entry_count = 0
+        """Load a dictionary file through the shared streaming parser."""
         try:
-            # Use large buffer for better I/O performance
-            with open(file_path, 'r', encoding='utf-8-sig', buffering=64*1024) as f:
-                for line in f:
-                    line_count += 1
-                    if not line or line.startswith('#'):
-                        continue
-                        
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        if key and value:
-                            entries[key] = value
-                            entry_count += 1
-            
-            logger.info(f"Processed {line_count} lines, loaded {entry_count} entries from {os.path.basename(file_path)}")
-            if entry_count == 0:
-                logger.warning(f"No entries were loaded from {os.path.basename(file_path)}")
-            return entries
-
-            logger.info(f"Processed {len(lines)} lines, loaded {entry_count} entries from {os.path.basename(file_path)}")
-            if entry_count == 0:
+            start_time = time.time()
+            entries = read_dictionary_file(file_path)
+            load_time = time.time() - start_time
+            logger.info(f"Loaded {len(entries)} entries from {os.path.basename(file_path)} in {load_time:.2f}s")
+            if not entries:
                 logger.warning(f"No entries were loaded from {os.path.basename(file_path)}")
             return entries
 
@@ -242,8 +200,16 @@ class DataLoader:
             raise DataLoadError(f"Error loading {file_path}: {e}")
 
     @retry_on_failure()
-    def load_data(self, specific_file: Optional[str] = None) -> Tuple[Trie, Trie, Trie, Dict[str, str], Dict[str, Any]]:
-        """Load or reload dictionary data with caching and memory monitoring."""
+    def load_data(self, specific_file: Optional[str] = None,
+                  force: bool = False) -> Tuple[Trie, Trie, Trie, Dict[str, str], Dict[str, Any]]:
+        """
+        Load or reload dictionary data with caching and memory monitoring.
+
+        A specific file is only reloaded if its size or mtime changed since it
+        was loaded, unless force is set. Callers that wrote the file themselves
+        force the reload, as an edit that keeps the size can land within the
+        mtime resolution of the filesystem.
+        """
         
         # Track load attempts
         self._load_count += 1
@@ -280,6 +246,9 @@ class DataLoader:
             if missing_files:
                 raise DataLoadError(f"Missing files: {missing_files} in {self.data_dir}")
 
+            # Taken before reading, so a file edited while loading is reloaded next time
+            source_stats = {name: file_stat(path) for name, path in file_paths.items()}
+
             # Initialize tries and load with parallel processing
             tries = {
                 'names2': Trie(),
@@ -298,19 +267,18 @@ class DataLoader:
                 logger.info(f"Loaded {len(entries)} entries for {name}")
             
             if specific_file and self.loaded_data:
-                # Reload only the specified dictionary
+                # Reload only the specified dictionary and keep the others
                 names2_trie, names_trie, viet_phrase_trie, chinese_phien_am_data, old_info = self.loaded_data
-                if specific_file == 'Names2.txt':
-                    load_dictionary_to_trie('names2')
-                    tries['names2'] = names2_trie
-                elif specific_file == 'Names.txt':
-                    load_dictionary_to_trie('names')
-                    tries['names'] = names_trie
-                elif specific_file == 'VietPhrase.txt':
-                    load_dictionary_to_trie('viet_phrase')
-                    tries['viet_phrase'] = viet_phrase_trie
-                elif specific_file == 'ChinesePhienAmWords.txt':
+                tries = {'names2': names2_trie, 'names': names_trie, 'viet_phrase': viet_phrase_trie}
+                key = DATA_FILE_KEYS.get(specific_file)
+                if key is None or (not force and self.registry.is_current(REGISTRY_NAMES[key], file_paths[key])):
+                    logger.info(f"{specific_file} is unchanged since it was loaded")
+                    return self.loaded_data
+                if key == 'chinese_phien_am':
                     chinese_phien_am_data = self.load_dictionary(file_paths['chinese_phien_am'])
+                else:
+                    tries[key] = Trie()
+                    load_dictionary_to_trie(key)
             else:
                 # Initialize tries
                 tries = {name: Trie() for name in ['names2', 'names', 'viet_phrase']}
@@ -382,6 +350,10 @@ class DataLoader:
             )
             self.last_load_time = datetime.now()
             
+            # Share the new versions with every user of the dictionaries
+            for key, dictionary in zip(REGISTRY_NAMES, self.loaded_data):
+                self.registry.publish(REGISTRY_NAMES[key], dictionary, file_paths[key], source_stats[key])
+            
             # Log summary after successful load
             logger.info(f"Dictionary load #{self._load_count} completed successfully")
             return self.loaded_data
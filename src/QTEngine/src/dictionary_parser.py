@@ -0,0 +1,115 @@
+import mmap
+import os
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+UTF8_BOM = b"\xef\xbb\xbf"
+
+# Size of the blocks of whole lines that are decoded and split at once
+PARSE_BLOCK_SIZE = 1 << 20
+
+Data = Union[bytes, mmap.mmap]
+
+# Dictionary files hold one key=value entry per line, in UTF-8 with or
+# without a byte order mark. Lines starting with # are comments, keys and
+# values are stripped, and the last entry of a key wins.
+
+def iter_blocks(data: Data, block_size: int = PARSE_BLOCK_SIZE) -> Iterator[Tuple[int, bytes]]:
+    """
+    Split UTF-8 data into blocks of whole lines, after any byte order mark.
+
+    Lines are then split and decoded a block at a time, so the work per
+    line left to Python is small while only one block is copied out of a
+    mapped file at a time.
+
+    Args:
+        data (Data): File contents, usually memory-mapped
+        block_size (int): Approximate size of the blocks
+
+    Returns:
+        Iterator[Tuple[int, bytes]]: Offset of each block in the data and its lines, without the last newline
+    """
+    size = len(data)
+    pos = len(UTF8_BOM) if data[:len(UTF8_BOM)] == UTF8_BOM else 0
+    while pos < size:
+        end = data.find(b"\n", pos + block_size)
+        if end == -1:
+            # The last block, without the newline ending the file
+            end = size - 1 if data[size - 1:size] == b"\n" else size
+        yield pos, data[pos:end]
+        pos = end + 1
+
+def iter_lines(data: Data) -> Iterator[Tuple[int, int]]:
+    """Yield the start and end of each line of UTF-8 data, after any byte order mark."""
+    for offset, block in iter_blocks(data):
+        for line in block.split(b"\n"):
+            yield offset, offset + len(line)
+            offset += len(line) + 1
+
+def iter_entry_spans(data: Data) -> Iterator[Tuple[str, int, int]]:
+    """
+    Yield the key of each entry with the position of its value, without decoding values.
+
+    Used to index a file whose values are read later, so values are only
+    checked to be non-empty and are left to strip when read.
+
+    Args:
+        data (Data): File contents, usually memory-mapped
+
+    Returns:
+        Iterator[Tuple[str, int, int]]: Stripped key, start and end of the value in the data
+    """
+    for offset, block in iter_blocks(data):
+        for line in block.split(b"\n"):
+            separator = line.find(b"=")
+            if separator > 0 and separator + 1 < len(line) and line[0] != 0x23:  # "#"
+                # Strip as text, keys may end with an ideographic space
+                key = line[:separator].decode("utf-8", errors="surrogateescape").strip()
+                if key:
+                    yield key, offset + separator + 1, offset + len(line)
+            offset += len(line) + 1
+
+def parse_entries(data: Data, entries: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Parse every entry of a dictionary file into a dict.
+
+    Entries are stored as they are parsed rather than yielded, which
+    saves a generator step per line on the largest files.
+
+    Args:
+        data (Data): File contents, usually memory-mapped
+        entries (Optional[Dict[str, str]]): Dict to add the entries to, a new one by default
+
+    Returns:
+        Dict[str, str]: The entries by key
+    """
+    if entries is None:
+        entries = {}
+    for _, block in iter_blocks(data):
+        for line in block.decode("utf-8", errors="replace").split("\n"):
+            key, separator, value = line.partition("=")
+            if separator and not key.startswith("#"):
+                key = key.strip()
+                value = value.strip()
+                if key and value:
+                    entries[key] = value
+    return entries
+
+def read_dictionary_file(file_path: str) -> Dict[str, str]:
+    """
+    Parse a dictionary file through a memory map.
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        Dict[str, str]: The entries by key
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    with open(file_path, "rb") as f:
+        # mmap cannot map empty files
+        if os.fstat(f.fileno()).st_size == 0:
+            return {}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return parse_entries(data)
@@ -0,0 +1,139 @@
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def file_stat(file_path: str) -> Optional[Tuple[int, int]]:
+    """Size and mtime of a file, or None if it cannot be read."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+class DictionaryRegistry:
+    """
+    Process-wide registry of loaded dictionaries, shared by QTEngine and DictionaryManager.
+
+    Each name maps to the current version of a dictionary, a Trie or a dict
+    that is not modified once published: a reload publishes a new object.
+    Every dictionary is therefore held in memory once, and subscribers are
+    called with the name and the new object whenever one is replaced.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                instance = super().__new__(cls)
+                instance._dictionaries: Dict[str, Any] = {}
+                instance._versions: Dict[str, int] = {}
+                instance._sources: Dict[str, Tuple[str, Optional[Tuple[int, int]]]] = {}
+                instance._subscribers: List[Callable[[str, Any], None]] = []
+                # Incremented on every publish
+                instance.generation = 0
+                cls._instance = instance
+        return cls._instance
+
+    def get(self, name: str) -> Optional[Any]:
+        """Return the current version of a dictionary, or None if it was never published."""
+        return self._dictionaries.get(name)
+
+    def version(self, name: str) -> int:
+        """Return how many times a dictionary was published."""
+        return self._versions.get(name, 0)
+
+    def names(self) -> List[str]:
+        """Return the names of the published dictionaries."""
+        return list(self._dictionaries)
+
+    def source_stat(self, name: str) -> Optional[Tuple[int, int]]:
+        """
+        Size and mtime of the file the current version of a dictionary was loaded from.
+
+        Unlike version numbers, these identify the content across sessions.
+
+        Args:
+            name (str): Dictionary name
+
+        Returns:
+            Optional[Tuple[int, int]]: Recorded stat, None if unknown
+        """
+        source = self._sources.get(name)
+        return source[1] if source is not None else None
+
+    def is_current(self, name: str, source_path: str) -> bool:
+        """
+        Check whether a dictionary was loaded from a file that has not changed since.
+
+        Args:
+            name (str): Dictionary name
+            source_path (str): File the dictionary would be loaded from
+
+        Returns:
+            bool: Whether reloading the file would give the published version
+        """
+        source = self._sources.get(name)
+        if source is None or source[0] != os.path.abspath(source_path):
+            return False
+        stat = file_stat(source_path)
+        return stat is not None and stat == source[1]
+
+    def publish(self, name: str, dictionary: Any, source_path: Optional[str] = None,
+                source_stat: Optional[Tuple[int, int]] = None) -> int:
+        """
+        Make a dictionary the current version under its name and notify subscribers.
+
+        Args:
+            name (str): Dictionary name
+            dictionary (Any): Loaded dictionary, not modified afterwards
+            source_path (Optional[str]): File it was loaded from, see is_current
+            source_stat (Optional[Tuple[int, int]]): file_stat of the file taken before
+                reading it, so a file changed while loading is not seen as current.
+                Taken now by default.
+
+        Returns:
+            int: Version of the dictionary, unchanged if it is already the current one
+        """
+        with self._lock:
+            if self._dictionaries.get(name) is dictionary:
+                return self._versions[name]
+            self._dictionaries[name] = dictionary
+            self._versions[name] = self._versions.get(name, 0) + 1
+            if source_path is not None:
+                if source_stat is None:
+                    source_stat = file_stat(source_path)
+                self._sources[name] = (os.path.abspath(source_path), source_stat)
+            else:
+                self._sources.pop(name, None)
+            self.generation += 1
+            version = self._versions[name]
+            subscribers = list(self._subscribers)
+
+        logger.info(f"Published {name} version {version}")
+        for callback in subscribers:
+            try:
+                callback(name, dictionary)
+            except Exception as e:
+                logger.error(f"Error notifying subscriber of {name} update: {e}")
+        return version
+
+    def subscribe(self, callback: Callable[[str, Any], None]) -> None:
+        """
+        Call a function with the name and new object each time a dictionary is published.
+
+        Args:
+            callback (Callable[[str, Any], None]): Function to call
+        """
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str, Any], None]) -> None:
+        """Stop calling a function subscribed with subscribe."""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
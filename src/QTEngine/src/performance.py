@@ -1,6 +1,11 @@
 import cProfile
+import gc
 import logging
-from typing import Callable
+import mmap
+import os
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
 
 def profile_function(func: Callable) -> Callable:
     """
@@ -28,3 +33,145 @@ def profile_function(func: Callable) -> Callable:
         
         return result
     return wrapper
+
+def measure_retained_memory(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """
+    Measure the memory still allocated after calling build, using tracemalloc.
+
+    Args:
+        build (Callable[[], Any]): Function creating the objects to measure.
+
+    Returns:
+        Tuple[Any, int]: The result of build and the number of bytes it retains.
+    """
+    gc.collect()
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return result, after - before
+
+def _without_slots(record_cls: type) -> type:
+    """Create a plain __dict__-based copy of a slotted record class."""
+    return type(record_cls.__name__, (), {'__init__': record_cls.__init__})
+
+def benchmark_record_memory(record_cls: type, rows: Iterable[tuple], translated_chars: int) -> Dict[str, float]:
+    """
+    Compare the memory used by records with and without __slots__.
+
+    Args:
+        record_cls (type): Slotted record class, e.g. Block or TextSegment.
+        rows (Iterable[tuple]): Constructor arguments, one tuple per record.
+        translated_chars (int): Number of translated characters the records cover.
+
+    Returns:
+        Dict[str, float]: Bytes per translated character for the plain
+        __dict__ layout ('before') and for record_cls ('after').
+    """
+    rows = list(rows)
+    chars = max(translated_chars, 1)
+    results = {}
+    for label, cls in (('before', _without_slots(record_cls)), ('after', record_cls)):
+        records, size = measure_retained_memory(lambda: [cls(*row) for row in rows])
+        results[label] = size / chars
+        del records
+    return results
+
+def benchmark_mapping_memory(translate_with_mapping: Callable[[str], Tuple[str, Any]], text: str,
+                             segment_cls: Optional[type] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Report bytes per translated character for a translation and its records.
+
+    Args:
+        translate_with_mapping (Callable): Function returning (translated text, TranslationMapping),
+            e.g. QTEngine.translate_with_mapping.
+        text (str): Chinese text to translate.
+        segment_cls (Optional[type]): Display segment class taking
+            (text, start_pos, is_original, mapping, block_index), e.g. TextSegment.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Bytes per translated character keyed by
+        'mapping' (the whole TranslationMapping), 'blocks' and, if given, 'segments'.
+    """
+    from .text_processing import Block
+
+    (translated, mapping), size = measure_retained_memory(lambda: translate_with_mapping(text))
+    chars = max(len(translated), 1)
+    report = {'mapping': {'after': size / chars}}
+
+    blocks = mapping.blocks
+    report['blocks'] = benchmark_record_memory(
+        Block,
+        ((b.original, b.translated, b.orig_start, b.trans_start, b.trans_end) for b in blocks),
+        chars
+    )
+    if segment_cls is not None:
+        report['segments'] = benchmark_record_memory(
+            segment_cls,
+            ((translated[b.trans_start:b.trans_end], b.trans_start, False, mapping, i)
+             for i, b in enumerate(blocks)),
+            chars
+        )
+
+    for name, values in report.items():
+        logging.info(f"Memory for {name}: " + ", ".join(
+            f"{label} {value:.1f} bytes/char" for label, value in values.items()))
+    return report
+
+def _read_text_lines(file_path: str) -> Dict[str, str]:
+    """Parse a dictionary file line by line in text mode, as the loaders did before dictionary_parser."""
+    entries = {}
+    with open(file_path, 'r', encoding='utf-8-sig', buffering=64*1024) as f:
+        for line in f:
+            if not line or line.startswith('#'):
+                continue
+            if '=' in line:
+                key, value = line.split('=', 1)
+                key = key.strip()
+                value = value.strip()
+                if key and value:
+                    entries[key] = value
+    return entries
+
+def benchmark_dictionary_parsing(file_path: str, repeat: int = 3) -> Dict[str, float]:
+    """
+    Measure the throughput of the dictionary file parsers, e.g. on VietPhrase.txt.
+
+    Args:
+        file_path (str): key=value dictionary file.
+        repeat (int): Runs of each parser, the fastest is kept.
+
+    Returns:
+        Dict[str, float]: MB/s of the text-mode line reader ('before'), of
+        read_dictionary_file ('entries') and of iter_entry_spans on a memory
+        map ('spans', as used to index external dictionaries).
+    """
+    from .dictionary_parser import iter_entry_spans, read_dictionary_file
+
+    def scan_spans():
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for _ in iter_entry_spans(data):
+                pass
+
+    megabytes = os.path.getsize(file_path) / (1024 * 1024)
+    results = {}
+    for label, parse in (('before', lambda: _read_text_lines(file_path)),
+                         ('entries', lambda: read_dictionary_file(file_path)),
+                         ('spans', scan_spans)):
+        best = float('inf')
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            parse()
+            best = min(best, time.perf_counter() - start)
+        results[label] = megabytes / best
+    logging.info(f"Parsing {os.path.basename(file_path)} ({megabytes:.1f} MB): " + ", ".join(
+        f"{label} {value:.1f} MB/s" for label, value in results.items()))
+    return results
@@ -1,175 +1,341 @@
 from typing import List, Tuple, Dict, Optional
+from array import array
 from src.QTEngine.models.trie import Trie
-from .character_utils import replace_special_chars, LATIN_CHARS
+from .character_utils import replace_special_chars, TEXT_RUN_PATTERN
 import re
 import logging
 
 class Block:
-    def __init__(self, original: str, translated: str, orig_start: int, trans_start: int):
+    __slots__ = ['original', 'translated', 'orig_start', 'orig_end', 'trans_start', 'trans_end']
+
+    def __init__(self, original: str, translated: str, orig_start: int, trans_start: int,
+                 trans_end: Optional[int] = None):
         self.original = original
         self.translated = translated
         self.orig_start = orig_start
         self.orig_end = orig_start + len(original)
         self.trans_start = trans_start
-        self.trans_end = trans_start + len(translated)
+        self.trans_end = trans_start + len(translated) if trans_end is None else trans_end
 
 class TranslationMapping:
+    """
+    Block-based mapping between original and translated text.
+    
+    Blocks are stored column-wise: parallel offset arrays plus ids into a
+    string table shared by all blocks of the mapping. Block objects are only
+    created when `blocks` is accessed, and the reverse lookup indexes are
+    built on the first lookup.
+    """
     def __init__(self):
-        self.blocks: List[Block] = []
-        self.original_to_block: Dict[str, List[Block]] = {}  # One original text might map to multiple blocks (duplicates)
-        self.translated_to_block: Dict[str, List[Block]] = {}  # One translated text might map to multiple blocks
+        self._strings: List[str] = []  # Interned original and translated texts
+        self._string_ids: Dict[str, int] = {}
+        self._original_ids = array('i')
+        self._translated_ids = array('i')
+        self._orig_starts = array('i')
+        self._trans_starts = array('i')
+        self._trans_ends = array('i')
+        self._blocks: Optional[List[Block]] = None
+        self._original_index: Optional[Dict[str, List[int]]] = None
+        self._translated_index: Optional[Dict[str, List[int]]] = None
+        self._compound_index: Optional[Dict[str, List[int]]] = None
+        self._char_index: Optional[Dict[str, List[str]]] = None
         self.current_original_pos = 0
         self.current_translated_pos = 0
-        self.compound_blocks: Dict[str, List[Block]] = {}  # Store compound word mappings
+        # Text the original was converted from, when script conversion changed it
+        self.source_text: Optional[str] = None
+        self._source_offsets: Optional[array] = None
+
+    def __len__(self) -> int:
+        return len(self._orig_starts)
+
+    def _intern(self, text: str) -> int:
+        """Return the string table id of text, adding it if needed."""
+        string_id = self._string_ids.get(text)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(text)
+            self._string_ids[text] = string_id
+        return string_id
+
+    def _make_block(self, index: int) -> Block:
+        return Block(
+            self._strings[self._original_ids[index]],
+            self._strings[self._translated_ids[index]],
+            self._orig_starts[index],
+            self._trans_starts[index],
+            self._trans_ends[index]
+        )
+
+    def _invalidate_indexes(self):
+        self._original_index = None
+        self._translated_index = None
+        self._compound_index = None
+        self._char_index = None
+
+    @property
+    def blocks(self) -> List[Block]:
+        """Blocks of the mapping, materialized on first access."""
+        if self._blocks is None:
+            self._blocks = [self._make_block(i) for i in range(len(self))]
+        return self._blocks
+
+    def block(self, index: int) -> Block:
+        """Return one block, without materializing the others."""
+        if self._blocks is not None:
+            return self._blocks[index]
+        return self._make_block(index)
+
+    def originals(self) -> List[str]:
+        """Original text of each block, read from the columns."""
+        strings = self._strings
+        return [strings[i] for i in self._original_ids]
 
-    def add_block(self, original: str, translated: str):
-        """Add a new block to the mapping."""
-        block = Block(original, translated, self.current_original_pos, self.current_translated_pos)
-        self.blocks.append(block)
+    def translations(self) -> List[str]:
+        """Translation of each block, read from the columns."""
+        strings = self._strings
+        return [strings[i] for i in self._translated_ids]
+
+    def translated_spans(self) -> List[Tuple[int, int]]:
+        """Span of each block in the formatted translation, read from the columns."""
+        return list(zip(self._trans_starts, self._trans_ends))
+
+    def add_block(self, original: str, translated: str,
+                  trans_start: Optional[int] = None, trans_end: Optional[int] = None):
+        """
+        Add a new block to the mapping.
         
-        # Update mappings
-        if original not in self.original_to_block:
-            self.original_to_block[original] = []
-        self.original_to_block[original].append(block)
+        trans_start/trans_end give the block's exact span in the formatted
+        translation; by default the block follows the previous one.
+        """
+        if trans_start is None:
+            trans_start = self.current_translated_pos
+        if trans_end is None:
+            trans_end = trans_start + len(translated)
         
-        if translated not in self.translated_to_block:
-            self.translated_to_block[translated] = []
-        self.translated_to_block[translated].append(block)
+        self._original_ids.append(self._intern(original))
+        self._translated_ids.append(self._intern(translated))
+        self._orig_starts.append(self.current_original_pos)
+        self._trans_starts.append(trans_start)
+        self._trans_ends.append(trans_end)
+        if self._blocks is not None:
+            self._blocks.append(self._make_block(len(self) - 1))
+        self._invalidate_indexes()
         
-        # Handle compound words in Vietnamese text
-        if ' ' in translated:
-            # Add each part of the compound word
-            parts = translated.split()
-            for part in parts:
-                if part not in self.translated_to_block:
-                    self.translated_to_block[part] = []
-                self.translated_to_block[part].append(block)
+        # Update positions
+        self.current_original_pos += len(original)
+        self.current_translated_pos = trans_end
+
+    def add_blocks(self, originals: List[str], translations: List[str], spans: List[Tuple[int, int]]):
+        """
+        Add consecutive blocks in one call.
+        
+        Args:
+            originals (List[str]): Original text of each block.
+            translations (List[str]): Translation of each block.
+            spans (List[Tuple[int, int]]): Span of each translation in the formatted text.
+        """
+        if not originals:
+            return
+        first = len(self)
+        orig_starts = []
+        pos = self.current_original_pos
+        for original in originals:
+            orig_starts.append(pos)
+            pos += len(original)
+        self._original_ids.extend(map(self._intern, originals))
+        self._translated_ids.extend(map(self._intern, translations))
+        self._orig_starts.extend(orig_starts)
+        self._trans_starts.extend(start for start, _ in spans)
+        self._trans_ends.extend(end for _, end in spans)
+        if self._blocks is not None:
+            self._blocks.extend(self._make_block(i) for i in range(first, len(self)))
+        self._invalidate_indexes()
+        
+        self.current_original_pos = pos
+        self.current_translated_pos = spans[-1][1]
+
+    def extend(self, other: 'TranslationMapping', orig_offset: int = 0, trans_offset: int = 0):
+        """
+        Append all blocks of another mapping, shifting their positions.
+        
+        Args:
+            other (TranslationMapping): Mapping whose blocks are appended.
+            orig_offset (int): Offset added to the original positions.
+            trans_offset (int): Offset added to the translated positions.
+        """
+        first = len(self)
+        string_ids = [self._intern(text) for text in other._strings]
+        self._original_ids.extend(string_ids[i] for i in other._original_ids)
+        self._translated_ids.extend(string_ids[i] for i in other._translated_ids)
+        self._orig_starts.extend(pos + orig_offset for pos in other._orig_starts)
+        self._trans_starts.extend(pos + trans_offset for pos in other._trans_starts)
+        self._trans_ends.extend(pos + trans_offset for pos in other._trans_ends)
+        if self._blocks is not None:
+            self._blocks.extend(self._make_block(i) for i in range(first, len(self)))
+        self._invalidate_indexes()
+        
+        self.current_original_pos = orig_offset + other.current_original_pos
+        self.current_translated_pos = trans_offset + other.current_translated_pos
+
+    def set_source(self, source_text: str, offsets: Optional[array] = None):
+        """
+        Record the text the original was converted from.
+        
+        Args:
+            source_text (str): Text before Traditional to Simplified conversion.
+            offsets (Optional[array]): Source position of each position in the original,
+                plus its end. None when the conversion kept every position.
+        """
+        self.source_text = source_text
+        self._source_offsets = offsets
+
+    def to_source_position(self, position: int) -> int:
+        """Map a position in the original to the source text it was converted from."""
+        if self._source_offsets is None:
+            return position
+        return self._source_offsets[min(position, len(self._source_offsets) - 1)]
+
+    def get_source_span(self, block: Block) -> Tuple[int, int]:
+        """Return the start and end of a block in the source text."""
+        return self.to_source_position(block.orig_start), self.to_source_position(block.orig_end)
+
+    def _build_indexes(self):
+        """Build the reverse lookup indexes from the block columns."""
+        original_index: Dict[str, List[int]] = {}
+        translated_index: Dict[str, List[int]] = {}
+        compound_index: Dict[str, List[int]] = {}
+        strings = self._strings
+        for i, (original_id, translated_id) in enumerate(zip(self._original_ids, self._translated_ids)):
+            original_index.setdefault(strings[original_id], []).append(i)
+            translated = strings[translated_id]
+            translated_index.setdefault(translated, []).append(i)
             
-            # Store the compound word mapping
-            if translated not in self.compound_blocks:
-                self.compound_blocks[translated] = []
-            self.compound_blocks[translated].append(block)
+            # Index each word of compound Vietnamese translations
+            parts = translated.split()
+            if len(parts) > 1:
+                for part in set(parts):
+                    translated_index.setdefault(part, []).append(i)
+                    compound_index.setdefault(part, []).append(i)
+        self._original_index = original_index
+        self._translated_index = translated_index
+        self._compound_index = compound_index
+
+    def _find_original_containing(self, text: str) -> Optional[str]:
+        """
+        Find the first original text (in order of appearance) containing text.
         
-        # Update positions
-        self.current_original_pos = block.orig_end
-        self.current_translated_pos = block.trans_end
+        Uses a character -> originals index and only verifies the originals
+        listed under the rarest character of text.
+        """
+        if self._char_index is None:
+            char_index: Dict[str, List[str]] = {}
+            for original in self._original_index:
+                for char in set(original):
+                    char_index.setdefault(char, []).append(original)
+            self._char_index = char_index
+        if not text:
+            return next(iter(self._original_index), None)
+        
+        candidates = None
+        for char in set(text):
+            originals = self._char_index.get(char)
+            if not originals:
+                return None
+            if candidates is None or len(originals) < len(candidates):
+                candidates = originals
+        for original in candidates:
+            if text in original:
+                return original
+        return None
+
+    @staticmethod
+    def _closest(indices: List[int], starts: array, position: int) -> int:
+        """Return the block in indices whose start is closest to position."""
+        lo, hi = 0, len(indices)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if starts[indices[mid]] < position:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(indices):
+            lo -= 1
+        elif lo > 0 and position - starts[indices[lo - 1]] <= starts[indices[lo]] - position:
+            lo -= 1
+        # Prefer the first of several blocks sharing the same start
+        while lo > 0 and starts[indices[lo - 1]] == starts[indices[lo]]:
+            lo -= 1
+        return indices[lo]
 
     def get_translated_segment(self, original: str, position: Optional[int] = None) -> Optional[Tuple[str, int, int]]:
         """
         Get translated segment and its position for an original text segment.
         If position is provided, returns the block closest to that position.
         """
-        blocks = self.original_to_block.get(original)
-        if not blocks:
+        if self._original_index is None:
+            self._build_indexes()
+        indices = self._original_index.get(original)
+        if not indices:
             # Try to find a block that contains this text
-            for orig, block_list in self.original_to_block.items():
-                if original in orig:
-                    blocks = block_list
-                    break
-                # Also check for compound words
-                for compound_text, compound_blocks in self.compound_blocks.items():
-                    if original in compound_text:
-                        blocks = compound_blocks
-                        break
-        if not blocks:
+            containing = self._find_original_containing(original)
+            if containing is not None:
+                indices = self._original_index[containing]
+            else:
+                # Also check for words of compound translations
+                indices = self._compound_index.get(original)
+        if not indices:
             return None
             
         if position is not None:
             # Find the block closest to the given position
-            closest_block = min(blocks, key=lambda b: abs(b.orig_start - position))
-            return (closest_block.translated, closest_block.trans_start, closest_block.trans_end)
-        
-        # If no position provided, return the first occurrence
-        block = blocks[0]
-        return (block.translated, block.trans_start, block.trans_end)
+            index = self._closest(indices, self._orig_starts, position)
+        else:
+            # If no position provided, return the first occurrence
+            index = indices[0]
+        return (self._strings[self._translated_ids[index]], self._trans_starts[index], self._trans_ends[index])
 
     def get_original_segment(self, translated: str, position: Optional[int] = None) -> Optional[Tuple[str, int, int]]:
         """
         Get original segment and its position for a translated text segment.
         If position is provided, returns the block closest to that position.
+        Words of compound translations are indexed on their own.
         """
-        blocks = self.translated_to_block.get(translated)
-        if not blocks:
-            # Try to find a block that contains this text
-            for trans, block_list in self.translated_to_block.items():
-                # Handle Vietnamese text with spaces
-                trans_parts = trans.split()
-                if translated in trans_parts or translated == trans:
-                    blocks = block_list
-                    break
-                
-            # Also check compound blocks
-            if not blocks:
-                for compound_text, compound_blocks in self.compound_blocks.items():
-                    if translated in compound_text.split():
-                        blocks = compound_blocks
-                        break
-        if not blocks:
+        if self._translated_index is None:
+            self._build_indexes()
+        indices = self._translated_index.get(translated)
+        if not indices:
             return None
             
         if position is not None:
             # Find the block closest to the given position
-            closest_block = min(blocks, key=lambda b: abs(b.trans_start - position))
-            return (closest_block.original, closest_block.orig_start, closest_block.orig_end)
-        
-        # If no position provided, return the first occurrence
-        block = blocks[0]
-        return (block.original, block.orig_start, block.orig_end)
+            index = self._closest(indices, self._trans_starts, position)
+        else:
+            # If no position provided, return the first occurrence
+            index = indices[0]
+        original = self._strings[self._original_ids[index]]
+        orig_start = self._orig_starts[index]
+        return (original, orig_start, orig_start + len(original))
 
-def convert_to_sino_vietnamese(
-    text: str, 
-    names2: Trie, 
-    names: Trie, 
-    viet_phrase: Trie, 
-    chinese_phien_am: Dict[str, str],
-    force_refresh: bool = False
-) -> Tuple[str, TranslationMapping]:
+def _match_dictionary_run(text: str, i: int, run_end: int, tokens: List[str], originals: List[str],
+                          names2: Trie, names: Trie, viet_phrase: Trie,
+                          chinese_phien_am: Dict[str, str]) -> int:
     """
-    Convert Chinese text to Sino-Vietnamese using block-based mapping.
+    Segment a run of Han (or other caseless) characters with the dictionaries.
+    
+    Matches start inside the run but may extend past its end, so entries
+    mixing scripts still match.
     
     Args:
-        text (str): The input Chinese text.
-        names2 (Trie): Trie containing Names2.txt data.
-        names (Trie): Trie containing Names.txt data.
-        viet_phrase (Trie): Trie containing VietPhrase.txt data.
-        chinese_phien_am (Dict[str, str]): Dictionary containing ChinesePhienAmWords.txt data.
-        force_refresh (bool): Force refresh of translation data.
-
+        text (str): The whole line.
+        i (int): Position to start at.
+        run_end (int): End of the run.
+        tokens (List[str]): Translated tokens, appended to.
+        originals (List[str]): Original text of each token, appended to.
+    
     Returns:
-        Tuple[str, TranslationMapping]: The converted Sino-Vietnamese text and mapping information.
+        int: Position after the last token, at least run_end.
     """
-    if not isinstance(text, str):
-        raise ValueError(f"Input text must be a string, got {type(text)}")
-    
-    if not text:
-        logging.warning("Empty input text provided")
-        return "", TranslationMapping()
-    
-    # Validate Trie and dictionary inputs
-    for name, obj in [('names2', names2), ('names', names), ('viet_phrase', viet_phrase)]:
-        if not isinstance(obj, Trie):
-            raise ValueError(f"{name} must be a Trie object")
-    
-    if not isinstance(chinese_phien_am, dict):
-        raise ValueError("chinese_phien_am must be a dictionary")
-
-    text = replace_special_chars(text)
-    
-    tokens = []
-    mapping = TranslationMapping()
-    i = 0
-    
-    while i < len(text):
-        # Check for a sequence of Latin characters
-        latin_start = i
-        while i < len(text) and text[i] in LATIN_CHARS:
-            i += 1
-        if i > latin_start:
-            latin_text = text[latin_start:i]
-            tokens.append(latin_text)
-            mapping.add_block(latin_text, latin_text)
-            continue
-        
+    while i < run_end:
         # Try to find all possible matches at current position
         remaining_text = text[i:]
         matches = []
@@ -210,7 +376,7 @@ def convert_to_sino_vietnamese(
                             break
             
             tokens.append(translated)
-            mapping.add_block(match, translated)
+            originals.append(match)
             i += length
             continue
         
@@ -218,24 +384,91 @@ def convert_to_sino_vietnamese(
         if text[i:i+1] in chinese_phien_am:
             translated = chinese_phien_am[text[i:i+1]]
             tokens.append(translated)
-            mapping.add_block(text[i:i+1], translated)
+            originals.append(text[i:i+1])
             i += 1
             continue
         
         # If no match found, add the character as is
         tokens.append(text[i])
-        mapping.add_block(text[i], text[i])
+        originals.append(text[i])
         i += 1
 
-    # Rephrase the tokens
-    result = rephrase(tokens)
+    return i
 
-    # Apply regex transformations
-    result = re.sub(r'([\[\“\‘])\s*(\w)', lambda m: m.group(1) + m.group(2).upper(), result)
-    result = re.sub(r'\s+([”\’\]])', r'\1', result)
-    result = re.sub(r'([?!⟨:«])\s+(\w)', lambda m: m.group(1) + ' ' + m.group(2).upper(), result)
-    result = re.sub(r'\s+([;:?!.])', r'\1', result)
-    result = re.sub(r'(?<!\.)\.(?!\.)\s+(\w)', lambda m: '. ' + m.group(1).upper(), result)
+def convert_to_sino_vietnamese(
+    text: str, 
+    names2: Trie, 
+    names: Trie, 
+    viet_phrase: Trie, 
+    chinese_phien_am: Dict[str, str],
+    force_refresh: bool = False
+) -> Tuple[str, TranslationMapping]:
+    """
+    Convert Chinese text to Sino-Vietnamese using block-based mapping.
+    
+    Args:
+        text (str): The input Chinese text.
+        names2 (Trie): Trie containing Names2.txt data.
+        names (Trie): Trie containing Names.txt data.
+        viet_phrase (Trie): Trie containing VietPhrase.txt data.
+        chinese_phien_am (Dict[str, str]): Dictionary containing ChinesePhienAmWords.txt data.
+        force_refresh (bool): Force refresh of translation data.
+
+    Returns:
+        Tuple[str, TranslationMapping]: The converted Sino-Vietnamese text and mapping information.
+    """
+    if not isinstance(text, str):
+        raise ValueError(f"Input text must be a string, got {type(text)}")
+    
+    if not text:
+        logging.warning("Empty input text provided")
+        return "", TranslationMapping()
+    
+    # Validate Trie and dictionary inputs
+    for name, obj in [('names2', names2), ('names', names), ('viet_phrase', viet_phrase)]:
+        if not isinstance(obj, Trie):
+            raise ValueError(f"{name} must be a Trie object")
+    
+    if not isinstance(chinese_phien_am, dict):
+        raise ValueError("chinese_phien_am must be a dictionary")
+
+    text = replace_special_chars(text)
+    
+    tokens = []
+    originals = []
+    i = 0
+    
+    for run in TEXT_RUN_PATTERN.finditer(text):
+        # A dictionary match may have run past the start of this run
+        run_end = run.end()
+        if i >= run_end:
+            continue
+        i = max(i, run.start())
+        
+        if run.lastgroup == 'latin':
+            # Keep a sequence of Latin characters as one token. When a
+            # dictionary match ended inside this run, the rest of the run
+            # from there is one token: "第1" on "第123" leaves "23".
+            latin_text = text[i:run_end]
+            tokens.append(latin_text)
+            originals.append(latin_text)
+            i = run_end
+            continue
+        
+        if run.lastgroup == 'other':
+            # Digits, punctuation and symbols are kept as they are, one token each
+            tokens.extend(text[i:run_end])
+            originals.extend(text[i:run_end])
+            i = run_end
+            continue
+        
+        i = _match_dictionary_run(text, i, run_end, tokens, originals, names2, names, viet_phrase, chinese_phien_am)
+
+    # Rephrase the tokens and apply punctuation rules, keeping exact offsets
+    result, spans = format_tokens(tokens)
+
+    mapping = TranslationMapping()
+    mapping.add_blocks(originals, tokens, spans)
     
     return result, mapping
 
@@ -299,6 +532,232 @@ def rephrase(tokens: List[str]) -> str:
     text = ''.join(result)
     return text
 
+# Punctuation classes used by the position-preserving formatters
+NON_WORD_TOKENS = frozenset('"[{ ,!?;\'.')
+NO_SPACE_BEFORE = frozenset(',.!?;:"\')]}')
+OPENING_QUOTES = frozenset('[“‘')
+CLOSING_QUOTES = frozenset('”’]')
+SPACED_PUNCTUATION = frozenset('?!⟨:«')
+ATTACHED_PUNCTUATION = frozenset(';:?!.')
+
+# Characters the formatting rules look at. Every rule needs one of them next
+# to the whitespace it rewrites, so a token without them, even one of several
+# words, is only affected at its edges, which format_tokens handles in a
+# single pass
+RULE_CHARS = frozenset('[“‘”’]?!⟨:«;.')
+
+# The formatting rules as (pattern, replacement of its 'ws' group), applied
+# in order like the re.sub calls they replace. A 'word' group is uppercased.
+FORMAT_RULES = [
+    (re.compile(r'([\[\“\‘])(?P<ws>\s*)(?P<word>\w)'), ''),
+    (re.compile(r'(?P<ws>\s+)([”\’\]])'), ''),
+    (re.compile(r'([?!⟨:«])(?P<ws>\s+)(?P<word>\w)'), ' '),
+    (re.compile(r'(?P<ws>\s+)([;:?!.])'), ''),
+    (re.compile(r'(?<!\.)\.(?!\.)(?P<ws>\s+)(?P<word>\w)'), ' '),
+]
+
+def _rephrase_with_spans(tokens: List[str]) -> Tuple[str, List[Tuple[int, int]]]:
+    """Run rephrase() on tokens and record the span of each token in the result."""
+    parts: List[str] = []
+    spans: List[Tuple[int, int]] = []
+    pos = 0
+    upper = False
+    last_token_empty = False
+    for i, token in enumerate(tokens):
+        if token.strip():
+            if i == 0 or (not upper and token not in NON_WORD_TOKENS):
+                if parts and not last_token_empty:
+                    parts.append(' ')
+                    pos += 1
+                if not token[0].isupper():
+                    token = token.capitalize()
+                upper = True
+            elif token not in NON_WORD_TOKENS and not last_token_empty:
+                parts.append(' ')
+                pos += 1
+            last_token_empty = False
+        else:
+            last_token_empty = True
+        spans.append((pos, pos + len(token)))
+        parts.append(token)
+        pos += len(token)
+    return ''.join(parts), spans
+
+def _apply_format_rule(text: str, spans: List[Tuple[int, int]], pattern: 're.Pattern',
+                       whitespace: str) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Apply one formatting rule to text and move the token spans along with it.
+
+    Span boundaries inside rewritten whitespace move to its end, so
+    whitespace tokens that the rule removes are left with empty spans.
+    """
+    edits: List[Tuple[int, int, str]] = []
+    for match in pattern.finditer(text):
+        start, end = match.span('ws')
+        if text[start:end] != whitespace:
+            edits.append((start, end, whitespace))
+        if 'word' in pattern.groupindex:
+            start, end = match.span('word')
+            edits.append((start, end, text[start:end].upper()))
+    if not edits:
+        return text, spans
+
+    parts: List[str] = []
+    last = 0
+    for start, end, replacement in edits:
+        parts.append(text[last:start])
+        parts.append(replacement)
+        last = end
+    parts.append(text[last:])
+
+    # Spans and edits are both in text order, so one walk moves every boundary
+    shift = 0
+    edit_index = 0
+
+    def move(position: int) -> int:
+        nonlocal shift, edit_index
+        while edit_index < len(edits) and edits[edit_index][1] <= position:
+            start, end, replacement = edits[edit_index]
+            shift += len(replacement) - (end - start)
+            edit_index += 1
+        if edit_index < len(edits):
+            start, end, replacement = edits[edit_index]
+            if start < position:
+                return start + shift + len(replacement)
+        return position + shift
+
+    moved = []
+    for start, end in spans:
+        new_start = move(start)
+        moved.append((new_start, max(new_start, move(end))))
+    return ''.join(parts), moved
+
+def _format_tokens_exact(tokens: List[str]) -> Tuple[str, List[Tuple[int, int]]]:
+    """Apply rephrase() and the formatting rules to the whole text, tracking the token spans."""
+    text, spans = _rephrase_with_spans(tokens)
+    for pattern, whitespace in FORMAT_RULES:
+        text, spans = _apply_format_rule(text, spans, pattern, whitespace)
+    return text, spans
+
+def format_tokens(tokens: List[str]) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Rephrase tokens into a sentence and record where each token lands.
+
+    Produces the same text as rephrase() followed by the quote, spacing and
+    capitalization rules convert_to_sino_vietnamese used to apply with
+    regular expressions. The rules only rewrite whitespace next to
+    punctuation, so for tokens without punctuation inside, dictionary values
+    of several words included, they can only apply between tokens and are
+    applied in a single pass over them. Tokens with punctuation inside or
+    whitespace at an edge are formatted by applying the rules to the whole
+    text.
+
+    Args:
+        tokens (List[str]): Translated tokens, whitespace tokens included.
+
+    Returns:
+        Tuple[str, List[Tuple[int, int]]]: The formatted text and one
+        (start, end) span per token. Whitespace that the rules remove leaves
+        an empty span.
+    """
+    parts: List[str] = []
+    spans: List[Tuple[int, int]] = []
+    pos = 0
+    prev = prev2 = ''
+    upper = False
+    # Whether the previous token lets the next word follow without any rule applying
+    plain = False
+    gap: List[str] = []  # Whitespace tokens waiting for the next word
+    append = parts.append
+    add_span = spans.append
+    non_word = NON_WORD_TOKENS
+    rule_chars = RULE_CHARS
+
+    for token in tokens:
+        if rule_chars.isdisjoint(token):
+            stripped = token.strip()
+            if not stripped:
+                gap.append(token)
+                continue
+            if len(stripped) != len(token):
+                return _format_tokens_exact(tokens)
+            if plain and not gap:
+                # No rule applies between two words without punctuation
+                if token not in non_word:
+                    append(' ')
+                    pos += 1
+                end = pos + len(token)
+                add_span((pos, end))
+                append(token)
+                pos = end
+                continue
+        elif len(token) > 1:
+            return _format_tokens_exact(tokens)
+
+        # Capitalize the first word of the sentence
+        if not upper and ((not spans and not gap) or token not in non_word):
+            if not token[0].isupper():
+                token = token.capitalize()
+            upper = True
+
+        # Whitespace between the previous word and this one
+        if gap:
+            whitespace = ''.join(gap)
+        elif spans and token not in non_word:
+            whitespace = ' '
+        else:
+            whitespace = ''
+        keep_gap = bool(gap)
+
+        lead = token[0]
+        if whitespace or prev in OPENING_QUOTES:
+            if lead.isalnum() or lead == '_':
+                if prev in OPENING_QUOTES:
+                    whitespace = ''
+                    keep_gap = False
+                    token = lead.upper() + token[1:]
+                elif prev in SPACED_PUNCTUATION or (prev == '.' and prev2 != '.'):
+                    whitespace = ' '
+                    keep_gap = False
+                    token = lead.upper() + token[1:]
+            elif lead in CLOSING_QUOTES or lead in ATTACHED_PUNCTUATION:
+                whitespace = ''
+                keep_gap = False
+
+        if gap:
+            if keep_gap:
+                for space in gap:
+                    add_span((pos, pos + len(space)))
+                    pos += len(space)
+            else:
+                for space in gap:
+                    add_span((pos, pos))
+                pos += len(whitespace)
+            gap = []
+        else:
+            pos += len(whitespace)
+        if whitespace:
+            append(whitespace)
+
+        end = pos + len(token)
+        add_span((pos, end))
+        append(token)
+        pos = end
+        last = token[-1]
+        if last == '.':
+            # Only needed to tell "." from an ellipsis
+            prev2 = token[-2] if len(token) > 1 else (whitespace[-1] if whitespace else prev)
+        prev = last
+        plain = upper and last not in rule_chars
+
+    # Trailing whitespace is left untouched
+    for space in gap:
+        add_span((pos, pos + len(space)))
+        append(space)
+        pos += len(space)
+
+    return ''.join(parts), spans
+
 def process_paragraph(
     paragraph: str, 
     names2: Trie, 
@@ -343,22 +802,12 @@ def process_paragraph(
             # Adjust positions for leading space
             space_offset = len(leading_space)
             
-            # Update positions for this line's blocks
-            for block in line_mapping.blocks:
-                block.orig_start += current_orig_pos + space_offset
-                block.orig_end += current_orig_pos + space_offset
-                block.trans_start += current_trans_pos + space_offset
-                block.trans_end += current_trans_pos + space_offset
-                mapping.blocks.append(block)
-                
-                # Update the mapping dictionaries
-                if block.original not in mapping.original_to_block:
-                    mapping.original_to_block[block.original] = []
-                mapping.original_to_block[block.original].append(block)
-                
-                if block.translated not in mapping.translated_to_block:
-                    mapping.translated_to_block[block.translated] = []
-                mapping.translated_to_block[block.translated].append(block)
+            # Append this line's blocks at their position in the paragraph
+            mapping.extend(
+                line_mapping,
+                current_orig_pos + space_offset,
+                current_trans_pos + space_offset
+            )
             
             # Update positions for next line
             current_orig_pos += len(line)
@@ -0,0 +1,91 @@
+import logging
+import mmap
+import os
+from typing import Iterator, List, Optional, Tuple
+from src.core.text_decoder import BadByteDecoder, resolve_bom
+
+# Bytes decoded at a time when scanning the whole file
+SCAN_BLOCK_SIZE = 8 * 1024 * 1024
+
+class BookFile:
+    """
+    Read-only, memory-mapped text file decoded on demand.
+
+    Offsets are byte offsets into the file. Only the requested ranges are
+    decoded, so memory use follows the chapter being read rather than the
+    size of the book.
+    """
+    def __init__(self, file_path: str, encoding: str):
+        self.file_path = file_path
+        self.encoding = encoding
+        self._file = open(file_path, 'rb')
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            # mmap cannot map empty files
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        except Exception:
+            self._file.close()
+            raise
+
+        # Decode after the byte order mark with a codec that does not expect one
+        self.codec, self.data_start = resolve_bom(encoding, self._data[:4])
+        # Undecodable bytes found by the last full scan, as (byte offset, bytes)
+        self.bad_bytes: List[Tuple[int, bytes]] = []
+
+        # Blocks can only be split at b'\n' when no multi-byte sequence contains it
+        self._line_splittable = '\n'.encode(self.codec) == b'\n' and 'a\n'.encode(self.codec) == b'a\n'
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def decode(self, start: Optional[int] = None, end: Optional[int] = None, replacement: str = '\ufffd') -> str:
+        """
+        Decode a byte range of the file.
+
+        Args:
+            start (Optional[int]): First byte, defaults to the start of the text
+            end (Optional[int]): Byte after the last one, defaults to the end of the file
+            replacement (str): Text substituted for each run of undecodable bytes
+
+        Returns:
+            str: Decoded text
+        """
+        if start is None:
+            start = self.data_start
+        return BadByteDecoder(self.codec, replacement, start).decode(self._data[start:end], final=True)
+
+    def iter_blocks(self, block_size: int = SCAN_BLOCK_SIZE) -> Iterator[Tuple[int, str]]:
+        """
+        Decode the whole file block by block, splitting blocks after a newline.
+
+        Args:
+            block_size (int): Approximate number of bytes per block
+
+        Yields:
+            Tuple[int, str]: Byte offset of the block and its decoded text. Undecodable
+            bytes are recorded in bad_bytes and kept as one escape character
+            each, so byte offsets can still be computed with char_to_byte_offsets
+        """
+        size = len(self._data)
+        pos = self.data_start
+        decoder = BadByteDecoder(self.codec, replacement=None, start_offset=pos)
+        self.bad_bytes = decoder.bad_bytes
+        while pos < size:
+            end = size
+            if self._line_splittable and pos + block_size < size:
+                newline = self._data.rfind(b'\n', pos, pos + block_size)
+                if newline >= 0:
+                    end = newline + 1
+            yield pos, decoder.decode(self._data[pos:end], final=(end == size))
+            pos = end
+        if self.bad_bytes:
+            logging.getLogger(__name__).warning(
+                f"{decoder.bad_byte_count} undecodable bytes in {self.file_path} "
+                f"for {self.encoding}, first at byte {self.bad_bytes[0][0]}"
+            )
+
+    def close(self) -> None:
+        """Unmap and close the file."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
@@ -0,0 +1,231 @@
+import codecs
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from src.core.text_decoder import ESCAPED_BYTES_PATTERN
+
+# Bump when the layout of stored indexes changes
+INDEX_VERSION = 1
+
+DEFAULT_INDEX_DIRECTORY = os.path.join(os.path.expanduser("~"), ".zxreader", "chapter_index")
+
+# Size of each block hashed to fingerprint the file content
+HASH_BLOCK_SIZE = 64 * 1024
+
+def char_to_byte_offsets(text: str, offsets: List[int], encoding: str) -> List[int]:
+    """
+    Convert sorted character offsets in text to byte offsets in its encoded form.
+
+    Args:
+        text (str): Decoded text
+        offsets (List[int]): Non-decreasing character offsets
+        encoding (str): Encoding the text was decoded from
+
+    Returns:
+        List[int]: Byte offset of each character offset
+    """
+    # An incremental encoder writes a BOM only once, at the very start
+    encoder = codecs.getincrementalencoder(encoding)()
+    byte_offsets = []
+    byte_pos = 0
+    char_pos = 0
+    for offset in offsets:
+        byte_pos += _encoded_length(text[char_pos:offset], encoder)
+        char_pos = offset
+        byte_offsets.append(byte_pos)
+    return byte_offsets
+
+def _encoded_length(text: str, encoder: codecs.IncrementalEncoder) -> int:
+    """Length of text once encoded, counting one byte per escaped undecodable byte."""
+    length = 0
+    pos = 0
+    for match in ESCAPED_BYTES_PATTERN.finditer(text):
+        length += len(encoder.encode(text[pos:match.start()])) + match.end() - match.start()
+        pos = match.end()
+    return length + len(encoder.encode(text[pos:]))
+
+class ChapterIndexStore:
+    """
+    Persistent per-file chapter index.
+
+    Each opened file gets a JSON sidecar in the index directory named after
+    a hash of its absolute path. It records the detected encoding, and for
+    every detection method used the chapter offsets, titles and translated
+    titles with the dictionaries they were translated with. A sidecar is
+    reused while the file size and mtime match, or, when only the mtime
+    changed, while a hash of the first, middle and last blocks of the file
+    still matches. The last chapter read is kept in a small file of its own,
+    as it changes far more often than the rest.
+    """
+    def __init__(self, index_directory: str = DEFAULT_INDEX_DIRECTORY):
+        self.index_directory = index_directory
+        self.logger = logging.getLogger(__name__)
+
+    def _index_path(self, file_path: str, suffix: str = ".json") -> str:
+        key = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+        return os.path.join(self.index_directory, key + suffix)
+
+    @staticmethod
+    def content_hash(file_path: str, size: int) -> str:
+        """
+        Fingerprint a file from its size and its first, middle and last blocks.
+
+        Args:
+            file_path (str): Path to the file
+            size (int): File size in bytes
+
+        Returns:
+            str: Hex digest of the sampled content
+        """
+        digest = hashlib.sha1(str(size).encode("ascii"))
+        with open(file_path, "rb") as file:
+            for offset in sorted({0, max(0, size // 2 - HASH_BLOCK_SIZE // 2), max(0, size - HASH_BLOCK_SIZE)}):
+                file.seek(offset)
+                digest.update(file.read(HASH_BLOCK_SIZE))
+        return digest.hexdigest()
+
+    def load(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the index of a file if it is still valid for the file on disk.
+
+        Args:
+            file_path (str): Path to the novel file
+
+        Returns:
+            Optional[Dict[str, Any]]: The stored index, or None if missing or stale
+        """
+        try:
+            stat = os.stat(file_path)
+            with open(self._index_path(file_path), "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if index.get("version") != INDEX_VERSION or index.get("size") != stat.st_size:
+            return None
+        if index.get("mtime") != stat.st_mtime:
+            # Touched but possibly unchanged, compare the content fingerprint
+            try:
+                if index.get("content_hash") != self.content_hash(file_path, stat.st_size):
+                    return None
+            except OSError:
+                return None
+            index["mtime"] = stat.st_mtime
+            self.save(file_path, index)
+        return index
+
+    def new_index(self, file_path: str, encoding: Optional[str]) -> Dict[str, Any]:
+        """
+        Create an empty index for the current state of a file.
+
+        Args:
+            file_path (str): Path to the novel file
+            encoding (Optional[str]): Encoding the file was decoded with
+
+        Returns:
+            Dict[str, Any]: Index without any detected chapters
+        """
+        stat = os.stat(file_path)
+        return {
+            "version": INDEX_VERSION,
+            "path": os.path.abspath(file_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "content_hash": self.content_hash(file_path, stat.st_size),
+            "encoding": encoding,
+            "methods": {},
+        }
+
+    def _write(self, path: str, data: Any) -> None:
+        os.makedirs(self.index_directory, exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def save(self, file_path: str, index: Dict[str, Any]) -> None:
+        """
+        Write the index of a file, ignoring failures as the index is only a cache.
+
+        Args:
+            file_path (str): Path to the novel file
+            index (Dict[str, Any]): Index to store
+        """
+        try:
+            self._write(self._index_path(file_path), index)
+        except OSError as e:
+            self.logger.warning(f"Could not save chapter index for {file_path}: {e}")
+
+    def load_last_chapter(self, file_path: str) -> int:
+        """
+        Return the last chapter read in a file, 0 if unknown.
+
+        Args:
+            file_path (str): Path to the novel file
+
+        Returns:
+            int: Index of the chapter
+        """
+        try:
+            with open(self._index_path(file_path, ".position.json"), "r", encoding="utf-8") as f:
+                chapter = json.load(f).get("last_chapter", 0)
+        except (OSError, ValueError, AttributeError):
+            return 0
+        return chapter if isinstance(chapter, int) else 0
+
+    def save_last_chapter(self, file_path: str, chapter: int) -> None:
+        """
+        Record the last chapter read in a file, without rewriting its index.
+
+        Args:
+            file_path (str): Path to the novel file
+            chapter (int): Index of the chapter
+        """
+        try:
+            self._write(self._index_path(file_path, ".position.json"), {"last_chapter": chapter})
+        except OSError as e:
+            self.logger.warning(f"Could not save last chapter for {file_path}: {e}")
+
+    @staticmethod
+    def set_method_entry(index: Dict[str, Any], method: str, detected_method: str,
+                         chapters: List[Tuple[int, int]], byte_chapters: List[Tuple[int, int]],
+                         titles: List[str], translated_titles: List[str], dictionaries: List[Any]) -> None:
+        """
+        Record the chapters detected with a method in an index.
+
+        Args:
+            index (Dict[str, Any]): Index to update
+            method (str): Selected detection method
+            detected_method (str): Method actually used, differs in automatic mode
+            chapters (List[Tuple[int, int]]): Character offsets of the chapter titles
+            byte_chapters (List[Tuple[int, int]]): Byte offsets of the chapter titles in the file
+            titles (List[str]): Chapter titles
+            translated_titles (List[str]): Translated chapter titles
+            dictionaries (List[Any]): Dictionaries the titles were translated with, see set_translated_titles
+        """
+        index["methods"][method] = {
+            "detected_method": detected_method,
+            "chapters": [list(chapter) for chapter in chapters],
+            "byte_offsets": [list(chapter) for chapter in byte_chapters],
+            "titles": titles,
+            "translated_titles": translated_titles,
+            "dictionaries": dictionaries,
+        }
+
+    @staticmethod
+    def set_translated_titles(index: Dict[str, Any], method: str, translated_titles: List[str],
+                              dictionaries: List[Any]) -> None:
+        """
+        Replace the translated titles of a method after the dictionaries changed.
+
+        Args:
+            index (Dict[str, Any]): Index to update
+            method (str): Selected detection method
+            translated_titles (List[str]): Translated chapter titles
+            dictionaries (List[Any]): Name, size and mtime of each dictionary used to translate them
+        """
+        entry = index["methods"][method]
+        entry["translated_titles"] = translated_titles
+        entry["dictionaries"] = dictionaries
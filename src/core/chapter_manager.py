@@ -1,26 +1,224 @@
-from typing import List, Tuple, Optional
-from src.detect_chapters_methods import detect_chapters, CHAPTER_MATCHERS
-from src.QTEngine.QTEngine import QTEngine
+from typing import Any, Dict, List, Tuple, Optional
+from src.detect_chapters_methods import ChapterDetector, CHAPTER_MATCHERS, AUTO_DETECTION_METHOD, pick_best_method
+from src.core.chapter_index import ChapterIndexStore, char_to_byte_offsets
+from src.core.book_file import BookFile
+from src.core.text_decoder import ESCAPED_BYTES_PATTERN
+from src.QTEngine.QTEngine import QTEngine, DICTIONARY_ATTRIBUTES
+from src.QTEngine.src.dictionary_registry import DictionaryRegistry
+
+# Characters, or bytes of an open file, sampled to detect the script of a book
+SCRIPT_SAMPLE_SIZE = 64 * 1024
  
 class ChapterManager:
     def __init__(self, qt_engine: QTEngine):
         self.qt_engine = qt_engine
+        # Offsets into self.text, or byte offsets into self.book when a file is open
         self.chapters: List[Tuple[int, int]] = []
         self.chapter_titles: List[str] = []
         self.translated_chapter_titles: List[str] = []
         self.current_chapter_index: int = -1
         self.text: str = ""
-        self._detection_method: str = list(CHAPTER_MATCHERS.keys())[0]  # Default to first method
+        self._detection_method: str = AUTO_DETECTION_METHOD  # Default to picking the best method
+        self.detected_method: Optional[str] = None  # Method used for the current chapters
+        self._detector: Optional[ChapterDetector] = None
+        self._translated_title_cache: Dict[str, str] = {}
+        self.registry = DictionaryRegistry()
+        # Registry generation when the cached title translations were made
+        self._title_generation = -1
+        self.index_store = ChapterIndexStore()
+        self.file_path: Optional[str] = None
+        self._file_index: Optional[Dict[str, Any]] = None
+        self.book: Optional[BookFile] = None
+        # Per method: character offsets, byte offsets and titles found by scanning the book
+        self._book_results: Dict[str, Tuple[List[Tuple[int, int]], List[Tuple[int, int]], List[str]]] = {}
+        self._book_length = 0
+        self._last_chapter = 0
  
-    def set_text(self, text: str) -> None:
+    def get_cached_encoding(self, file_path: str) -> Optional[str]:
+        """Return the encoding stored in the chapter index of a file, if it is still valid."""
+        self._file_index = self.index_store.load(file_path)
+        self.file_path = file_path if self._file_index else None
+        return self._file_index.get("encoding") if self._file_index else None
+ 
+    def _use_file_index(self, file_path: Optional[str], encoding: Optional[str]) -> None:
+        """Load the chapter index of a file if it was saved for the same encoding, else start a new one."""
+        if file_path is None:
+            self._file_index = None
+        elif self.file_path != file_path or not self._file_index or self._file_index.get("encoding") != encoding:
+            self._file_index = self.index_store.load(file_path)
+            if self._file_index and self._file_index.get("encoding") != encoding:
+                self._file_index = None
+        self.file_path = file_path
+        if file_path is not None and self._file_index is None:
+            self._file_index = self.index_store.new_index(file_path, encoding)
+ 
+    def close_file(self) -> None:
+        """Release the file opened with open_file."""
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        self._book_results = {}
+        self._book_length = 0
+ 
+    def set_text(self, text: str, file_path: Optional[str] = None, encoding: Optional[str] = None) -> None:
+        self.close_file()
         self.text = text
+        self._detector = None
+        self._translated_title_cache = {}
+        self._use_file_index(file_path, encoding)
+        self.qt_engine.detect_source_script(text[:SCRIPT_SAMPLE_SIZE])
+        
         self.detect_and_set_chapters()
+        if self._file_index:
+            self._restore_last_chapter()
+ 
+    def open_file(self, file_path: str, encoding: str) -> None:
+        """
+        Open a file for reading chapter by chapter without loading it whole.
+        
+        Chapters are addressed by byte offsets into the memory-mapped file and
+        decoded on demand, so memory use follows the current chapter.
+        
+        Args:
+            file_path (str): Path to the novel file
+            encoding (str): Encoding of the file
+            
+        Raises:
+            UnicodeDecodeError: If chapters have to be detected and the file is not valid in encoding
+        """
+        self.close_file()
+        self.text = ""
+        self._detector = None
+        self._translated_title_cache = {}
+        self.book = BookFile(file_path, encoding)
+        self._use_file_index(file_path, encoding)
+        start = self.book.data_start
+        self.qt_engine.detect_source_script(self.book.decode(start, start + SCRIPT_SAMPLE_SIZE))
+        
+        try:
+            self.detect_and_set_chapters()
+        except Exception:
+            self.close_file()
+            raise
+        if self._file_index:
+            self._restore_last_chapter()
+ 
+    def _scan_book(self, methods: List[str]) -> None:
+        """Detect chapters with the given methods by decoding the open file block by block."""
+        methods = [method for method in methods if method not in self._book_results]
+        if not methods:
+            return
+        results = {method: ([], [], []) for method in methods}
+        char_base = 0
+        for byte_start, block in self.book.iter_blocks():
+            # Later blocks start after a newline, keep it visible to lookbehinds
+            prefix = 1 if byte_start > self.book.data_start else 0
+            detector = ChapterDetector("\n" + block if prefix else block)
+            for method in methods:
+                chapters, byte_chapters, titles = results[method]
+                found = [(max(start - prefix, 0), end - prefix) for start, end in detector.detect(method)]
+                byte_offsets = char_to_byte_offsets(block, [offset for chapter in found for offset in chapter], self.book.codec)
+                for i, (start, end) in enumerate(found):
+                    chapters.append((char_base + start, char_base + end))
+                    byte_chapters.append((byte_start + byte_offsets[2 * i], byte_start + byte_offsets[2 * i + 1]))
+                    titles.append(ESCAPED_BYTES_PATTERN.sub('\ufffd', block[start:end]))
+            char_base += len(block)
+        self._book_length = char_base
+        self._book_results.update(results)
+ 
+    def _detect_in_book(self) -> List[Tuple[int, int]]:
+        """Detect chapters in the open file, returning their character offsets."""
+        if self._detection_method == AUTO_DETECTION_METHOD:
+            self._scan_book(list(CHAPTER_MATCHERS))
+            candidates = {
+                method: (chapters, titles)
+                for method, (chapters, _, titles) in self._book_results.items()
+            }
+            self.detected_method = pick_best_method(candidates, self._book_length)
+        else:
+            self.detected_method = self._detection_method
+            self._scan_book([self.detected_method])
+        char_chapters, self.chapters, titles = self._book_results[self.detected_method]
+        self.chapter_titles = list(titles)
+        return char_chapters
  
     def detect_and_set_chapters(self) -> None:
-        self.chapters = detect_chapters(self.text, self._detection_method)
-        self.chapter_titles = self._extract_chapter_titles()
+        entry = self._file_index["methods"].get(self._detection_method) if self._file_index else None
+        if entry and (self.book is None or len(entry["byte_offsets"]) == len(entry["chapters"])):
+            # Restore chapters and translated titles from the index
+            self.detected_method = entry["detected_method"]
+            offsets = entry["byte_offsets"] if self.book is not None else entry["chapters"]
+            self.chapters = [tuple(chapter) for chapter in offsets]
+            self.chapter_titles = entry["titles"]
+            dictionaries = self._dictionary_signature()
+            if dictionaries is not None and entry.get("dictionaries") == dictionaries:
+                self.translated_chapter_titles = entry["translated_titles"]
+            else:
+                # Translated with other versions of the dictionaries
+                self._translate_chapter_titles()
+                self.index_store.set_translated_titles(
+                    self._file_index, self._detection_method, self.translated_chapter_titles, dictionaries
+                )
+                self.index_store.save(self.file_path, self._file_index)
+            self.current_chapter_index = 0
+            return
+        
+        if self.book is not None:
+            char_chapters = self._detect_in_book()
+            byte_chapters = self.chapters
+        else:
+            if self._detector is None or self._detector.text is not self.text:
+                self._detector = ChapterDetector(self.text)
+            if self._detection_method == AUTO_DETECTION_METHOD:
+                # Only the winning method's titles get translated
+                self.detected_method = self._detector.best_method()
+            else:
+                self.detected_method = self._detection_method
+            self.chapters = self._detector.detect(self.detected_method)
+            self.chapter_titles = self._extract_chapter_titles()
+            char_chapters = self.chapters
+            byte_chapters = None
         self._translate_chapter_titles()
         self.current_chapter_index = 0
+        
+        if self._file_index is not None:
+            if byte_chapters is None and self._file_index.get("encoding"):
+                flat = char_to_byte_offsets(
+                    self.text, [offset for chapter in char_chapters for offset in chapter], self._file_index["encoding"]
+                )
+                byte_chapters = list(zip(flat[::2], flat[1::2]))
+            self.index_store.set_method_entry(
+                self._file_index, self._detection_method, self.detected_method, char_chapters,
+                byte_chapters or [], self.chapter_titles, self.translated_chapter_titles,
+                self._dictionary_signature()
+            )
+            self.index_store.save(self.file_path, self._file_index)
+ 
+    def _restore_last_chapter(self) -> None:
+        """Go to the last chapter read in the open file."""
+        self._last_chapter = self.index_store.load_last_chapter(self.file_path)
+        self.set_current_chapter(self._last_chapter)
+
+    def _remember_chapter(self) -> None:
+        """Store the current chapter as the last one read in the file."""
+        if self._file_index is not None and self._last_chapter != self.current_chapter_index:
+            self._last_chapter = self.current_chapter_index
+            self.index_store.save_last_chapter(self.file_path, self.current_chapter_index)
+
+    def _dictionary_signature(self) -> Optional[List[Any]]:
+        """
+        Identify the dictionaries chapter titles are translated with, across sessions.
+        
+        Returns:
+            Optional[List[Any]]: Name, size and mtime of each dictionary file, None if one is unknown
+        """
+        signature = []
+        for name in DICTIONARY_ATTRIBUTES:
+            stat = self.registry.source_stat(name)
+            if stat is None:
+                return None
+            signature.append([name, *stat])
+        return signature
  
     def _extract_chapter_titles(self) -> List[str]:
         titles = []
@@ -29,12 +227,39 @@ class ChapterManager:
         return titles
  
     def _translate_chapter_titles(self) -> None:
+        if self._title_generation != self.registry.generation:
+            # A dictionary was reloaded since the cached titles were translated
+            self._translated_title_cache = {}
+            self._title_generation = self.registry.generation
         translated_titles = []
         for title in self.chapter_titles:
-            translated_title = self.qt_engine.translate(title)
+            # Titles are shared between detection methods, translate each once
+            translated_title = self._translated_title_cache.get(title)
+            if translated_title is None:
+                translated_title = self.qt_engine.translate(title)
+                self._translated_title_cache[title] = translated_title
             translated_titles.append(translated_title)
         self.translated_chapter_titles = translated_titles
  
+    def refresh_translated_titles(self) -> bool:
+        """
+        Translate the chapter titles again if a dictionary was reloaded since they were translated.
+        
+        Returns:
+            bool: Whether the translated titles changed
+        """
+        if not self.chapter_titles or self._title_generation == self.registry.generation:
+            return False
+        previous = self.translated_chapter_titles
+        self._translate_chapter_titles()
+        if self._file_index is not None and self._detection_method in self._file_index["methods"]:
+            self.index_store.set_translated_titles(
+                self._file_index, self._detection_method, self.translated_chapter_titles,
+                self._dictionary_signature()
+            )
+            self.index_store.save(self.file_path, self._file_index)
+        return self.translated_chapter_titles != previous
+
     def get_chapter_titles(self) -> List[str]:
         return self.translated_chapter_titles
  
@@ -46,11 +271,16 @@ class ChapterManager:
         if not self.chapters:
             return ""
         if index == -1:
-            return self.text
+            return self.book.decode() if self.book is not None else self.text
         if index < 0 or index >= len(self.chapters):
             return ""
         start, end = self.chapters[index]
         
+        if self.book is not None:
+            # Decode only this chapter from the mapped file
+            next_start = self.chapters[index + 1][0] if index + 1 < len(self.chapters) else None
+            return self.book.decode(start, next_start)
+        
         # Handle edge case where the last chapter goes to the end of the text
         if index == len(self.chapters) - 1:
             return self.text[start:]
@@ -61,16 +291,19 @@ class ChapterManager:
     def next_chapter(self) -> int:
         if self.current_chapter_index < len(self.chapters) - 1:
             self.current_chapter_index += 1
+            self._remember_chapter()
         return self.current_chapter_index
  
     def prev_chapter(self) -> int:
         if self.current_chapter_index > 0:
             self.current_chapter_index -= 1
+            self._remember_chapter()
         return self.current_chapter_index
  
     def set_current_chapter(self, index: int) -> int:
         if 0 <= index < len(self.chapters):
             self.current_chapter_index = index
+            self._remember_chapter()
         return self.current_chapter_index
     
     def get_current_chapter_index(self) -> int:
@@ -79,11 +312,18 @@ class ChapterManager:
     @property
     def detection_methods(self) -> List[str]:
         """Get available chapter detection methods"""
-        return list(CHAPTER_MATCHERS.keys())
+        return [AUTO_DETECTION_METHOD] + list(CHAPTER_MATCHERS.keys())
  
     def set_detection_method(self, method: str) -> None:
         """Set the chapter detection method"""
-        if method in CHAPTER_MATCHERS:
+        if method in CHAPTER_MATCHERS or method == AUTO_DETECTION_METHOD:
             self._detection_method = method
-            if self.text:  # Re-detect chapters if we have text
+            if self.book is not None:
+                # Evaluate every method in one scan so later switches are cache hits
+                self._scan_book(list(CHAPTER_MATCHERS))
+                self.detect_and_set_chapters()
+            elif self.text:  # Re-detect chapters if we have text
+                if self._detector is not None and self._detector.text is self.text:
+                    # Evaluate every method at once so later switches are cache hits
+                    self._detector.detect_all()
                 self.detect_and_set_chapters()
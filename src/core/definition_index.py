@@ -0,0 +1,260 @@
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from src.core.search_index import NGramIndex
+
+# Bump when the layout of stored indexes changes
+INDEX_VERSION = 2
+
+DEFAULT_INDEX_DIRECTORY = os.path.join(os.path.expanduser("~"), ".zxreader", "definition_index")
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def normalize_text(text: str) -> str:
+    """Lowercase text in composed form, so accents typed either way compare equal."""
+    return unicodedata.normalize("NFC", text.lower())
+
+def fold_diacritics(text: str) -> str:
+    """
+    Strip diacritics so "kiếm", "kiềm" and "kiem" compare equal.
+
+    Args:
+        text (str): Normalized text
+
+    Returns:
+        str: Text without combining marks, with đ written as d
+    """
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).replace("đ", "d")
+
+def definition_tokens(definition: str) -> Set[str]:
+    """
+    Split a definition into the tokens it is indexed under.
+
+    Vietnamese syllables are indexed with and without their diacritics,
+    English words as they are, all in lowercase.
+
+    Args:
+        definition (str): Definition text
+
+    Returns:
+        Set[str]: Index tokens
+    """
+    tokens = set(TOKEN_PATTERN.findall(normalize_text(definition)))
+    tokens.update([fold_diacritics(token) for token in tokens])
+    return tokens
+
+def contains_phrase(definition: str, query: str) -> bool:
+    """
+    Check that the tokens of a query appear consecutively in a definition.
+
+    Diacritics are ignored when the query has none, like in the index.
+
+    Args:
+        definition (str): Definition text
+        query (str): Words to search for
+
+    Returns:
+        bool: Whether the definition contains the query as a phrase
+    """
+    query = normalize_text(query)
+    definition = normalize_text(definition)
+    if fold_diacritics(query) == query:
+        definition = fold_diacritics(definition)
+    query_tokens = " ".join(TOKEN_PATTERN.findall(query))
+    return f" {query_tokens} " in " " + " ".join(TOKEN_PATTERN.findall(definition)) + " "
+
+class DefinitionIndex:
+    """
+    Inverted index from definition tokens to the words of one dictionary.
+
+    A query without diacritics matches every accented form, one with
+    diacritics only the exact form. The index is built in a background
+    thread and stored as JSON in the index directory, keyed by dictionary
+    name and valid for the size and mtime the source file had when the
+    indexed version of the dictionary was read from it.
+    """
+    def __init__(self, name: str, source_stat: Optional[Tuple[int, int]] = None,
+                 dictionary_version: int = 0, index_directory: str = DEFAULT_INDEX_DIRECTORY):
+        self.name = name
+        # file_stat of the source taken before the dictionary was read, None if unknown
+        self.source_stat = source_stat
+        # Registry version of the dictionary that is indexed
+        self.dictionary_version = dictionary_version
+        self.index_directory = index_directory
+        self.words: List[str] = []
+        self.postings: Dict[str, array] = {}
+        # Bigram index of the tokens, for fuzzy lookups
+        self.vocabulary: Optional[NGramIndex] = None
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def _index_path(self) -> str:
+        return os.path.join(self.index_directory, self.name + ".json")
+
+    def build(self, entries: Iterable[Tuple[str, str]]) -> None:
+        """
+        Index (word, definition) entries, replacing the current index.
+
+        Args:
+            entries (Iterable[Tuple[str, str]]): Dictionary entries
+        """
+        words: List[str] = []
+        postings: Dict[str, array] = {}
+        for word, definition in entries:
+            if not definition:
+                continue
+            word_id = len(words)
+            words.append(word)
+            for token in definition_tokens(definition):
+                ids = postings.get(token)
+                if ids is None:
+                    ids = postings[token] = array("i")
+                ids.append(word_id)
+        self.words = words
+        self.postings = postings
+
+    def load(self) -> bool:
+        """
+        Load the stored index if it was built from the same version of the source file.
+
+        Returns:
+            bool: Whether a valid index was loaded
+        """
+        source = self.source_stat
+        if source is None:
+            return False
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if index.get("version") != INDEX_VERSION or [index.get("size"), index.get("mtime_ns")] != list(source):
+            return False
+        self.words = index["words"]
+        self.postings = {token: array("i", ids) for token, ids in index["postings"].items()}
+        return True
+
+    def save(self) -> None:
+        """Store the index, ignoring failures as it can always be rebuilt."""
+        source = self.source_stat
+        if source is None:
+            return
+        path = self._index_path()
+        try:
+            os.makedirs(self.index_directory, exist_ok=True)
+            temp_path = path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": INDEX_VERSION,
+                    "size": source[0],
+                    "mtime_ns": source[1],
+                    "words": self.words,
+                    "postings": {token: ids.tolist() for token, ids in self.postings.items()},
+                }, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except OSError as e:
+            self.logger.warning(f"Could not save definition index for {self.name}: {e}")
+
+    def start(self, entries: Callable[[], Iterable[Tuple[str, str]]]) -> None:
+        """
+        Load or build the index in a background thread.
+
+        Args:
+            entries (Callable): Returns the dictionary entries, only called if the index is rebuilt
+        """
+        if self._thread is not None:
+            return
+
+        def run():
+            try:
+                if not self.load():
+                    self.build(entries())
+                    self.save()
+                self.vocabulary = NGramIndex(self.postings)
+                self.logger.info(f"Definition index for {self.name} ready with {len(self.postings)} tokens")
+            except Exception as e:
+                self.logger.error(f"Error indexing definitions of {self.name}: {e}")
+            finally:
+                self._ready.set()
+
+        self._thread = threading.Thread(target=run, name=f"definition-index-{self.name}", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the index is ready, returning whether it is."""
+        return self._ready.wait(timeout)
+
+    def lookup(self, query: str) -> List[str]:
+        """
+        Find the words whose definitions contain every token of the query.
+
+        Args:
+            query (str): Words to search for
+
+        Returns:
+            List[str]: Matching words in dictionary order
+        """
+        tokens = TOKEN_PATTERN.findall(normalize_text(query))
+        if not tokens:
+            return []
+        # Start from the rarest token
+        lists = sorted((self.postings.get(token, ()) for token in tokens), key=len)
+        if not lists[0]:
+            return []
+        ids = set(lists[0])
+        for other in lists[1:]:
+            ids.intersection_update(other)
+            if not ids:
+                return []
+        return [self.words[word_id] for word_id in sorted(ids)]
+
+    def fuzzy_lookup(self, query: str, max_distance: int) -> List[str]:
+        """
+        Find the words whose definitions contain tokens close to every token of the query.
+
+        Each query token matches the tokens within max_distance edits of it,
+        with the same handling of diacritics as lookup. Tokens do not have
+        to appear as a phrase.
+
+        Args:
+            query (str): Words to search for
+            max_distance (int): Largest number of edits per token
+
+        Returns:
+            List[str]: Matching words, those with the fewest edits in total first
+        """
+        tokens = TOKEN_PATTERN.findall(normalize_text(query))
+        if not tokens or self.vocabulary is None:
+            return []
+        distances: Optional[Dict[int, int]] = None
+        for token in tokens:
+            accept = None
+            if fold_diacritics(token) == token:
+                accept = lambda candidate: fold_diacritics(candidate) == candidate
+            # Closest match of the token in each definition, matches come closest first
+            token_distances: Dict[int, int] = {}
+            for similar, distance in self.vocabulary.search(token, max_distance, accept):
+                for word_id in self.postings[similar]:
+                    token_distances.setdefault(word_id, distance)
+            if distances is None:
+                distances = token_distances
+            else:
+                distances = {
+                    word_id: total + token_distances[word_id]
+                    for word_id, total in distances.items()
+                    if word_id in token_distances
+                }
+            if not distances:
+                return []
+        return [self.words[word_id] for word_id in sorted(distances, key=lambda word_id: (distances[word_id], word_id))]
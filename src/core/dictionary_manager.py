@@ -4,9 +4,15 @@ import logging
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from src.QTEngine.models.trie import Trie
+from src.QTEngine.src.dictionary_registry import DictionaryRegistry, file_stat
+from src.core.dictionary_readers import DictionaryReader, find_reader, open_dictionary
+from src.core.definition_index import DefinitionIndex, TOKEN_PATTERN, contains_phrase, fold_diacritics, normalize_text
+from src.core.hanviet import HanVietConverter
+from src.core.pinyin import strip_tones, to_marked_pinyin
+from src.core.search_index import ReadingIndex
 from PyQt5.QtWidgets import QFileDialog, QApplication
 import sys
-from typing import Dict, Optional, List, Tuple
+from typing import Dict, Optional, List, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
@@ -14,248 +20,189 @@ class DictionaryManager:
     # Define the order of dictionaries for display
     DICTIONARY_ORDER = ['Names', 'Names2', 'VietPhrase', 'LacViet', 'ThieuChuu', 'Babylon', 'Cedict']
 
+    # Dictionaries loaded by QTEngine's DataLoader
+    QT_ENGINE_DICTIONARIES = ['Names', 'Names2', 'VietPhrase']
+
+    # Maximum number of words returned per dictionary by the searches
+    SEARCH_LIMIT = 100
+
     def __init__(self):
         """Initializes the Dictionary Manager."""
-        from src.QTEngine.src.data_loader import DataLoader
-        
         logger.info("Initializing DictionaryManager")
-        self.dictionaries = {}
+        # Dictionaries are shared with QTEngine through the registry, so they
+        # are loaded once and a reload triggered by either side reaches both
+        self.registry = DictionaryRegistry()
+        self.dictionary_paths: Dict[str, str] = {}
+        # Reverse lookup indexes, created on the first search in definitions
+        self._definition_indexes: Dict[str, DefinitionIndex] = {}
+        # Words by Hán Việt and pinyin reading, created on the first search by reading
+        self._hanviet_indexes: Dict[str, ReadingIndex] = {}
+        self._pinyin_indexes: Dict[str, ReadingIndex] = {}
+        self._hanviet_converter: Optional[HanVietConverter] = None
+        self.registry.subscribe(self._on_dictionary_published)
         
-        # Get dictionaries from QTEngine's singleton DataLoader
-        data_loader = DataLoader()
-        if data_loader.loaded_data:
-            logger.info("Reusing dictionaries from QTEngine's DataLoader")
-            self.names2_trie, self.names_trie, self.viet_phrase_trie, self.chinese_phien_am_data, _ = data_loader.loaded_data
-            # Map to our dictionary structure
-            self.qt_engine_dictionaries = {
-                'Names2': self.names2_trie,
-                'Names': self.names_trie,
-                'VietPhrase': self.viet_phrase_trie
-            }
-        else:
-            logger.warning("QTEngine dictionaries not loaded, initializing empty")
-            self.qt_engine_dictionaries = {}
-            self.chinese_phien_am_data = {}
+        if not self.qt_engine_dictionaries:
+            logger.warning("QTEngine dictionaries not loaded yet, they are used once QTEngine loads them")
             
         self.load_dictionaries()
 
-    def load_dictionaries(self, specific_file: Optional[str] = None):
+    @property
+    def qt_engine_dictionaries(self) -> Dict[str, Trie]:
+        """Current versions of the QTEngine dictionaries that are loaded."""
+        return {
+            name: self.registry.get(name)
+            for name in self.QT_ENGINE_DICTIONARIES
+            if self.registry.get(name) is not None
+        }
+
+    @property
+    def dictionaries(self) -> Dict[str, DictionaryReader]:
+        """Current versions of the dictionaries from the dictionaries folder that are loaded."""
+        return {
+            name: self.registry.get(name)
+            for name in self.dictionary_paths
+            if self.registry.get(name) is not None
+        }
+
+    @property
+    def chinese_phien_am_data(self) -> Dict[str, str]:
+        """Hán Việt reading of each character, loaded by QTEngine."""
+        return self.registry.get('ChinesePhienAm') or {}
+
+    @property
+    def hanviet_converter(self) -> HanVietConverter:
+        """Converter for the current ChinesePhienAm table, replaced when the table is reloaded."""
+        phien_am = self.chinese_phien_am_data
+        if self._hanviet_converter is None or self._hanviet_converter.phien_am is not phien_am:
+            self._hanviet_converter = HanVietConverter(phien_am)
+        return self._hanviet_converter
+
+    @property
+    def generation(self) -> int:
+        """Changes whenever a dictionary is reloaded, so lookup results can be cached per generation."""
+        return self.registry.generation
+
+    def _on_dictionary_published(self, name: str, dictionary):
+        """Drop the search indexes of a dictionary that was replaced."""
+        self._definition_indexes.pop(name, None)
+        self._hanviet_indexes.pop(name, None)
+        self._pinyin_indexes.pop(name, None)
+        if name == 'ChinesePhienAm':
+            # Every Hán Việt reading may have changed
+            self._hanviet_indexes.clear()
+
+    def _reload_qt_engine_file(self, filename: str, force: bool = False):
+        """
+        Reload a QTEngine data file through QTEngine's DataLoader.
+
+        The DataLoader skips files that did not change since they were
+        loaded and publishes the others to the registry.
+
+        Args:
+            filename (str): Name of the file in QTEngine's data folder
+            force (bool): Reload even if the file looks unchanged, for files the app wrote
+        """
+        from src.QTEngine.src.data_loader import DataLoader, DataLoadError
+
+        data_loader = DataLoader()
+        if data_loader.loaded_data is None:
+            logger.warning(f"QTEngine dictionaries not loaded, not reloading {filename}")
+            return
+        try:
+            data_loader.load_data(specific_file=filename, force=force)
+        except DataLoadError as e:
+            logger.error(f"Error reloading {filename}: {e}")
+
+    def load_dictionaries(self, specific_file: Optional[str] = None, force: bool = False):
         """
         Loads dictionaries from the dictionaries folder and QTEngine.
         
         Args:
             specific_file (Optional[str]): If provided, only reload this specific dictionary
+            force (bool): Reload specific_file even if it looks unchanged, for files the app wrote
         """
-        self._loading_start_time = time.time()
+        from src.QTEngine.src.data_loader import DATA_FILE_KEYS
+
         logger.info("Starting dictionary loading process")
         
+        if specific_file:
+            if specific_file in DATA_FILE_KEYS:
+                self._reload_qt_engine_file(specific_file, force)
+            return
+
+        # QTEngine data files edited outside the app, e.g. by sync_custom_names
+        for filename in DATA_FILE_KEYS:
+            self._reload_qt_engine_file(filename)
+
         # Get the project root directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(os.path.dirname(current_dir))
         
-        if specific_file:
-            # Handle QTEngine dictionaries
-            qt_engine_data_folder = os.path.join(project_root, 'src', 'QTEngine', 'data')
-            qt_engine_files = {
-                'Names': 'Names.txt',
-                'Names2': 'Names2.txt',
-                'VietPhrase': 'VietPhrase.txt'
-            }
-            
-            # Check if it's a QTEngine dictionary
-            for dict_name, filename in qt_engine_files.items():
-                if filename == specific_file:
-                    filepath = os.path.join(qt_engine_data_folder, filename)
-                    if os.path.exists(filepath):
-                        self.qt_engine_dictionaries[dict_name] = self.load_dictionary(filepath)
-                    return
+        # Load all dictionaries in parallel
+        dictionaries_folder = os.path.join(project_root, 'dictionaries')
+        if os.path.exists(dictionaries_folder):
+            # Collect dictionary files that changed since they were loaded
+            dictionary_files = []
+            for filename in os.listdir(dictionaries_folder):
+                filepath = os.path.join(dictionaries_folder, filename)
+                reader_class = find_reader(filepath)
+                if reader_class is not None:
+                    dictionary_name = reader_class.dictionary_name(filepath)
+                    self.dictionary_paths[dictionary_name] = filepath
+                    if not self.registry.is_current(dictionary_name, filepath):
+                        # Taken before reading, so a file edited while loading is reloaded next time
+                        dictionary_files.append((dictionary_name, filepath, file_stat(filepath)))
             
-            # Check if it's ChinesePhienAmWords
-            if specific_file == 'ChinesePhienAmWords.txt':
-                chinese_phien_am_path = os.path.join(qt_engine_data_folder, 'ChinesePhienAmWords.txt')
-                if os.path.exists(chinese_phien_am_path):
-                    self.load_chinese_phien_am(chinese_phien_am_path)
-                return
-        else:
-            # Load all dictionaries in parallel
-            dictionaries_folder = os.path.join(project_root, 'dictionaries')
-            if os.path.exists(dictionaries_folder):
-                # Collect dictionary files
-                dictionary_files = []
-                for filename in os.listdir(dictionaries_folder):
-                    if filename.endswith('.txt') or filename.endswith('cedict_ts.u8'):
-                        filepath = os.path.join(dictionaries_folder, filename)
-                        dictionary_name = filename[:-4] if filename.endswith('.txt') else 'Cedict'
-                        dictionary_files.append((dictionary_name, filepath))
+            # Load dictionaries in parallel
+            parallel_start = time.time()
+            logger.info("Starting parallel dictionary loading")
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                # Submit all load tasks
+                future_to_dict = {
+                    executor.submit(self.load_dictionary, filepath): (name, filepath, source_stat)
+                    for name, filepath, source_stat in dictionary_files
+                }
                 
-                # Load dictionaries in parallel
-                parallel_start = time.time()
-                logger.info("Starting parallel dictionary loading")
-                with ThreadPoolExecutor(max_workers=4) as executor:
-                    # Submit all load tasks
-                    load_start = time.time()
-                    future_to_dict = {
-                        executor.submit(self.load_dictionary, filepath): (name, filepath)
-                        for name, filepath in dictionary_files
-                    }
-                    
-                    # Process results as they complete
-                    for future in as_completed(future_to_dict):
-                        name, filepath = future_to_dict[future]
-                        try:
-                            trie = future.result()
-                            self.dictionaries[name] = trie
-                            word_count = len(trie.get_all_words())
-                            logger.info(f"Dictionary {name} loaded with {word_count} words")
-                        except Exception as e:
-                            logger.error(f"Error loading dictionary {name}: {e}")
-                
-                total_load_time = time.time() - parallel_start
-                logger.info(f"All external dictionaries loaded in parallel in {total_load_time:.2f}s")
-
-            # Skip loading QTEngine dictionaries since we're using the singleton instance
-            if not self.qt_engine_dictionaries:
-                logger.warning("QTEngine dictionaries not available from singleton, skipping")
+                # Process results as they complete
+                for future in as_completed(future_to_dict):
+                    name, filepath, source_stat = future_to_dict[future]
+                    try:
+                        dictionary = future.result()
+                        self.registry.publish(name, dictionary, filepath, source_stat)
+                        logger.info(f"Dictionary {name} loaded with {dictionary.count()} words")
+                    except Exception as e:
+                        logger.error(f"Error loading dictionary {name}: {e}")
+            
+            total_load_time = time.time() - parallel_start
+            logger.info(f"All external dictionaries loaded in parallel in {total_load_time:.2f}s")
 
-    def load_dictionary(self, filepath: str, buffer_size: int = 1024*1024) -> Trie:
+    def load_dictionary(self, filepath: str) -> Union[Trie, DictionaryReader]:
         """
-        Loads a dictionary from a given file with optimized buffering and batch processing.
+        Opens a dictionary from a given file with the reader registered for its format.
+
+        Readers search an index stored next to the file and only decode the
+        definitions they return, so large dictionaries open quickly.
 
         Args:
             filepath (str): The path to the dictionary file.
-            buffer_size (int): Size of read buffer in bytes (default 1MB).
 
         Returns:
-            Trie: A Trie object containing the dictionary data.
+            Union[Trie, DictionaryReader]: The dictionary, an empty Trie if the file could not be read.
         """
-        trie = Trie()
         try:
-            if filepath.endswith('cedict_ts.u8'):
-                return self.load_cedict_dictionary(filepath)
-
-            # Pre-allocate lists for batch processing
-            entries = []
-            translation_table = str.maketrans({'\\': '\n', '\t': '    '})
-            
-            # Use buffered reading for better I/O performance
-            with open(filepath, 'r', encoding='utf-8-sig', buffering=buffer_size) as f:
-                # Read file in chunks
-                chunk = f.read(buffer_size)
-                buffer = ""
-                
-                while chunk:
-                    buffer += chunk
-                    lines = buffer.split('\n')
-                    
-                    # Process all complete lines
-                    for line in lines[:-1]:
-                        if '=' in line:  # Fast check without strip()
-                            word, definition = line.split('=', 1)
-                            if word and definition:  # Valid entry check
-                                # Use translate instead of multiple replaces
-                                definition = definition.translate(translation_table)
-                                entries.append((word.strip(), definition.strip()))
-                    
-                    # Keep the partial last line
-                    buffer = lines[-1]
-                    chunk = f.read(buffer_size)
-                
-                # Process the last line if any
-                if buffer and '=' in buffer:
-                    word, definition = buffer.split('=', 1)
-                    if word and definition:
-                        definition = definition.translate(translation_table)
-                        entries.append((word.strip(), definition.strip()))
-            
-            # Batch insert all entries at once using optimized method
-            if entries:
-                logger.debug(f"Batch inserting {len(entries)} entries from {filepath}")
-                trie.batch_insert(entries)
+            return open_dictionary(filepath)
         except Exception as e:
             print(f"Error loading dictionary from {filepath}: {e}")
-        return trie
+        return Trie()
 
-    def load_cedict_dictionary(self, filepath: str) -> Trie:
+    def dictionary_order(self) -> List[str]:
         """
-        Loads the CC-CEDICT dictionary from a given file.
-
-        Args:
-            filepath (str): The path to the cedict file.
+        Names of the dictionaries in display order.
 
         Returns:
-            Trie: A Trie object containing the dictionary data.
+            List[str]: DICTIONARY_ORDER followed by the other loaded dictionaries in name order
         """
-        trie = Trie()
-        entries = []
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):  # Skip comments and empty lines
-                        continue
-                        
-                    parts = line.split(' ', 2)  # Split into traditional, simplified, and rest
-                    if len(parts) < 3:
-                        continue
-                        
-                    traditional = parts[0]
-                    simplified = parts[1]
-                    rest = parts[2]
-                    
-                    # Extract pinyin and definition
-                    pinyin_end = rest.find(']')
-                    if pinyin_end == -1:
-                        continue
-                        
-                    pinyin = rest[1:pinyin_end]  # Remove brackets
-                    definition = rest[pinyin_end + 2:]  # Skip '] ' to get definition
-                    
-                    # Store raw data for formatting in dictionary panel
-                    entry_data = str({  # Pre-convert to string
-                        'traditional': traditional,
-                        'simplified': simplified,
-                        'pinyin': pinyin,
-                        'definition': definition
-                    })
-                    
-                    # Collect both traditional and simplified entries
-                    entries.append((traditional, entry_data))
-                    if simplified != traditional:
-                        entries.append((simplified, entry_data))
-                
-            # Batch insert all entries at once
-            if entries:
-                logger.debug(f"Batch inserting {len(entries)} entries from CEDICT")
-                trie.batch_insert(entries)
-                                    
-        except Exception as e:
-            print(f"Error loading CC-CEDICT dictionary from {filepath}: {e}")
-        return trie
-
-    def load_chinese_phien_am(self, filepath: str):
-        """
-        Loads the ChinesePhienAmWords dictionary.
-
-        Args:
-            filepath (str): Path to the ChinesePhienAmWords.txt file
-        """
-        try:
-            with open(filepath, 'r', encoding='utf-8-sig') as f:
-                for line in f:
-                    parts = line.strip().split('=', 1)
-                    if len(parts) == 2:
-                        word, phien_am = parts
-                        self.chinese_phien_am_data[word] = phien_am
-            entry_count = len(self.chinese_phien_am_data)
-            logger.info(f"Loaded ChinesePhienAmWords with {entry_count} entries")
-        except Exception as e:
-            logger.error(f"Error loading ChinesePhienAmWords from {filepath}: {e}")
-        
-        # Log total loading time at the end of dictionary loading
-        if hasattr(self, '_loading_start_time'):
-            total_time = time.time() - self._loading_start_time
-            logger.info(f"Total dictionary loading completed in {total_time:.2f}s")
-            delattr(self, '_loading_start_time')  # Clean up timing variable
+        return self.DICTIONARY_ORDER + sorted(name for name in self.dictionary_paths if name not in self.DICTIONARY_ORDER)
 
     def find_longest_prefix_match(self, text: str, dictionary: Trie) -> Optional[Tuple[str, str]]:
         """
@@ -283,62 +230,258 @@ class DictionaryManager:
 
         Returns:
             Dict[str, str]: A dictionary containing definitions from different dictionaries.
+            Cedict definitions are CedictEntry records.
         """
         results = {}
         
         # Follow the defined dictionary order
-        for name in self.DICTIONARY_ORDER:
+        for name in self.dictionary_order():
             # Skip if already found in this dictionary
             if name in results:
                 continue
                 
-            # Check QTEngine dictionaries first
-            if name in self.qt_engine_dictionaries:
-                match = self.find_longest_prefix_match(word, self.qt_engine_dictionaries[name])
-                if match:  # Only exact matches
-                    results[name] = match[1]
-                    
-            # Then check external dictionaries
-            elif name in self.dictionaries:
-                match = self.find_longest_prefix_match(word, self.dictionaries[name])
+            dictionary = self.registry.get(name)
+            if dictionary is not None:
+                match = self.find_longest_prefix_match(word, dictionary)
                 if match:  # Only exact matches
                     results[name] = match[1]
         return results
 
-    def search_in_definitions(self, query: str) -> Dict[str, List[Tuple[str, str]]]:
+    def lookup_prefixes(self, word: str) -> List[Tuple[str, Dict[str, str]]]:
+        """
+        Look up every prefix of a word in all dictionaries.
+
+        Each dictionary is walked once along the word instead of once per
+        prefix, so a selection of n characters costs one walk per dictionary.
+
+        Args:
+            word (str): The word whose prefixes to look up.
+
+        Returns:
+            List[Tuple[str, Dict[str, str]]]: (prefix, definitions by dictionary) for each
+            prefix with at least one definition, longest prefix first. Definitions follow
+            dictionary_order like lookup_word.
+        """
+        hits: Dict[int, Dict[str, str]] = {}
+        for name in self.dictionary_order():
+            dictionary = self.registry.get(name)
+            if dictionary is None:
+                continue
+            for length, definition in dictionary.find_prefixes(word):
+                hits.setdefault(length, {})[name] = definition
+        return [(word[:length], hits[length]) for length in sorted(hits, reverse=True)]
+
+    def _loaded_dictionaries(self) -> List[Tuple[str, Union[Trie, DictionaryReader]]]:
+        """Name and current version of every loaded dictionary, QTEngine ones first."""
+        return list(self.qt_engine_dictionaries.items()) + list(self.dictionaries.items())
+
+    def _definition_index(self, name: str, dictionary: Trie) -> DefinitionIndex:
+        """Return the definition index of a dictionary, starting to build it if needed."""
+        version = self.registry.version(name)
+        index = self._definition_indexes.get(name)
+        if index is None or index.dictionary_version != version:
+            # The stat the registry recorded describes the loaded version, not the file as it is now
+            index = DefinitionIndex(name, self.registry.source_stat(name), version)
+            index.start(lambda: [(word, str(value)) for word, value in dictionary.get_all_words()])
+            self._definition_indexes[name] = index
+        return index
+
+    def start_definition_indexing(self):
+        """Load or build the definition indexes of all dictionaries in the background."""
+        for name, dictionary in self._loaded_dictionaries():
+            self._definition_index(name, dictionary)
+
+    def search_in_definitions(self, query: str, timeout: Optional[float] = None, max_distance: int = 0,
+                              limit: Optional[int] = None) -> Dict[str, List[Tuple[str, str]]]:
         """
         Search for a query string within dictionary definitions.
 
+        Looks the query words up in an inverted index of definition tokens,
+        so "kiem" finds every word translated as kiếm, kiềm or kiểm while
+        "kiếm" only finds kiếm. Queries of several words must appear as a
+        phrase. The indexes are built on the first search.
+
+        With max_distance, query words also match definition words a few
+        edits away, so a misspelt "nguyeen" still finds nguyên, and need not
+        appear as a phrase.
+
         Args:
             query (str): The text to search for.
+            timeout (Optional[float]): Seconds to wait for each index, dictionaries
+                whose index is not ready in time are skipped.
+            max_distance (int): Edits allowed per query word, 0 for exact words.
+            limit (Optional[int]): Maximum number of words per dictionary.
 
         Returns:
-            Dict[str, List[Tuple[str, str]]]: Dictionary name -> list of (word, definition) pairs.
+            Dict[str, List[Tuple[str, str]]]: Dictionary name -> list of (word, definition) pairs,
+            closest first when max_distance is given.
         """
         results = {}
-        
-        # Search in QTEngine dictionaries
-        for name, dictionary in self.qt_engine_dictionaries.items():
+        if not TOKEN_PATTERN.search(query):
+            return results
+
+        self.start_definition_indexing()
+        is_phrase = len(TOKEN_PATTERN.findall(query)) > 1
+        for name, dictionary in self._loaded_dictionaries():
+            index = self._definition_indexes[name]
+            if not index.wait(timeout):
+                logger.info(f"Definition index for {name} not ready, skipping it")
+                continue
             matches = []
-            for word in dictionary.get_all_words():
-                definition = dictionary.search(word)
-                if definition and query.lower() in definition.lower():
+            words = index.fuzzy_lookup(query, max_distance) if max_distance else index.lookup(query)
+            for word in words:
+                value = dictionary.find(word)
+                definition = str(value) if value is not None else None
+                if definition and (max_distance or not is_phrase or contains_phrase(definition, query)):
                     matches.append((word, definition))
+                    if len(matches) == limit:
+                        break
+            if matches:
+                results[name] = matches
+
+        return results
+
+    def search_words(self, prefix: str, limit: int = SEARCH_LIMIT) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Find the words that start with a prefix in all dictionaries.
+
+        Args:
+            prefix (str): Start of the words to find.
+            limit (int): Maximum number of words per dictionary.
+
+        Returns:
+            Dict[str, List[Tuple[str, str]]]: Dictionary name -> list of (word, definition) pairs.
+        """
+        results = {}
+        prefix = prefix.strip()
+        if not prefix:
+            return results
+        for name, dictionary in self._loaded_dictionaries():
+            matches = [(word, str(value)) for word, value in dictionary.find_words_with_prefix(prefix, limit)]
             if matches:
                 results[name] = matches
+        return results
+
+    def hanviet_reading(self, word: str) -> Optional[str]:
+        """
+        Hán Việt reading of a word as searched by search_hanviet.
+
+        Args:
+            word (str): Chinese word
+
+        Returns:
+            Optional[str]: Lowercase readings of its characters separated by spaces,
+            None if a character has no reading.
+        """
+        phien_am = self.chinese_phien_am_data
+        readings = []
+        for char in word:
+            reading = phien_am.get(char)
+            if not reading:
+                return None
+            readings.append(reading)
+        return normalize_text(" ".join(readings)) if readings else None
+
+    def _hanviet_index(self, name: str, dictionary: Union[Trie, DictionaryReader]) -> ReadingIndex:
+        """Return the Hán Việt index of a dictionary, starting to build it if needed."""
+        index = self._hanviet_indexes.get(name)
+        if index is None:
+            index = ReadingIndex(f"{name}-hanviet", fold_diacritics)
+            index.start(lambda: ((self.hanviet_reading(word), word) for word, _ in dictionary.get_all_words()))
+            self._hanviet_indexes[name] = index
+        return index
+
+    def _pinyin_index(self, name: str, dictionary: DictionaryReader) -> ReadingIndex:
+        """Return the pinyin index of a dictionary, starting to build it if needed."""
+        index = self._pinyin_indexes.get(name)
+        if index is None:
+            index = ReadingIndex(f"{name}-pinyin", strip_tones)
+            # Only entries with a reading, such as those of CC-CEDICT, have pinyin
+            index.start(lambda: (
+                (to_marked_pinyin(value.pinyin), word)
+                for word, value in dictionary.get_all_words()
+                if hasattr(value, 'pinyin')
+            ))
+            self._pinyin_indexes[name] = index
+        return index
 
-        # Search in external dictionaries
+    def start_reading_indexing(self):
+        """Build the Hán Việt and pinyin indexes of all dictionaries in the background."""
+        if self.chinese_phien_am_data:
+            for name, dictionary in self._loaded_dictionaries():
+                self._hanviet_index(name, dictionary)
         for name, dictionary in self.dictionaries.items():
+            self._pinyin_index(name, dictionary)
+
+    def _search_readings(self, indexes: Dict[str, ReadingIndex], query: str, limit: int,
+                         timeout: Optional[float]) -> Dict[str, List[Tuple[str, str]]]:
+        """Search the reading indexes of the loaded dictionaries, see search_hanviet."""
+        results = {}
+        for name, dictionary in self._loaded_dictionaries():
+            index = indexes.get(name)
+            if index is None:
+                continue
+            if not index.wait(timeout):
+                logger.info(f"Reading index {index.name} not ready, skipping it")
+                continue
             matches = []
-            for word in dictionary.get_all_words():
-                definition = dictionary.search(word)
-                if definition and query.lower() in definition.lower():
-                    matches.append((word, definition))
+            for word, _ in index.search(query, limit):
+                value = dictionary.find(word)
+                if value is not None:
+                    matches.append((word, str(value)))
             if matches:
                 results[name] = matches
-
         return results
 
+    def search_hanviet(self, query: str, limit: int = SEARCH_LIMIT,
+                       timeout: Optional[float] = None) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Find the words whose Hán Việt reading starts with the query.
+
+        Letters typed without diacritics match any diacritics, so "nhat tam"
+        finds 一心 (nhất tâm) while "nhật" only finds readings with nhật.
+        The indexes are built on the first search.
+
+        Args:
+            query (str): Start of a Hán Việt reading, syllables separated by spaces.
+            limit (int): Maximum number of words per dictionary.
+            timeout (Optional[float]): Seconds to wait for each index, dictionaries
+                whose index is not ready in time are skipped.
+
+        Returns:
+            Dict[str, List[Tuple[str, str]]]: Dictionary name -> list of (word, definition) pairs,
+            words whose reading equals the query first.
+        """
+        query = " ".join(normalize_text(query).split())
+        if not query:
+            return {}
+        self.start_reading_indexing()
+        return self._search_readings(self._hanviet_indexes, query, limit, timeout)
+
+    def search_pinyin(self, query: str, limit: int = SEARCH_LIMIT,
+                      timeout: Optional[float] = None) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Find the words whose pinyin starts with the query, in dictionaries that give pinyin.
+
+        Tones can be written with marks ("nǐ hǎo") or numbers ("ni3 hao3"),
+        or left out for any tone ("nihao", "ni hao3"). ü can be typed as v.
+
+        Args:
+            query (str): Start of a pinyin reading.
+            limit (int): Maximum number of words per dictionary.
+            timeout (Optional[float]): Seconds to wait for each index, dictionaries
+                whose index is not ready in time are skipped.
+
+        Returns:
+            Dict[str, List[Tuple[str, str]]]: Dictionary name -> list of (word, definition) pairs,
+            words whose pinyin equals the query first.
+        """
+        query = to_marked_pinyin(query)
+        if not query:
+            return {}
+        self.start_reading_indexing()
+        return self._search_readings(self._pinyin_indexes, query, limit, timeout)
+
     def sync_custom_names(self):
         """
         Allows users to load a custom Names2.txt file and sync it with QTEngine's Names2.txt.
@@ -358,7 +501,8 @@ class DictionaryManager:
                     qt_engine_file.write(custom_names)
                 
                 print(f"Successfully synced custom Names2.txt with QTEngine's Names2.txt")
-                # Reload the dictionaries
+                # Reload the dictionaries, Names2.txt even if its size and mtime look unchanged
+                self._reload_qt_engine_file('Names2.txt', force=True)
                 self.load_dictionaries()
             except Exception as e:
                 print(f"Error syncing custom Names2.txt: {e}")
@@ -373,12 +517,19 @@ class DictionaryManager:
         Returns:
             str: The Hán Việt reading of the text
         """
-        result = []
-        for char in text:
-            hanviet = self.chinese_phien_am_data.get(char, char)
-            result.append(hanviet)
-        
-        return ' '.join(result)
+        return self.hanviet_converter.convert(text)
+
+    def convert_chapter_to_hanviet(self, text: str) -> List[str]:
+        """
+        Convert a whole chapter to Hán Việt at once, for showing each line with its reading.
+
+        Args:
+            text (str): The Chinese text of the chapter
+
+        Returns:
+            List[str]: The Hán Việt reading of each line, in the format of convert_to_hanviet
+        """
+        return self.hanviet_converter.convert_lines(text)
 
     def add_to_dictionary(self, dictionary_name: str, word: str, definition: str) -> bool:
         """
@@ -425,8 +576,8 @@ class DictionaryManager:
             with open(dictionary_path, 'w', encoding='utf-8') as f:
                 f.writelines(lines)
             
-            # Only reload the specific dictionary
-            self.load_dictionaries(specific_file=filename)
+            # Only reload the specific dictionary, even if its size and mtime look unchanged
+            self.load_dictionaries(specific_file=filename, force=True)
             
             return True
             
@@ -445,8 +596,8 @@ class DictionaryManager:
         Returns:
             Optional[str]: Definition if found, None otherwise
         """
-        if dictionary_name in self.qt_engine_dictionaries:
-            match = self.find_longest_prefix_match(word, self.qt_engine_dictionaries[dictionary_name])
+        if dictionary_name in self.QT_ENGINE_DICTIONARIES and self.registry.get(dictionary_name) is not None:
+            match = self.find_longest_prefix_match(word, self.registry.get(dictionary_name))
             if match and match[0] == word:  # Only return if exact match
                 return match[1]
         return None
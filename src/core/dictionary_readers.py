@@ -0,0 +1,428 @@
+import gzip
+import html
+import mmap
+import os
+import re
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type, Union
+from src.core.key_index import INDEX_SUFFIX, KeyIndex
+from src.QTEngine.models.cedict import CedictEntry, parse_cedict_line
+from src.QTEngine.src.dictionary_parser import iter_entry_spans, iter_lines, parse_entries
+from src.QTEngine.src.dictionary_registry import file_stat
+
+# Applied to key=definition definitions when they are read, like the trie loader did
+DEFINITION_TABLE = str.maketrans({"\\": "\n", "\t": "    "})
+
+# StarDict field types holding text, and those of them holding markup
+STARDICT_TEXT_TYPES = "mltygxhkw"
+STARDICT_MARKUP_TYPES = "gxhkw"
+MARKUP_TAG_PATTERN = re.compile(r"<[^>]*>")
+
+class DictionaryReader(ABC):
+    """
+    Read-only dictionary opened from a file.
+
+    Readers provide the read methods of Trie that DictionaryManager uses,
+    so they are interchangeable with the tries of the QTEngine
+    dictionaries. Subclasses registered with register_reader are used for
+    the files whose name ends with one of their suffixes.
+    """
+    # File name endings handled by the reader, in lowercase
+    suffixes: Tuple[str, ...] = ()
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        # Size and mtime of the file when it was opened
+        self.generation = file_stat(file_path)
+
+    @classmethod
+    def matches(cls, file_path: str) -> bool:
+        """Check whether the reader handles a file."""
+        return file_path.lower().endswith(cls.suffixes)
+
+    @classmethod
+    def dictionary_name(cls, file_path: str) -> str:
+        """Name the dictionary of a file is shown under."""
+        name = os.path.basename(file_path)
+        for suffix in cls.suffixes:
+            if name.lower().endswith(suffix):
+                return name[:-len(suffix)]
+        return name
+
+    @classmethod
+    def open(cls, file_path: str) -> "DictionaryReader":
+        """Open the dictionary of a file."""
+        return cls(file_path)
+
+    def is_current(self) -> bool:
+        """Check whether the file is unchanged since the reader opened it."""
+        return file_stat(self.file_path) == self.generation
+
+    @abstractmethod
+    def find(self, word: str) -> Optional[Any]:
+        """Find the definition of a word, or None if it is not in the dictionary."""
+
+    @abstractmethod
+    def find_prefixes(self, text: str) -> List[Tuple[int, Any]]:
+        """Find the length and definition of every word that is a prefix of the text, shortest first."""
+
+    @abstractmethod
+    def find_words_with_prefix(self, prefix: str, limit: Optional[int] = None) -> List[Tuple[str, Any]]:
+        """Find the word and definition of the words that start with a prefix, in code point order."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of words in the dictionary."""
+
+    @abstractmethod
+    def get_all_words(self) -> List[Tuple[str, Any]]:
+        """Read every word and its definition."""
+
+    def contains(self, word: str) -> bool:
+        """Check if a word is in the dictionary."""
+        return self.find(word) is not None
+
+    def find_longest_prefix(self, text: str) -> Tuple[str, Optional[Any]]:
+        """
+        Find the longest prefix of the text that is a word.
+
+        Args:
+            text (str): Text to find prefix in
+
+        Returns:
+            Tuple[str, Optional[Any]]: Longest prefix and its definition
+        """
+        matches = self.find_prefixes(text)
+        if not matches:
+            return "", None
+        length, definition = matches[-1]
+        return text[:length], definition
+
+    def close(self) -> None:
+        """Release the files of the dictionary."""
+
+READERS: List[Type[DictionaryReader]] = []
+
+def register_reader(reader_class: Type[DictionaryReader]) -> Type[DictionaryReader]:
+    """
+    Register a reader for the files it matches, taking precedence over those registered before.
+
+    Can be used as a class decorator.
+    """
+    READERS.append(reader_class)
+    return reader_class
+
+def find_reader(file_path: str) -> Optional[Type[DictionaryReader]]:
+    """Return the reader for a file, or None if no reader handles it."""
+    for reader_class in reversed(READERS):
+        if reader_class.matches(file_path):
+            return reader_class
+    return None
+
+def open_dictionary(file_path: str) -> DictionaryReader:
+    """
+    Open a dictionary file with the reader registered for it.
+
+    Args:
+        file_path (str): Path to the dictionary file
+
+    Returns:
+        DictionaryReader: The opened dictionary
+
+    Raises:
+        ValueError: If no reader handles the file
+    """
+    reader_class = find_reader(file_path)
+    if reader_class is None:
+        raise ValueError(f"No dictionary reader for {file_path}")
+    return reader_class.open(file_path)
+
+class MappedFile:
+    """Read-only memory map of a whole file."""
+    def __init__(self, file_path: str):
+        self._file = open(file_path, "rb")
+        try:
+            # mmap cannot map empty files
+            size = os.fstat(self._file.fileno()).st_size
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        except Exception:
+            self._file.close()
+            raise
+
+    def read(self, start: int, end: int) -> bytes:
+        return self.data[start:end]
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self._file.close()
+
+class DictZipFile:
+    """
+    Random access to the uncompressed content of a dictzip (.dz) file.
+
+    Dictzip files are gzip files compressed in chunks that can be inflated
+    on their own, listed in the RA field of the header, so a range is read
+    by inflating only the chunks it overlaps. A plain gzip file is inflated
+    whole on the first read.
+    """
+    def __init__(self, file_path: str):
+        self._mapped = MappedFile(file_path)
+        data = self._mapped.data
+        if data[:2] != b"\x1f\x8b":
+            self._mapped.close()
+            raise ValueError(f"Not a gzip file: {file_path}")
+
+        flags = data[3]
+        pos = 10
+        self._chunk_length: Optional[int] = None
+        chunk_sizes: Tuple[int, ...] = ()
+        if flags & 4:  # FEXTRA
+            extra_length, = struct.unpack_from("<H", data, pos)
+            extra = data[pos + 2:pos + 2 + extra_length]
+            pos += 2 + extra_length
+            field = 0
+            while field + 4 <= len(extra):
+                field_length, = struct.unpack_from("<H", extra, field + 2)
+                if extra[field:field + 2] == b"RA":
+                    _, self._chunk_length, chunk_count = struct.unpack_from("<HHH", extra, field + 4)
+                    chunk_sizes = struct.unpack_from(f"<{chunk_count}H", extra, field + 10)
+                field += 4 + field_length
+        if flags & 8:  # FNAME
+            pos = data.find(b"\0", pos) + 1
+        if flags & 16:  # FCOMMENT
+            pos = data.find(b"\0", pos) + 1
+        if flags & 2:  # FHCRC
+            pos += 2
+
+        self._chunk_offsets = [pos]
+        for size in chunk_sizes:
+            self._chunk_offsets.append(self._chunk_offsets[-1] + size)
+        self._content: Optional[bytes] = None
+
+    def read(self, start: int, end: int) -> bytes:
+        if start >= end:
+            return b""
+        if self._chunk_length is None:
+            if self._content is None:
+                self._content = gzip.decompress(self._mapped.data[:])
+            return self._content[start:end]
+
+        first = start // self._chunk_length
+        last = min((end - 1) // self._chunk_length, len(self._chunk_offsets) - 2)
+        data = self._mapped.data
+        content = b"".join(
+            zlib.decompressobj(-zlib.MAX_WBITS).decompress(data[self._chunk_offsets[i]:self._chunk_offsets[i + 1]])
+            for i in range(first, last + 1)
+        )
+        base = first * self._chunk_length
+        return content[start - base:end - base]
+
+    def close(self) -> None:
+        self._mapped.close()
+
+class IndexedReader(DictionaryReader):
+    """
+    Dictionary searched in a KeyIndex of its entries.
+
+    The index is stored next to the dictionary file, and entries are read
+    and decoded only when they are returned, so opening the dictionary
+    costs about the same whatever its size.
+    """
+    def __init__(self, file_path: str):
+        super().__init__(file_path)
+        self._index = KeyIndex.open(file_path + INDEX_SUFFIX, self.index_stat(), self.scan)
+
+    def index_stat(self) -> Tuple[int, int]:
+        """Size and mtime of the file the entries are scanned from."""
+        return self.generation
+
+    @abstractmethod
+    def scan(self) -> Iterator[Tuple[str, int, int]]:
+        """Yield the key of every entry with the start and end of its data."""
+
+    @abstractmethod
+    def read(self, start: int, end: int) -> bytes:
+        """Read the data of an entry."""
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        """Turn the data of an entry into its definition."""
+
+    def _definition(self, i: int) -> Any:
+        return self.decode(self.read(*self._index.span(i)))
+
+    def find(self, word: str) -> Optional[Any]:
+        i = self._index.find(word)
+        return None if i is None else self._definition(i)
+
+    def find_prefixes(self, text: str) -> List[Tuple[int, Any]]:
+        return [(length, self._definition(i)) for length, i in self._index.find_prefixes(text)]
+
+    def find_words_with_prefix(self, prefix: str, limit: Optional[int] = None) -> List[Tuple[str, Any]]:
+        positions = self._index.prefix_range(prefix)
+        if limit is not None:
+            positions = positions[:limit]
+        return [(self._word(i), self._definition(i)) for i in positions]
+
+    def count(self) -> int:
+        return len(self._index)
+
+    def get_all_words(self) -> List[Tuple[str, Any]]:
+        return [(self._word(i), self._definition(i)) for i in range(len(self._index))]
+
+    def _word(self, i: int) -> str:
+        return self._index.key(i).decode("utf-8", errors="surrogateescape")
+
+    def close(self) -> None:
+        self._index.close()
+
+@register_reader
+class KeyValueReader(IndexedReader):
+    """Text dictionary with one key=definition entry per line, such as ThieuChuu, Babylon or LacViet."""
+    suffixes = (".txt",)
+
+    def __init__(self, file_path: str):
+        self._source = MappedFile(file_path)
+        try:
+            super().__init__(file_path)
+        except Exception:
+            self._source.close()
+            raise
+
+    def scan(self) -> Iterator[Tuple[str, int, int]]:
+        return iter_entry_spans(self._source.data)
+
+    def read(self, start: int, end: int) -> bytes:
+        return self._source.read(start, end)
+
+    def decode(self, data: bytes) -> str:
+        return data.decode("utf-8", errors="replace").translate(DEFINITION_TABLE).strip()
+
+    def close(self) -> None:
+        super().close()
+        self._source.close()
+
+@register_reader
+class CedictReader(KeyValueReader):
+    """
+    CC-CEDICT file, with entries found under both their traditional and
+    simplified headwords and parsed into a CedictEntry when returned.
+    """
+    suffixes = (".u8",)
+
+    @classmethod
+    def dictionary_name(cls, file_path: str) -> str:
+        return "Cedict"
+
+    def scan(self) -> Iterator[Tuple[str, int, int]]:
+        data = self._source.data
+        for start, end in iter_lines(data):
+            if data[start:start + 1] == b"#":
+                continue
+            first_space = data.find(b" ", start, end)
+            second_space = data.find(b" ", first_space + 1, end) if first_space != -1 else -1
+            if second_space == -1 or data.find(b"]", second_space, end) == -1:
+                continue
+            traditional = data[start:first_space].decode("utf-8", errors="surrogateescape")
+            simplified = data[first_space + 1:second_space].decode("utf-8", errors="surrogateescape")
+            yield traditional, start, end
+            if simplified != traditional:
+                yield simplified, start, end
+
+    def decode(self, data: bytes) -> Optional[CedictEntry]:
+        return parse_cedict_line(data.decode("utf-8", errors="replace"))
+
+@register_reader
+class StarDictReader(IndexedReader):
+    """
+    StarDict dictionary, opened from its .ifo file.
+
+    The .idx word list, plain or gzipped, is re-indexed in code point order
+    since StarDict sorts it case-insensitively. Definitions are read from
+    the .dict file, or from .dict.dz chunk by chunk, and their text fields
+    joined with markup removed.
+    """
+    suffixes = (".ifo",)
+
+    def __init__(self, file_path: str):
+        self.info = self.read_info(file_path)
+        base = file_path[:-len(".ifo")]
+        self.idx_path = base + ".idx" if os.path.exists(base + ".idx") else base + ".idx.gz"
+        if os.path.exists(base + ".dict"):
+            self._content: Union[MappedFile, DictZipFile] = MappedFile(base + ".dict")
+        else:
+            self._content = DictZipFile(base + ".dict.dz")
+        try:
+            super().__init__(file_path)
+        except Exception:
+            self._content.close()
+            raise
+
+    @staticmethod
+    def read_info(file_path: str) -> Dict[str, str]:
+        """Read the key=value lines of a .ifo file."""
+        with open(file_path, "rb") as f:
+            return parse_entries(f.read())
+
+    def index_stat(self) -> Tuple[int, int]:
+        return file_stat(self.idx_path)
+
+    def scan(self) -> Iterator[Tuple[str, int, int]]:
+        with open(self.idx_path, "rb") as f:
+            data = f.read()
+        if self.idx_path.endswith(".gz"):
+            data = gzip.decompress(data)
+        entry = struct.Struct(">QI" if self.info.get("idxoffsetbits") == "64" else ">II")
+        pos = 0
+        while pos < len(data):
+            end = data.index(b"\0", pos)
+            offset, size = entry.unpack_from(data, end + 1)
+            yield data[pos:end].decode("utf-8", errors="surrogateescape"), offset, offset + size
+            pos = end + 1 + entry.size
+
+    def read(self, start: int, end: int) -> bytes:
+        return self._content.read(start, end)
+
+    def decode(self, data: bytes) -> str:
+        types = self.info.get("sametypesequence")
+        fields = []
+        pos = 0
+        count = 0
+        while pos < len(data) and (not types or count < len(types)):
+            if types:
+                field_type = types[count]
+                # The last field has neither a terminator nor a size
+                last = count == len(types) - 1
+            else:
+                # Without sametypesequence each field starts with its type
+                field_type = chr(data[pos])
+                pos += 1
+                last = False
+            count += 1
+
+            if last:
+                field = data[pos:]
+                pos = len(data)
+            elif field_type.islower():
+                end = data.find(b"\0", pos)
+                end = len(data) if end == -1 else end
+                field = data[pos:end]
+                pos = end + 1
+            else:
+                size, = struct.unpack_from(">I", data, pos)
+                field = data[pos + 4:pos + 4 + size]
+                pos += 4 + size
+
+            if field_type in STARDICT_TEXT_TYPES:
+                text = field.decode("utf-8", errors="replace")
+                if field_type in STARDICT_MARKUP_TYPES:
+                    text = html.unescape(MARKUP_TAG_PATTERN.sub("", text.replace("<br>", "\n")))
+                fields.append(text.strip())
+        return "\n".join(field for field in fields if field)
+
+    def close(self) -> None:
+        super().close()
+        self._content.close()
@@ -1,6 +1,37 @@
+import codecs
+import logging
 import os
+import re
+from typing import Iterator, List, Optional, Tuple
 from PyQt5.QtWidgets import QFileDialog, QMessageBox, QWidget
 import chardet
+from src.core.text_decoder import BadByteDecoder, resolve_bom
+
+# Bytes read from the start, middle and end of a file to detect its encoding
+SAMPLE_SIZE = 64 * 1024
+
+# Minimum share of CJK characters among non-whitespace characters of a sample
+MIN_CJK_RATIO = 0.05
+
+# Share of undecodable bytes a sample may have before its encoding is rejected
+MAX_BAD_BYTE_RATIO = 0.001
+
+# Bytes read and decoded at a time by read_file
+DECODE_CHUNK_SIZE = 1024 * 1024
+
+CJK_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Decode with the superset of a detected encoding so rare characters still decode
+DECODE_ENCODINGS = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'ascii': 'utf-8'}
+
+BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
 
 class FileHandler:
     def __init__(self):
@@ -8,101 +39,147 @@ class FileHandler:
         # Common Chinese encodings to try in order of preference
         self.chinese_encodings = ['utf-8', 'gb18030', 'gbk', 'gb2312', 'big5']
         self.last_detected_encoding = None  # Track successful encoding
+        self.last_bad_bytes: List[Tuple[int, bytes]] = []  # Undecodable bytes of the last file read
+        self.logger = logging.getLogger(__name__)
 
     def open_file_dialog(self):
         file_path, _ = QFileDialog.getOpenFileName(self.parent, "Open Text File", "", "Text Files (*.txt);;All Files (*)")
         return file_path
 
-    def read_file(self, file_path):
+    def _read_samples(self, file_path: str) -> List[bytes]:
+        """Read samples from the start, middle and end of a file, cut at line starts."""
+        size = os.path.getsize(file_path)
+        with open(file_path, 'rb') as file:
+            if size <= 3 * SAMPLE_SIZE:
+                return [file.read()]
+            samples = [file.read(SAMPLE_SIZE)]
+            for offset in (size // 2 - SAMPLE_SIZE // 2, size - SAMPLE_SIZE):
+                file.seek(offset)
+                sample = file.read(SAMPLE_SIZE)
+                # Start after a newline, which never falls inside a multi-byte character
+                newline = sample.find(b'\n')
+                samples.append(sample[newline + 1:] if newline >= 0 else sample)
+            return samples
+
+    @staticmethod
+    def _decode_samples(samples: List[bytes], encoding: str) -> Optional[str]:
+        """
+        Decode samples, allowing a character cut off at the end of all but the last one.
+        
+        A few undecodable bytes are tolerated, as scraped novels often contain some.
+        """
         try:
-            with open(file_path, 'rb') as file:
-                raw_data = file.read()
-                
-                # If we successfully used an encoding before, try it first
-                if self.last_detected_encoding:
-                    try:
-                        content = raw_data.decode(self.last_detected_encoding)
-                        if any('\u4e00' <= char <= '\u9fff' for char in content):
-                            return content
-                    except UnicodeDecodeError:
-                        pass
-                
-                # Then try chardet
-                encoding_result = chardet.detect(raw_data)
-                if encoding_result and encoding_result['confidence'] > 0.7:
-                    try:
-                        content = raw_data.decode(encoding_result['encoding'])
-                        if any('\u4e00' <= char <= '\u9fff' for char in content):
-                            self.last_detected_encoding = encoding_result['encoding']
-                            return content
-                    except UnicodeDecodeError:
-                        pass
-                
-                # Finally try each Chinese encoding
-                for encoding in self.chinese_encodings:
-                    try:
-                        content = raw_data.decode(encoding)
-                        # Basic validation - check if the text contains Chinese characters
-                        if any('\u4e00' <= char <= '\u9fff' for char in content):
-                            self.last_detected_encoding = encoding
-                            return content
-                    except UnicodeDecodeError:
-                        continue
-                
-                # If all attempts fail, show error
+            codec, bom_length = resolve_bom(encoding, samples[0])
+        except LookupError:
+            return None
+        parts = []
+        bad_byte_count = 0
+        for i, sample in enumerate(samples):
+            decoder = BadByteDecoder(codec)
+            parts.append(decoder.decode(sample[bom_length:] if i == 0 else sample, final=(i == len(samples) - 1)))
+            bad_byte_count += decoder.bad_byte_count
+        if bad_byte_count > MAX_BAD_BYTE_RATIO * sum(len(sample) for sample in samples):
+            return None
+        return '\n'.join(parts)
+
+    @staticmethod
+    def _is_chinese_text(text: str) -> bool:
+        """Check that enough of the text consists of CJK characters."""
+        visible = len(text) - sum(len(run) for run in WHITESPACE_PATTERN.findall(text))
+        return visible > 0 and len(CJK_PATTERN.findall(text)) >= MIN_CJK_RATIO * visible
+
+    def _candidate_encodings(self, sample: bytes) -> Iterator[str]:
+        """Yield encodings to try, running chardet only once the cheap guesses failed."""
+        # An encoding that worked before is the most likely one
+        if self.last_detected_encoding:
+            yield self.last_detected_encoding
+        # Strict UTF-8 validation is cheap and reliable
+        yield 'utf-8'
+        encoding_result = chardet.detect(sample)
+        if encoding_result and encoding_result['encoding'] and encoding_result['confidence'] > 0.7:
+            yield encoding_result['encoding'].lower()
+        yield from self.chinese_encodings
+
+    def detect_encoding(self, file_path: str) -> Optional[str]:
+        """
+        Detect the encoding of a file from samples of its start, middle and end.
+
+        Args:
+            file_path (str): Path to the file
+
+        Returns:
+            Optional[str]: Encoding to decode the file with, None if no candidate decodes to Chinese text
+        """
+        samples = self._read_samples(file_path)
+        for bom, encoding in BOM_ENCODINGS:
+            if samples[0].startswith(bom):
+                return encoding
+
+        tried = set()
+        for encoding in self._candidate_encodings(samples[0]):
+            encoding = DECODE_ENCODINGS.get(encoding, encoding)
+            if encoding in tried:
+                continue
+            tried.add(encoding)
+            text = self._decode_samples(samples, encoding)
+            if text is not None and self._is_chinese_text(text):
+                return encoding
+        return None
+
+    def read_file(self, file_path, encoding=None):
+        try:
+            # An encoding known for this file (e.g. from its chapter index) skips detection
+            if not encoding:
+                encoding = self.detect_encoding(file_path)
+            if not encoding:
                 QMessageBox.critical(self.parent, "Error", "Could not decode file with any supported encoding.")
                 return None
+            
+            content = self.decode_file(file_path, encoding)
+            self.last_detected_encoding = encoding
+            return content
                 
         except Exception as e:
             QMessageBox.critical(self.parent, "Error", f"Could not read file: {e}")
             return None
 
+    def decode_file(self, file_path: str, encoding: str) -> str:
+        """
+        Decode a file in one streaming pass, replacing undecodable bytes.
+        
+        The bad bytes are recorded in last_bad_bytes as (byte offset, bytes)
+        and reported in the log instead of failing the whole file.
+        
+        Args:
+            file_path (str): Path to the file
+            encoding (str): Encoding of the file
+            
+        Returns:
+            str: Decoded text
+        """
+        parts = []
+        with open(file_path, 'rb') as file:
+            head = file.read(DECODE_CHUNK_SIZE)
+            codec, bom_length = resolve_bom(encoding, head)
+            decoder = BadByteDecoder(codec, start_offset=bom_length)
+            chunk = head[bom_length:]
+            while chunk:
+                parts.append(decoder.decode(chunk))
+                chunk = file.read(DECODE_CHUNK_SIZE)
+            parts.append(decoder.decode(b'', final=True))
+        
+        self.last_bad_bytes = decoder.bad_bytes
+        if decoder.bad_bytes:
+            self.logger.warning(
+                f"Replaced {decoder.bad_byte_count} undecodable bytes in {file_path} for {encoding}, "
+                f"at byte offsets {[offset for offset, _ in decoder.bad_bytes[:10]]}"
+                + (" ..." if len(decoder.bad_bytes) > 10 else "")
+            )
+        return ''.join(parts)
+
     def get_file_encoding(self, file_path):
         """Get the encoding of a file without reading its entire content."""
         try:
-            with open(file_path, 'rb') as file:
-                # Read only first 4KB for encoding detection
-                raw_data = file.read(4096)
-                
-                # Try chardet first with higher confidence threshold
-                encoding_result = chardet.detect(raw_data)
-                if encoding_result and encoding_result['confidence'] > 0.8:
-                    try:
-                        raw_data.decode(encoding_result['encoding'])
-                        # Special case: if detected as GB18030 but actually GB2312
-                        if encoding_result['encoding'].lower() == 'gb18030':
-                            try:
-                                raw_data.decode('gb2312')
-                                return 'gb2312'  # If it can be decoded as GB2312, prefer that
-                            except UnicodeDecodeError:
-                                pass
-                        return encoding_result['encoding']
-                    except UnicodeDecodeError:
-                        pass
-                
-                # Try UTF-8 explicitly since it's most common
-                try:
-                    raw_data.decode('utf-8')
-                    return 'utf-8'
-                except UnicodeDecodeError:
-                    pass
-                
-                # Try each Chinese encoding
-                for encoding in self.chinese_encodings:
-                    try:
-                        raw_data.decode(encoding)
-                        # Special case: if trying GB18030 and GB2312 also works
-                        if encoding == 'gb18030':
-                            try:
-                                raw_data.decode('gb2312')
-                                return 'gb2312'  # If it can be decoded as GB2312, prefer that
-                            except UnicodeDecodeError:
-                                pass
-                        return encoding
-                    except UnicodeDecodeError:
-                        continue
-                
-                return "Unknown"
-                
+            return self.detect_encoding(file_path) or "Unknown"
         except Exception:
             return "Unknown"
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+from typing import Dict, List
+
+# Number of converted strings kept by HanVietConverter.convert
+HANVIET_CACHE_SIZE = 256
+
+class HanVietConverter:
+    """
+    Converts Chinese text to Hán Việt character by character.
+
+    Built from one version of the ChinesePhienAm table, which is not
+    modified once published, so a converter is replaced rather than
+    updated when the table is reloaded. Recent conversions are kept, as
+    the same selection is converted again by the dictionary panel and the
+    edit dialog.
+    """
+    def __init__(self, phien_am: Dict[str, str]):
+        self.phien_am = phien_am
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+
+    def convert(self, text: str) -> str:
+        """
+        Convert text, keeping the result for the next conversions of the same text.
+
+        Args:
+            text (str): Chinese text
+
+        Returns:
+            str: Reading of each character separated by spaces, characters without one kept as they are
+        """
+        converted = self._cache.get(text)
+        if converted is not None:
+            self._cache.move_to_end(text)
+            return converted
+        get = self.phien_am.get
+        converted = " ".join([get(char, char) for char in text])
+        self._cache[text] = converted
+        if len(self._cache) > HANVIET_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return converted
+
+    def convert_lines(self, text: str) -> List[str]:
+        """
+        Convert every line of a text at once, such as a chapter shown with its Hán Việt under each line.
+
+        Lines are not kept in the cache of convert, which they would fill.
+
+        Args:
+            text (str): Chinese text
+
+        Returns:
+            List[str]: Conversion of each line, in the same format as convert
+        """
+        get = self.phien_am.get
+        return [" ".join([get(char, char) for char in line]) for line in text.splitlines()]
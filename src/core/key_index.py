@@ -0,0 +1,200 @@
+import logging
+import mmap
+import os
+import struct
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Bump when the layout of index files changes
+INDEX_VERSION = 2
+
+INDEX_SUFFIX = ".zxidx"
+
+# Magic, version, source size, source mtime in ns, entry count, key bytes
+INDEX_HEADER = struct.Struct("=4sIQqII")
+INDEX_MAGIC = b"ZXDI"
+
+def build_index(entries: Iterable[Tuple[str, int, int]], source_stat: Tuple[int, int]) -> bytes:
+    """
+    Build a sorted index of keys and the byte range of their data.
+
+    Keys are sorted in UTF-8 byte order, which is code point order. When a
+    key appears several times the last one wins.
+
+    Args:
+        entries (Iterable[Tuple[str, int, int]]): Key, start and end of its data
+        source_stat (Tuple[int, int]): Size and mtime of the indexed file, stored to detect changes
+
+    Returns:
+        bytes: Index in the layout read by KeyIndex
+    """
+    spans: Dict[bytes, Tuple[int, int]] = {}
+    for key, start, end in entries:
+        spans[encode_key(key)] = (start, end)
+
+    keys = sorted(spans)
+    data_spans = array("Q")
+    key_offsets = array("I", [0])
+    for key in keys:
+        data_spans.extend(spans[key])
+        key_offsets.append(key_offsets[-1] + len(key))
+    key_bytes = b"".join(keys)
+    header = INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, source_stat[0], source_stat[1], len(keys), len(key_bytes))
+    # 64-bit spans first, so every array is aligned
+    return header + data_spans.tobytes() + key_offsets.tobytes() + key_bytes
+
+def encode_key(text: str) -> bytes:
+    """
+    Encode a key or query the way build_index encodes keys.
+
+    Undecodable bytes of a file are read back as surrogate escapes, so they
+    encode to the same bytes. Other lone surrogates cannot be in an index
+    and are encoded so that they match nothing.
+    """
+    try:
+        return text.encode("utf-8", errors="surrogateescape")
+    except UnicodeEncodeError:
+        return text.encode("utf-8", errors="surrogatepass")
+
+def _successor(prefix: bytes) -> Optional[bytes]:
+    """Smallest byte string greater than every string starting with prefix, None if there is none."""
+    prefix = prefix.rstrip(b"\xff")
+    if not prefix:
+        return None
+    return prefix[:-1] + bytes([prefix[-1] + 1])
+
+class KeyIndex:
+    """
+    Sorted index from keys to byte ranges, memory-mapped from an index file.
+
+    The index file is stored next to the indexed file and rebuilt when the
+    size or mtime of that file changes. Keys are binary-searched in place,
+    so opening an index costs the same whatever its size.
+    """
+    def __init__(self, index: memoryview, index_file=None, index_map: Optional[mmap.mmap] = None):
+        self._index = index
+        self._index_file = index_file
+        self._index_map = index_map
+        _, _, _, _, self._count, key_size = INDEX_HEADER.unpack_from(index)
+        start = INDEX_HEADER.size
+        self._spans = index[start:start + 16 * self._count].cast("Q")
+        start += 16 * self._count
+        self._key_offsets = index[start:start + 4 * (self._count + 1)].cast("I")
+        start += 4 * (self._count + 1)
+        self._keys = index[start:start + key_size]
+
+    @classmethod
+    def open(cls, index_path: str, source_stat: Tuple[int, int],
+             entries: Callable[[], Iterable[Tuple[str, int, int]]]) -> "KeyIndex":
+        """
+        Map the stored index if it is current, otherwise build and store it.
+
+        Args:
+            index_path (str): Path of the index file
+            source_stat (Tuple[int, int]): Size and mtime of the indexed file
+            entries (Callable): Returns the entries to index, only called if the index is rebuilt
+
+        Returns:
+            KeyIndex: The index, kept in memory if it could not be stored
+        """
+        try:
+            index_file = open(index_path, "rb")
+        except OSError:
+            index_file = None
+        if index_file is not None:
+            try:
+                index_map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                index_map = None
+            if index_map is not None and len(index_map) >= INDEX_HEADER.size:
+                magic, version, size, mtime, _, _ = INDEX_HEADER.unpack_from(index_map)
+                if magic == INDEX_MAGIC and version == INDEX_VERSION and (size, mtime) == tuple(source_stat):
+                    return cls(memoryview(index_map), index_file, index_map)
+            if index_map is not None:
+                index_map.close()
+            index_file.close()
+
+        index = build_index(entries(), source_stat)
+        logger = logging.getLogger(__name__)
+        try:
+            temp_path = index_path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(index)
+            os.replace(temp_path, index_path)
+            logger.info(f"Built index {os.path.basename(index_path)}")
+        except OSError as e:
+            logger.warning(f"Could not save index {index_path}: {e}")
+        return cls(memoryview(index))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def key(self, i: int) -> bytes:
+        """UTF-8 bytes of the i-th key."""
+        return bytes(self._keys[self._key_offsets[i]:self._key_offsets[i + 1]])
+
+    def span(self, i: int) -> Tuple[int, int]:
+        """Start and end of the data of the i-th key."""
+        return self._spans[2 * i], self._spans[2 * i + 1]
+
+    def lower_bound(self, key: bytes, lo: int = 0) -> int:
+        """Position of the first key not less than key."""
+        hi = self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key: str) -> Optional[int]:
+        """Position of a key, or None if it is not indexed."""
+        encoded = encode_key(key)
+        i = self.lower_bound(encoded)
+        if i < self._count and self.key(i) == encoded:
+            return i
+        return None
+
+    def prefix_range(self, prefix: str) -> range:
+        """Positions of the keys that start with a prefix."""
+        encoded = encode_key(prefix)
+        lo = self.lower_bound(encoded)
+        # Escaped bytes may be 0xFF, so the end is found from the next prefix
+        successor = _successor(encoded)
+        return range(lo, self._count if successor is None else self.lower_bound(successor, lo))
+
+    def find_prefixes(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Find every key that is a prefix of the text.
+
+        Longer prefixes sort after shorter ones, so each search starts where
+        the previous one ended, and stops once no key starts with the prefix.
+
+        Args:
+            text (str): Text to find prefixes in
+
+        Returns:
+            List[Tuple[int, int]]: Length of each matching prefix and its position, shortest first
+        """
+        matches = []
+        lo = 0
+        for length in range(1, len(text) + 1):
+            prefix = encode_key(text[:length])
+            lo = self.lower_bound(prefix, lo)
+            if lo == self._count:
+                break
+            key = self.key(lo)
+            if key == prefix:
+                matches.append((length, lo))
+            elif not key.startswith(prefix):
+                break
+        return matches
+
+    def close(self) -> None:
+        """Release the index and unmap its file."""
+        for view in (self._spans, self._key_offsets, self._keys, self._index):
+            view.release()
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_file.close()
@@ -0,0 +1,68 @@
+import re
+import unicodedata
+
+# Combining mark of each tone, the fifth (neutral) tone has none
+TONE_MARKS = {"1": "\u0304", "2": "\u0301", "3": "\u030c", "4": "\u0300"}
+TONE_MARK_CHARS = frozenset(TONE_MARKS.values())
+
+PINYIN_VOWELS = "aeiouü"
+
+# Letters followed by a tone number, as in CC-CEDICT "ni3 hao3" or a typed "nihao3"
+NUMBERED_SYLLABLE_PATTERN = re.compile(r"([a-zü]+)([1-5])")
+
+def strip_tones(text: str) -> str:
+    """Remove tone marks from pinyin, keeping the diaeresis of ü."""
+    decomposed = unicodedata.normalize("NFD", text)
+    return unicodedata.normalize("NFC", "".join(char for char in decomposed if char not in TONE_MARK_CHARS))
+
+def mark_tone(syllable: str, tone: str) -> str:
+    """
+    Put the tone mark of a tone number on a syllable.
+
+    The mark goes on the last group of vowels, on a or e if there is one,
+    on the o of ou, and on the last vowel otherwise.
+
+    Args:
+        syllable (str): Lowercase letters, the toned syllable ending them
+        tone (str): Tone number from 1 to 5
+
+    Returns:
+        str: The syllable with its tone mark, unchanged for the neutral tone
+    """
+    mark = TONE_MARKS.get(tone)
+    end = len(syllable)
+    while end > 0 and syllable[end - 1] not in PINYIN_VOWELS:
+        end -= 1
+    if mark is None or end == 0:
+        return syllable
+    start = end
+    while start > 0 and syllable[start - 1] in PINYIN_VOWELS:
+        start -= 1
+    vowels = syllable[start:end]
+    if "a" in vowels:
+        position = start + vowels.index("a")
+    elif "e" in vowels:
+        position = start + vowels.index("e")
+    elif "ou" in vowels:
+        position = start + vowels.index("o")
+    else:
+        position = end - 1
+    return unicodedata.normalize("NFC", syllable[:position + 1] + mark + syllable[position + 1:])
+
+def to_marked_pinyin(text: str) -> str:
+    """
+    Write pinyin in lowercase letters with tone marks and no separators.
+
+    Accepts tone numbers ("ni3 hao3", "lu:4", "lv4") as well as tone marks,
+    so a CC-CEDICT reading and a typed query give the same form. Syllables
+    without a tone number or mark are left unmarked.
+
+    Args:
+        text (str): Pinyin
+
+    Returns:
+        str: Pinyin such as "nǐhǎo"
+    """
+    text = unicodedata.normalize("NFC", text.lower()).replace("u:", "ü").replace("v", "ü")
+    text = NUMBERED_SYLLABLE_PATTERN.sub(lambda match: mark_tone(match.group(1), match.group(2)), text)
+    return "".join(char for char in text if char.isalpha())
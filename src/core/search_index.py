@@ -0,0 +1,241 @@
+import logging
+import threading
+from array import array
+from collections import Counter
+from itertools import chain, islice
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Pads terms so their first and last characters form bigrams of their own
+NGRAM_PAD = "\0"
+
+def bigrams(term: str) -> List[str]:
+    """Distinct bigrams of a padded term."""
+    padded = f"{NGRAM_PAD}{term}{NGRAM_PAD}"
+    return list({padded[i:i + 2] for i in range(len(padded) - 1)})
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> Optional[int]:
+    """
+    Levenshtein distance between two strings, if it is at most max_distance.
+
+    Args:
+        a (str): First string
+        b (str): Second string
+        max_distance (int): Largest distance of interest
+
+    Returns:
+        Optional[int]: The distance, or None as soon as it is known to exceed max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j - 1] + (char_a != char_b), previous[j] + 1, current[j - 1] + 1))
+        if min(current) > max_distance:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= max_distance else None
+
+class NGramIndex:
+    """
+    Bigram index of a vocabulary, for finding the terms within a few edits of a query.
+
+    An edit changes at most two bigrams of a term, so a term within k
+    edits of the query shares all but 2k of its bigrams. Only terms that
+    share that many are compared with the query.
+    """
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = list(terms)
+        self.postings: Dict[str, array] = {}
+        for term_id, term in enumerate(self.terms):
+            for gram in bigrams(term):
+                ids = self.postings.get(gram)
+                if ids is None:
+                    ids = self.postings[gram] = array("i")
+                ids.append(term_id)
+
+    def search(self, term: str, max_distance: int,
+               accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, int]]:
+        """
+        Find the terms within max_distance edits of a term.
+
+        One edit is allowed per three characters of the term at most, so
+        short terms do not match most of the vocabulary.
+
+        Args:
+            term (str): Term to search for
+            max_distance (int): Largest number of edits
+            accept (Optional[Callable[[str], bool]]): Filter applied to candidate terms
+
+        Returns:
+            List[Tuple[str, int]]: Matching terms and their distance, closest first
+        """
+        max_distance = min(max_distance, len(term) // 3)
+        grams = bigrams(term)
+        threshold = len(grams) - 2 * max_distance
+        counts: Counter = Counter()
+        for gram in grams:
+            counts.update(self.postings.get(gram, ()))
+
+        matches = []
+        for term_id, shared in counts.items():
+            if shared < threshold:
+                continue
+            candidate = self.terms[term_id]
+            if accept is not None and not accept(candidate):
+                continue
+            distance = bounded_edit_distance(term, candidate, max_distance)
+            if distance is not None:
+                matches.append((candidate, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+class ReadingIndex:
+    """
+    Words sorted by their reading, searched by a prefix of the reading.
+
+    A character of the query without diacritics matches it with any
+    diacritics, so "nhat" finds nhất, nhật and nhạt, while "nhất" only
+    finds nhất. Instead of storing the readings a second time without
+    diacritics, the search follows each variant of such characters that
+    occurs in the readings, narrowing a binary search as it goes.
+
+    Readings and words are stored in one sorted UTF-8 buffer. The index
+    is built in memory by a background thread.
+    """
+    def __init__(self, name: str, fold: Callable[[str], str]):
+        """
+        Args:
+            name (str): Name shown in logs
+            fold (Callable[[str], str]): Removes the diacritics of a character
+        """
+        self.name = name
+        self.fold = fold
+        self._keys = b""
+        self._offsets = array("I", [0])
+        # Characters with diacritics found in the readings, by character without
+        self._variants: Dict[str, List[str]] = {}
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def build(self, entries: Iterable[Tuple[str, str]]) -> None:
+        """
+        Index (reading, word) entries, replacing the current index.
+
+        Args:
+            entries (Iterable[Tuple[str, str]]): Normalized reading of each word
+        """
+        keys = set()
+        characters = set()
+        for reading, word in entries:
+            if reading:
+                keys.add(f"{reading}\0{word}".encode("utf-8", errors="surrogatepass"))
+                characters.update(reading)
+
+        keys = sorted(keys)
+        offsets = array("I", [0])
+        for key in keys:
+            offsets.append(offsets[-1] + len(key))
+        variants: Dict[str, List[str]] = {}
+        for char in sorted(characters):
+            base = self.fold(char)
+            if base != char and len(base) == 1:
+                variants.setdefault(base, []).append(char)
+        self._keys = b"".join(keys)
+        self._offsets = offsets
+        self._variants = variants
+
+    def start(self, entries: Callable[[], Iterable[Tuple[str, str]]]) -> None:
+        """
+        Build the index in a background thread.
+
+        Args:
+            entries (Callable): Returns the (reading, word) entries
+        """
+        if self._thread is not None:
+            return
+
+        def run():
+            try:
+                self.build(entries())
+                self.logger.info(f"Reading index {self.name} ready with {len(self)} words")
+            except Exception as e:
+                self.logger.error(f"Error building reading index {self.name}: {e}")
+            finally:
+                self._ready.set()
+
+        self._thread = threading.Thread(target=run, name=f"reading-index-{self.name}", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the index is ready, returning whether it is."""
+        return self._ready.wait(timeout)
+
+    def _key(self, i: int) -> bytes:
+        return self._keys[self._offsets[i]:self._offsets[i + 1]]
+
+    def _lower_bound(self, key: bytes, lo: int, hi: int) -> int:
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """
+        Find the words whose reading starts with the query.
+
+        Args:
+            query (str): Normalized start of a reading
+            limit (Optional[int]): Maximum number of words to return
+
+        Returns:
+            List[Tuple[str, str]]: (word, reading) of each match, readings equal to the query first
+        """
+        if not query:
+            return []
+        # Prefix matched so far and the positions of the keys starting with it
+        ranges = [(b"", 0, len(self))]
+        for char in query:
+            options = [char]
+            if self.fold(char) == char:
+                options += self._variants.get(char, [])
+            narrowed = []
+            for prefix, lo, hi in ranges:
+                for option in options:
+                    extended = prefix + option.encode("utf-8", errors="surrogatepass")
+                    start = self._lower_bound(extended, lo, hi)
+                    # No UTF-8 byte is 0xFF, so every key starting with the prefix sorts before this
+                    end = self._lower_bound(extended + b"\xff", start, hi)
+                    if start < end:
+                        narrowed.append((extended, start, end))
+            if not narrowed:
+                return []
+            ranges = narrowed
+
+        ranges.sort(key=lambda matched: matched[1])
+        # Keys of readings equal to the prefix come first in its range, as "\0" sorts before any character
+        splits = [(lo, self._lower_bound(prefix + b"\x01", lo, hi), hi) for prefix, lo, hi in ranges]
+        positions = chain(
+            chain.from_iterable(range(lo, exact_end) for lo, exact_end, _ in splits),
+            chain.from_iterable(range(exact_end, hi) for _, exact_end, hi in splits),
+        )
+
+        matches = []
+        for i in islice(positions, limit):
+            reading, word = self._key(i).decode("utf-8", errors="surrogatepass").split("\0", 1)
+            matches.append((word, reading))
+        return matches
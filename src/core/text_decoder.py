@@ -0,0 +1,103 @@
+import codecs
+import re
+from typing import List, Optional, Tuple
+
+# Codecs that strip a byte order mark, with the mark and the codec for the data after it
+BOM_CODECS = {
+    'utf-8-sig': ((codecs.BOM_UTF8, 'utf-8'),),
+    'utf-16': ((codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be')),
+    'utf-32': ((codecs.BOM_UTF32_LE, 'utf-32-le'), (codecs.BOM_UTF32_BE, 'utf-32-be')),
+}
+
+# Error handler that escapes each undecodable byte as U+DC00 plus the byte.
+# Unlike surrogateescape, which only escapes bytes from 0x80, it also
+# handles invalid UTF-16 and UTF-32 code units, whose bytes can be any value.
+ESCAPE_ERRORS = 'zxreader-escape'
+
+# Decoders never produce lone surrogates, so these only come from ESCAPE_ERRORS
+ESCAPED_BYTES_PATTERN = re.compile('[\udc00-\udcff]+')
+
+def _escape_bad_bytes(error: UnicodeError) -> Tuple[str, int]:
+    if not isinstance(error, UnicodeDecodeError):
+        raise error
+    return ''.join([chr(0xDC00 + byte) for byte in error.object[error.start:error.end]]), error.end
+
+codecs.register_error(ESCAPE_ERRORS, _escape_bad_bytes)
+
+def escaped_bytes(escapes: str) -> bytes:
+    """Return the bytes of a run of escapes made by ESCAPE_ERRORS."""
+    return bytes([ord(char) - 0xDC00 for char in escapes])
+
+def resolve_bom(encoding: str, head: bytes) -> Tuple[str, int]:
+    """
+    Find the codec for the data after a byte order mark.
+
+    Args:
+        encoding (str): Encoding of the file
+        head (bytes): First bytes of the file
+
+    Returns:
+        Tuple[str, int]: Codec that does not expect a BOM and the length of the BOM in head
+    """
+    codec = codecs.lookup(encoding).name
+    for bom, bom_codec in BOM_CODECS.get(codec, ()):
+        if head.startswith(bom):
+            return bom_codec, len(bom)
+    return codec, 0
+
+class BadByteDecoder:
+    """
+    Incremental decoder that replaces undecodable bytes and records them.
+
+    Data can be fed in chunks of any size. Each run of bad bytes is replaced
+    by `replacement` (an empty string drops it, None keeps the escapes made
+    by ESCAPE_ERRORS, one character per byte, so byte offsets can still be
+    computed, see char_to_byte_offsets) and recorded in `bad_bytes` as its
+    byte offset in the input together with the bytes.
+    The encoding must not expect a byte order mark, see resolve_bom.
+    """
+    def __init__(self, encoding: str, replacement: Optional[str] = '\ufffd', start_offset: int = 0):
+        self.encoding = encoding
+        self.replacement = replacement
+        self.bad_bytes: List[Tuple[int, bytes]] = []
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors=ESCAPE_ERRORS)
+        self._offset = start_offset  # Offset of the next byte fed in
+
+    @property
+    def bad_byte_count(self) -> int:
+        return sum(len(data) for _, data in self.bad_bytes)
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        """
+        Decode the next chunk of data.
+
+        Args:
+            data (bytes): Next chunk of input
+            final (bool): Whether this is the last chunk
+
+        Returns:
+            str: Text decoded so far that was not returned before
+        """
+        # Bytes held back from the previous chunk are decoded first
+        base = self._offset - len(self._decoder.getstate()[0])
+        text = self._decoder.decode(data, final)
+        self._offset += len(data)
+        if ESCAPED_BYTES_PATTERN.search(text):
+            text = self._replace_bad_bytes(text, base)
+        return text
+
+    def _replace_bad_bytes(self, text: str, base: int) -> str:
+        parts = []
+        byte_pos = base
+        char_pos = 0
+        for match in ESCAPED_BYTES_PATTERN.finditer(text):
+            good = text[char_pos:match.start()]
+            byte_pos += len(good.encode(self.encoding))
+            bad = escaped_bytes(match.group())
+            self.bad_bytes.append((byte_pos, bad))
+            byte_pos += len(bad)
+            parts.append(good)
+            parts.append(match.group() if self.replacement is None else self.replacement)
+            char_pos = match.end()
+        parts.append(text[char_pos:])
+        return ''.join(parts)
@@ -1,5 +1,7 @@
 import regex as re
-from typing import List, Tuple, Optional
+import math
+from bisect import bisect_right
+from typing import Dict, List, Tuple, Optional
 
 CHAPTER_MATCHERS = {
     "Mục lục ( Đi trống không )": r"(?<=[　\s])(?:序章|楔子|正文(?!完|结)|终章|后记|尾声|番外|第\s{0,4}[\d〇零一二两三四五六七八九十百千万壹贰叁肆伍陆柒捌玖拾佰仟]+?\s{0,4}(?:章|节(?!课)|卷|集(?![合和]))).{0,30}$",
@@ -29,18 +31,282 @@ CHAPTER_MATCHERS = {
     "Thông dụng quy tắc": r"(?im)^.{0,6}(?:[引楔]子|正文(?!完|结)|[引序前]言|[序终]章|扉页|[上中下][部篇卷]|卷首语|后记|尾声|番外|={2,4}|第\s{0,4}[\d〇零一二两三四五六七八九十百千万壹贰叁肆伍陆柒捌玖拾佰仟]+?\s{0,4}(?:章|节(?!课)|卷|页[、 　]|集(?![合和])|部(?![分是门落])|篇(?!张))).{0,40}$|^.{0,6}[\d〇零一二两三四五六七八九十百千万壹贰叁肆伍陆柒捌玖拾佰仟a-z]{1,8}[、. 　].{0,20}$",
 }
 
+# Pseudo method that picks the best scoring entry of CHAPTER_MATCHERS
+AUTO_DETECTION_METHOD = "Tự động nhận diện"
+
+# Chapters shorter than this on average are most likely ordinary lines
+MIN_AVERAGE_CHAPTER_LENGTH = 1000
+
+CHINESE_DIGITS = {
+    '〇': 0, '零': 0, '一': 1, '壹': 1, '二': 2, '两': 2, '贰': 2, '三': 3, '叁': 3,
+    '四': 4, '肆': 4, '五': 5, '伍': 5, '六': 6, '陆': 6, '七': 7, '柒': 7,
+    '八': 8, '捌': 8, '九': 9, '玖': 9,
+}
+CHINESE_UNITS = {'十': 10, '拾': 10, '百': 100, '佰': 100, '千': 1000, '仟': 1000}
+
+_NUMBER_PATTERN = re.compile(r"\d+|[〇零一二两三四五六七八九十百千万壹贰叁肆伍陆柒捌玖拾佰仟]+")
+
+def parse_chapter_number(title: str) -> Optional[int]:
+    """
+    Parse the first Arabic or Chinese number in a chapter title.
+    
+    Args:
+        title (str): Chapter title, e.g. "第一百二十三章 ..."
+        
+    Returns:
+        Optional[int]: The number, or None if the title has none
+    """
+    match = _NUMBER_PATTERN.search(title)
+    if not match:
+        return None
+    number = match.group()
+    if number[0] not in CHINESE_DIGITS and number[0] not in CHINESE_UNITS and number[0] != '万':
+        return int(number)
+    if all(char in CHINESE_DIGITS for char in number):
+        # Digit by digit form such as 一二三
+        value = 0
+        for char in number:
+            value = value * 10 + CHINESE_DIGITS[char]
+        return value
+    total = 0
+    section = 0
+    digit = 0
+    for char in number:
+        if char in CHINESE_DIGITS:
+            digit = CHINESE_DIGITS[char]
+        elif char == '万':
+            total += (section + digit) * 10000
+            section = 0
+            digit = 0
+        else:
+            section += (digit or 1) * CHINESE_UNITS[char]
+            digit = 0
+    if digit and len(number) > 1:
+        # A last digit right after 百, 千 or 万 counts the next unit down, 一百二 is 120
+        unit = 10000 if number[-2] == '万' else CHINESE_UNITS.get(number[-2], 0)
+        if unit >= 100:
+            digit *= unit // 10
+    return total + section + digit
+
+def score_chapters(chapters: List[Tuple[int, int]], titles: List[str], text_length: int) -> float:
+    """
+    Score how plausible a set of detected chapters is.
+    
+    The score grows with the number of chapters and rewards evenly spaced
+    chapters and titles numbered in sequence. Results averaging less than
+    MIN_AVERAGE_CHAPTER_LENGTH characters per chapter are penalized.
+    
+    Args:
+        chapters (List[Tuple[int, int]]): Chapter title positions
+        titles (List[str]): Chapter titles
+        text_length (int): Length of the full text
+        
+    Returns:
+        float: Score, 0 if there are fewer than two chapters
+    """
+    count = len(chapters)
+    if count < 2:
+        return 0.0
+    
+    # Spacing regularity from the coefficient of variation of chapter lengths
+    starts = [start for start, _ in chapters]
+    lengths = [b - a for a, b in zip(starts, starts[1:] + [text_length])]
+    mean = sum(lengths) / count
+    if mean <= 0:
+        return 0.0
+    deviation = math.sqrt(sum((length - mean) ** 2 for length in lengths) / count)
+    regularity = 1.0 / (1.0 + deviation / mean)
+    
+    # Share of consecutive titles that continue the numbering (or restart a volume)
+    numbers = [parse_chapter_number(title) for title in titles]
+    pairs = [(a, b) for a, b in zip(numbers, numbers[1:]) if a is not None and b is not None]
+    numbering = sum(1 for a, b in pairs if b == a + 1 or b == 1) / (count - 1)
+    
+    size = min(1.0, mean / MIN_AVERAGE_CHAPTER_LENGTH)
+    return math.log(count) * size * (regularity + 2 * numbering)
+
+def pick_best_method(candidates: Dict[str, Tuple[List[Tuple[int, int]], List[str]]], text_length: int) -> str:
+    """
+    Pick the detection method whose chapters score highest.
+    
+    Args:
+        candidates (Dict[str, Tuple[List[Tuple[int, int]], List[str]]]): Chapter positions
+            and titles keyed by method name
+        text_length (int): Length of the full text
+        
+    Returns:
+        str: Name of the best method, the first CHAPTER_MATCHERS entry if nothing scores
+    """
+    best = next(iter(CHAPTER_MATCHERS))
+    best_score = 0.0
+    for method, (chapters, titles) in candidates.items():
+        score = score_chapters(chapters, titles, text_length)
+        if score > best_score:
+            best, best_score = method, score
+    return best
+
+# Lines longer than this are skipped by the methods that match whole lines
+MAX_TITLE_LINE_LENGTH = 80
+
+# Stands in for a run of skipped long lines so matches cannot span across it
+_SKIPPED_LINES = "\x00"
+
+_INLINE_FLAGS = re.compile(r"\(\?[a-zA-Z]+\)")
+
+_compiled_matchers: Dict[str, "re.Pattern"] = {}
+_line_anchored: Dict[str, bool] = {}
+
+def _get_matcher(method: str) -> "re.Pattern":
+    """Return the compiled pattern for a detection method."""
+    matcher = _compiled_matchers.get(method)
+    if matcher is None:
+        matcher = re.compile(CHAPTER_MATCHERS[method], re.MULTILINE)
+        _compiled_matchers[method] = matcher
+    return matcher
+
+def _top_level_alternatives(pattern: str) -> List[str]:
+    """Split a pattern at the | that are outside groups and character classes."""
+    alternatives = []
+    depth = 0
+    in_class = False
+    start = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 1
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            alternatives.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    alternatives.append(pattern[start:])
+    return alternatives
+
+def is_line_anchored(method: str) -> bool:
+    """
+    Check whether every match of a detection method starts at the start of a line.
+    
+    Other methods can also match the end or the middle of a line, such as
+    the text between = signs, so they are run over long lines too.
+    
+    Args:
+        method (str): Name of a CHAPTER_MATCHERS entry
+        
+    Returns:
+        bool: Whether each top level alternative of the pattern starts with ^
+    """
+    anchored = _line_anchored.get(method)
+    if anchored is None:
+        pattern = CHAPTER_MATCHERS[method]
+        flags = _INLINE_FLAGS.match(pattern)
+        if flags:
+            pattern = pattern[flags.end():]
+        anchored = all(alternative.startswith("^") for alternative in _top_level_alternatives(pattern))
+        _line_anchored[method] = anchored
+    return anchored
+
+class ChapterDetector:
+    """
+    Line-indexed chapter detection for one text.
+    
+    The text is split into lines once and the lines short enough to be a
+    title are joined into a compact text that the methods matching whole
+    lines run over, the others run over the full text. Match offsets are
+    mapped back to the original text and cached per method, so switching
+    methods does not scan the text again.
+    """
+    def __init__(self, text: str):
+        self.text = text
+        self._results: Dict[str, List[Tuple[int, int]]] = {}
+        
+        lines = []
+        self._compact_starts: List[int] = []  # Start of each kept line in the compact text
+        self._line_starts: List[int] = []  # Start of the same line in the original text
+        pos = 0
+        compact_pos = 0
+        skipping = False
+        for line in text.split("\n"):
+            length = len(line)
+            if length <= MAX_TITLE_LINE_LENGTH:
+                lines.append(line)
+                self._compact_starts.append(compact_pos)
+                self._line_starts.append(pos)
+                compact_pos += length + 1
+                skipping = False
+            elif not skipping:
+                lines.append(_SKIPPED_LINES)
+                self._compact_starts.append(compact_pos)
+                self._line_starts.append(pos)
+                compact_pos += len(_SKIPPED_LINES) + 1
+                skipping = True
+            pos += length + 1
+        self._compact = "\n".join(lines)
+
+    def _to_original(self, compact_pos: int) -> int:
+        """Map a position in the compact text to the original text."""
+        line = bisect_right(self._compact_starts, compact_pos) - 1
+        return compact_pos - self._compact_starts[line] + self._line_starts[line]
+
+    def detect(self, method: Optional[str] = None) -> List[Tuple[int, int]]:
+        """
+        Detect chapter positions using the specified method.
+        
+        Args:
+            method (Optional[str]): Name of a CHAPTER_MATCHERS entry or AUTO_DETECTION_METHOD,
+                defaults to the first CHAPTER_MATCHERS entry
+            
+        Returns:
+            List[Tuple[int, int]]: Start and end offsets of each chapter title
+        """
+        if method == AUTO_DETECTION_METHOD:
+            method = self.best_method()
+        elif method not in CHAPTER_MATCHERS:
+            method = next(iter(CHAPTER_MATCHERS))
+        chapters = self._results.get(method)
+        if chapters is None:
+            chapters = []
+            if self.text and is_line_anchored(method):
+                for match in _get_matcher(method).finditer(self._compact):
+                    start, end = match.span()
+                    chapters.append((self._to_original(start), self._to_original(end)))
+            elif self.text:
+                chapters = [match.span() for match in _get_matcher(method).finditer(self.text)]
+            self._results[method] = chapters
+        return chapters
+
+    def detect_all(self) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Run every detection method over the line index.
+        
+        Returns:
+            Dict[str, List[Tuple[int, int]]]: Chapter positions keyed by method name
+        """
+        return {method: self.detect(method) for method in CHAPTER_MATCHERS}
+
+    def best_method(self) -> str:
+        """
+        Find the detection method whose chapters score highest.
+        
+        Returns:
+            str: Name of a CHAPTER_MATCHERS entry, the first one if nothing is detected
+        """
+        text = self.text
+        candidates = {
+            method: (chapters, [text[start:end] for start, end in chapters])
+            for method, chapters in self.detect_all().items()
+        }
+        return pick_best_method(candidates, len(text))
+
 def detect_chapters(text: str, method: Optional[str] = None) -> List[Tuple[int, int]]:
     """Detect chapter positions in text using the specified method"""
     if not text:
         return []
-    
-    # Use first method if none specified
-    pattern = CHAPTER_MATCHERS[method if method in CHAPTER_MATCHERS else list(CHAPTER_MATCHERS.keys())[0]]
-    chapters = []
-    
-    for match in re.finditer(pattern, text, re.MULTILINE):
-        start = match.start()
-        end = match.end()
-        chapters.append((start, end))
-    
-    return chapters if chapters else []
\ No newline at end of file
+    return ChapterDetector(text).detect(method)
@@ -93,3 +93,4 @@ class ChapterPanel(QWidget):
         if chapters:
             self.chapter_list.clear()
             self.chapter_list.addItems(chapters)
+            self.chapter_list.setCurrentRow(self.chapter_manager.get_current_chapter_index())
@@ -11,13 +11,14 @@ from PyQt5.QtWidgets import (
     QPushButton, QComboBox, QGridLayout, QWidget
 )
 from PyQt5.QtCore import Qt, pyqtSignal
-from typing import Optional
+from typing import Optional, Tuple
 
 class DictionaryEditDialog(QDialog):
     dictionary_updated = pyqtSignal(str)  # Signal when dictionary is updated, includes filename
     
     def __init__(self, parent=None, chinese_text="", hanviet="", definition="", 
-                 dictionary_type="", is_edit=False, context_text=""):
+                 dictionary_type="", is_edit=False, context_text="",
+                 selection: Optional[Tuple[int, int]] = None):
         super().__init__(parent)
         self.chinese_text = chinese_text
         self.hanviet = hanviet
@@ -31,8 +32,10 @@ class DictionaryEditDialog(QDialog):
         self.selection_start = -1
         self.selection_end = -1
         
-        # Find initial selection position
-        if self.chinese_text and self.context_text_full:
+        # Use the given selection, else find the first occurrence of the text
+        if selection and 0 <= selection[0] < selection[1] <= len(self.context_text_full):
+            self.selection_start, self.selection_end = selection
+        elif self.chinese_text and self.context_text_full:
             pos = self.context_text_full.find(self.chinese_text)
             if pos != -1:
                 self.selection_start = pos
@@ -2,8 +2,34 @@ from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QTextEdit, QLineEdit,
     QPushButton, QScrollArea, QFrame
 )
-from PyQt5.QtCore import pyqtSlot, Qt
+from PyQt5.QtCore import pyqtSlot, Qt, QTimer
 from PyQt5.QtGui import QFont, QTextCharFormat, QTextCursor
+from collections import OrderedDict
+from html import escape
+from typing import List, Optional, Tuple
+from src.QTEngine.models.cedict import CedictEntry
+
+# Number of rendered lookups kept
+LOOKUP_CACHE_SIZE = 256
+
+# Delay before showing a lookup, so a dragged selection only shows where it stops
+LOOKUP_DEBOUNCE_MS = 50
+
+# Inline styles of the parts of a lookup
+CHINESE_STYLE = "font-weight: bold; font-size: 12pt"
+DICT_NAME_STYLE = "font-size: 10pt"
+DEFINITION_STYLE = "font-size: 10pt"
+PINYIN_STYLE = "font-size: 10pt; font-style: italic"
+HANVIET_STYLE = "font-size: 10pt; font-weight: bold"
+SEPARATOR_STYLE = "font-size: 8pt"
+
+def styled(text: str, style: str) -> str:
+    """Escape text and wrap it in a span with an inline style."""
+    return f'<span style="{style}">{escape(text, quote=False)}</span>'
+
+def as_document(parts: List[str]) -> str:
+    """Join HTML parts into a document that keeps line breaks and indentation."""
+    return '<div style="white-space: pre-wrap">' + ''.join(parts) + '</div>'
 
 class DictionaryPanel(QWidget):
     def __init__(self, dictionary_manager):
@@ -32,27 +58,14 @@ class DictionaryPanel(QWidget):
         default_font = QFont("Open Sans", 10)
         self.definition_display.setFont(default_font)
         
-        # Create text formats for different parts
-        self.chinese_format = QTextCharFormat()
-        self.chinese_format.setFontWeight(QFont.Bold)
-        self.chinese_format.setFontPointSize(12)
-        
-        self.dict_name_format = QTextCharFormat()
-        self.dict_name_format.setFontPointSize(10)
-        
-        self.definition_format = QTextCharFormat()
-        self.definition_format.setFontPointSize(10)
-        
-        self.pinyin_format = QTextCharFormat()
-        self.pinyin_format.setFontPointSize(10)
-        self.pinyin_format.setFontItalic(True)
-        
-        self.hanviet_format = QTextCharFormat()
-        self.hanviet_format.setFontPointSize(10)
-        self.hanviet_format.setFontWeight(QFont.Bold)
-        
-        self.separator_format = QTextCharFormat()
-        self.separator_format.setFontPointSize(8)
+        # Rendered lookups, most recently used last, see lookup_word
+        self._lookup_cache: "OrderedDict[Tuple[str, int], Tuple[str, str]]" = OrderedDict()
+        self._shown_key: Optional[Tuple[str, int]] = None
+        self._pending_word: Optional[str] = None
+        self._lookup_timer = QTimer(self)
+        self._lookup_timer.setSingleShot(True)
+        self._lookup_timer.setInterval(LOOKUP_DEBOUNCE_MS)
+        self._lookup_timer.timeout.connect(self._show_pending_word)
         
         # Set margins and spacing
         layout.setContentsMargins(5, 5, 5, 5)
@@ -78,18 +91,18 @@ class DictionaryPanel(QWidget):
             # For other dictionaries, just return the definition as is
             return definition
 
-    def add_separator(self, cursor):
+    def add_separator(self, parts: List[str]):
         """Add a separator line between definitions."""
-        cursor.insertText("------------------------------------------\n", self.separator_format)
+        parts.append(styled("------------------------------------------\n", SEPARATOR_STYLE))
 
-    def format_lacviet_definition(self, definition: str, cursor: QTextCursor):
+    def format_lacviet_definition(self, definition: str, parts: List[str]):
         """Format LacViet dictionary definition with special styling."""
         lines = definition.split('\n')
         for line in lines:
             # Clean up line and check for ✚ character
             line = line.strip()
             if line == 'n':
-                cursor.insertText('\n', self.definition_format)
+                parts.append(styled('\n', DEFINITION_STYLE))
             elif '✚' in line:
                 # Remove 'n' before ✚ if present
                 line = line.replace('n✚', '✚')
@@ -99,29 +112,29 @@ class DictionaryPanel(QWidget):
                     # Split at the closing bracket
                     pre_bracket, post_bracket = line.split(']', 1)
                     pinyin = pre_bracket + ']'  # Include the closing bracket
-                    cursor.insertText(pinyin, self.pinyin_format)
+                    parts.append(styled(pinyin, PINYIN_STYLE))
                     
                     remaining = post_bracket.strip()
                     if "Hán Việt:" in remaining:
-                        parts = remaining.split("Hán Việt:", 1)
-                        cursor.insertText(" Hán Việt: ", self.dict_name_format)
+                        hanviet_parts = remaining.split("Hán Việt:", 1)
+                        parts.append(styled(" Hán Việt: ", DICT_NAME_STYLE))
                         
                         # Handle the rest of the definition
-                        rest = parts[1].strip()
+                        rest = hanviet_parts[1].strip()
                         # Split into hanviet word and meanings if there are meanings
                         if ' ' in rest:
                             hanviet, meanings = rest.split(' ', 1)
-                            cursor.insertText(hanviet, self.hanviet_format)
-                            cursor.insertText(" " + meanings, self.definition_format)
+                            parts.append(styled(hanviet, HANVIET_STYLE))
+                            parts.append(styled(" " + meanings, DEFINITION_STYLE))
                         else:
-                            cursor.insertText(rest, self.hanviet_format)
-                        cursor.insertText("\n")
+                            parts.append(styled(rest, HANVIET_STYLE))
+                        parts.append("\n")
                     else:
-                        cursor.insertText(f" {remaining}\n", self.definition_format)
+                        parts.append(styled(f" {remaining}\n", DEFINITION_STYLE))
             else:
                 # Handle 'n' for newline and t{number} for indentation
                 if line.strip() == 'n':
-                    cursor.insertText('\n', self.definition_format)
+                    parts.append(styled('\n', DEFINITION_STYLE))
                 elif line.startswith('t') and len(line) > 1 and line[1].isdigit():
                     # Keep number after indentation
                     number = line[1]
@@ -129,27 +142,27 @@ class DictionaryPanel(QWidget):
                     # Check if text already starts with dot
                     if text.lstrip().startswith('.'):
                         text = text.lstrip()[1:].lstrip()  # Remove leading dot and whitespace
-                    cursor.insertText(f"    {number}. {text}\n", self.definition_format)
+                    parts.append(styled(f"    {number}. {text}\n", DEFINITION_STYLE))
                 else:
-                    cursor.insertText(f"{line}\n", self.definition_format)
+                    parts.append(styled(f"{line}\n", DEFINITION_STYLE))
 
-    def format_thieuchuu_definition(self, definition: str, cursor: QTextCursor):
+    def format_thieuchuu_definition(self, definition: str, parts: List[str]):
         """Format ThieuChuu dictionary definition with special styling."""
         lines = definition.split('\n')
         for i, line in enumerate(lines):
             if i == 0:  # First line with word and pinyin
                 if '[' in line:
-                    parts = line.split('[')
-                    if len(parts) == 2:
-                        word = parts[0].strip()
-                        cursor.insertText(f"{word.upper()} ", self.hanviet_format)  # Word in uppercase and bold
-                        cursor.insertText(f"[{parts[1]} \n", self.pinyin_format)  # Pinyin in italics
+                    word_parts = line.split('[')
+                    if len(word_parts) == 2:
+                        word = word_parts[0].strip()
+                        parts.append(styled(f"{word.upper()} ", HANVIET_STYLE))  # Word in uppercase and bold
+                        parts.append(styled(f"[{word_parts[1]} \n", PINYIN_STYLE))  # Pinyin in italics
                 else:
-                    cursor.insertText(f"{line}\n", self.definition_format)
+                    parts.append(styled(f"{line}\n", DEFINITION_STYLE))
             else:
                 # Handle 'n' for newline and t{number} for indentation
                 if line.strip() == 'n':
-                    cursor.insertText('\n', self.definition_format)
+                    parts.append(styled('\n', DEFINITION_STYLE))
                 elif line.startswith('t') and len(line) > 1 and line[1].isdigit():
                     # Keep number after indentation
                     number = line[1]
@@ -157,110 +170,154 @@ class DictionaryPanel(QWidget):
                     # Check if text already starts with dot
                     if text.lstrip().startswith('.'):
                         text = text.lstrip()[1:].lstrip()  # Remove leading dot and whitespace
-                    cursor.insertText(f"    {number}. {text}\n", self.definition_format)
+                    parts.append(styled(f"    {number}. {text}\n", DEFINITION_STYLE))
                 else:
-                    cursor.insertText(f"{line}\n", self.definition_format)
+                    parts.append(styled(f"{line}\n", DEFINITION_STYLE))
 
-    def format_babylon_definition(self, definition: str, cursor: QTextCursor):
+    def format_babylon_definition(self, definition: str, parts: List[str]):
         """Format Babylon/Cedict dictionary definition with special styling."""
-        cursor.insertText(definition.strip() + '\n', self.definition_format)
+        parts.append(styled(definition.strip() + '\n', DEFINITION_STYLE))
 
-    def format_cedict_definition(self, definition: str, cursor: QTextCursor):
+    def format_cedict_definition(self, entry: CedictEntry, parts: List[str]):
         """Format Cedict dictionary definition with special styling."""
-        try:
-            # Convert string representation of dict back to dict
-            entry = eval(definition)  # Safe since we control the input format
-            
-            # Display traditional and simplified if different
-            if entry['traditional'] != entry['simplified']:
-                cursor.insertText(f"{entry['traditional']}/{entry['simplified']} ", self.chinese_format)
-            else:
-                cursor.insertText(f"{entry['traditional']} ", self.chinese_format)
-            
-            # Display pinyin
-            cursor.insertText(f"[{entry['pinyin']}] ", self.pinyin_format)
-            
-            # Display definition
-            cursor.insertText(f"{entry['definition']}\n", self.definition_format)
-        except Exception as e:
-            print(f"Error formatting Cedict definition: {e}")
-            cursor.insertText(f"{definition}\n", self.definition_format)
+        if not isinstance(entry, CedictEntry):
+            parts.append(styled(f"{entry}\n", DEFINITION_STYLE))
+            return
+
+        # Display traditional and simplified if different
+        if entry.traditional != entry.simplified:
+            parts.append(styled(f"{entry.traditional}/{entry.simplified} ", CHINESE_STYLE))
+        else:
+            parts.append(styled(f"{entry.traditional} ", CHINESE_STYLE))
+        
+        # Display pinyin
+        parts.append(styled(f"[{entry.pinyin}] ", PINYIN_STYLE))
+        
+        # Display definition
+        parts.append(styled(f"{entry.definition}\n", DEFINITION_STYLE))
 
     @pyqtSlot(str)
     def lookup_word(self, word: str):
         """
-        Look up a word and display its definitions.
+        Look up a word and display its definitions once no other lookup
+        follows within LOOKUP_DEBOUNCE_MS.
         
         Args:
             word (str): The word to look up
         """
-        # Display Hán Việt conversion first
-        self.hanviet_display.clear()
-        hanviet_cursor = self.hanviet_display.textCursor()
-        
+        self._pending_word = word
+        self._lookup_timer.start()
+
+    def _show_pending_word(self):
+        if self._pending_word is not None:
+            word, self._pending_word = self._pending_word, None
+            self.show_word(word)
+
+    def show_word(self, word: str):
+        """
+        Display the Hán Việt and definitions of a word.
+
+        Rendered lookups are cached per dictionary generation, so a word
+        looked up again is shown without querying the dictionaries.
+
+        Args:
+            word (str): The word to look up
+        """
+        key = (word, self.dictionary_manager.generation)
+        if key == self._shown_key:
+            return
+
+        rendered = self._lookup_cache.get(key)
+        if rendered is None:
+            rendered = self.render_lookup(word)
+            self._lookup_cache[key] = rendered
+            if len(self._lookup_cache) > LOOKUP_CACHE_SIZE:
+                self._lookup_cache.popitem(last=False)
+        else:
+            self._lookup_cache.move_to_end(key)
+
+        hanviet_html, definitions_html = rendered
+        self.hanviet_display.setHtml(hanviet_html)
+        self.definition_display.setHtml(definitions_html)
+        self._shown_key = key
+
+    def render_lookup(self, word: str) -> Tuple[str, str]:
+        """
+        Render the Hán Việt and definitions of a word.
+
+        Args:
+            word (str): The word to look up
+
+        Returns:
+            Tuple[str, str]: HTML of the Hán Việt display and of the definition display
+        """
         # Convert to Hán Việt using character-by-character mapping
         hanviet_text = self.dictionary_manager.convert_to_hanviet(word)
         
         # Display original text and Hán Việt
-        hanviet_cursor.insertText(word + "\n", self.chinese_format)
-        hanviet_cursor.insertText(hanviet_text, self.hanviet_format)
+        hanviet_html = as_document([styled(word + "\n", CHINESE_STYLE), styled(hanviet_text, HANVIET_STYLE)])
 
-        # Clear and display dictionary definitions
-        self.definition_display.clear()
-        cursor = self.definition_display.textCursor()
+        parts: List[str] = []
         
-        # Get all prefixes of the word
-        prefixes = [word[0:i] for i in range(1, len(word) + 1)]
-        
-        # Process each prefix from longest to shortest
-        for prefix in reversed(prefixes):
-            definitions = self.dictionary_manager.lookup_word(prefix)
+        # Process each prefix with definitions from longest to shortest
+        for prefix, definitions in self.dictionary_manager.lookup_prefixes(word):
             if definitions:
                 # First show Names
                 if 'Names' in definitions:
-                    cursor.insertText(f"{prefix} (Names) ", self.dict_name_format)
-                    cursor.insertText(definitions['Names'] + '\n', self.definition_format)
-                    self.add_separator(cursor)
+                    parts.append(styled(f"{prefix} (Names) ", DICT_NAME_STYLE))
+                    parts.append(styled(definitions['Names'] + '\n', DEFINITION_STYLE))
+                    self.add_separator(parts)
                 
                 # Then show Names2
                 if 'Names2' in definitions:
-                    cursor.insertText(f"{prefix} (Names2) ", self.dict_name_format)
-                    cursor.insertText(definitions['Names2'] + '\n', self.definition_format)
-                    self.add_separator(cursor)
+                    parts.append(styled(f"{prefix} (Names2) ", DICT_NAME_STYLE))
+                    parts.append(styled(definitions['Names2'] + '\n', DEFINITION_STYLE))
+                    self.add_separator(parts)
                 
                 # Then show VietPhrase
                 if 'VietPhrase' in definitions:
-                    cursor.insertText(f"{prefix} (VietPhrase) ", self.dict_name_format)
-                    cursor.insertText(definitions['VietPhrase'] + '\n', self.definition_format)
-                    self.add_separator(cursor)
+                    parts.append(styled(f"{prefix} (VietPhrase) ", DICT_NAME_STYLE))
+                    parts.append(styled(definitions['VietPhrase'] + '\n', DEFINITION_STYLE))
+                    self.add_separator(parts)
                 
                 # Then show LacViet if it has an exact match
                 if 'LacViet' in definitions:
-                    cursor.insertText(f"{prefix} (Lạc Việt)\n", self.dict_name_format)
-                    self.format_lacviet_definition(definitions['LacViet'], cursor)
-                    self.add_separator(cursor)
+                    parts.append(styled(f"{prefix} (Lạc Việt)\n", DICT_NAME_STYLE))
+                    self.format_lacviet_definition(definitions['LacViet'], parts)
+                    self.add_separator(parts)
 
                 # Then show ThieuChuu if it has an exact match
                 if 'ThieuChuu' in definitions:
-                    cursor.insertText(f"{prefix} (Thiều Chửu) ", self.dict_name_format)
-                    self.format_thieuchuu_definition(definitions['ThieuChuu'], cursor)
-                    self.add_separator(cursor)
+                    parts.append(styled(f"{prefix} (Thiều Chửu) ", DICT_NAME_STYLE))
+                    self.format_thieuchuu_definition(definitions['ThieuChuu'], parts)
+                    self.add_separator(parts)
 
                 # Then show Cedict
                 if 'Cedict' in definitions:
-                    cursor.insertText(f"{prefix} (CC-CEDICT) ", self.dict_name_format)
-                    self.format_cedict_definition(definitions['Cedict'], cursor)
-                    self.add_separator(cursor)
+                    parts.append(styled(f"{prefix} (CC-CEDICT) ", DICT_NAME_STYLE))
+                    self.format_cedict_definition(definitions['Cedict'], parts)
+                    self.add_separator(parts)
                 
                 # Then show Babylon
                 if 'Babylon' in definitions:
-                    cursor.insertText(f"{prefix} (Babylon) ", self.dict_name_format)
-                    self.format_babylon_definition(definitions['Babylon'], cursor)
-                    self.add_separator(cursor)
+                    parts.append(styled(f"{prefix} (Babylon) ", DICT_NAME_STYLE))
+                    self.format_babylon_definition(definitions['Babylon'], parts)
+                    self.add_separator(parts)
+
+                # Then show dictionaries added in other formats
+                for name, definition in definitions.items():
+                    if name not in self.dictionary_manager.DICTIONARY_ORDER:
+                        parts.append(styled(f"{prefix} ({name}) ", DICT_NAME_STYLE))
+                        self.format_babylon_definition(str(definition), parts)
+                        self.add_separator(parts)
 
+        return hanviet_html, as_document(parts)
 
     def clear_content(self):
         """Clear the panel content."""
+        self._lookup_timer.stop()
+        self._pending_word = None
+        self._shown_key = None
         self.definition_display.clear()
 
     def highlight_search_results(self, text: str):
@@ -8,54 +8,45 @@ from PyQt5.QtGui import (
     QTextCursor, QTextCharFormat, QColor, QTextBlockFormat, 
     QTextDocument, QTextBlockUserData, QTextBlock
 )
-from typing import Optional, Dict, Tuple, List
+from typing import Optional, Tuple, List
+from bisect import bisect_right
 from src.core.chapter_manager import ChapterManager
 from src.core.translation_manager import TranslationManager
 from src.QTEngine.src.text_processing import TranslationMapping, Block
-import re
-
-def format_translated_text(text: str) -> str:
-    """Format translated text with proper spacing and capitalization."""
-    # Add proper spacing between words first
-    words = text.split()
-    formatted = []
-    for i, word in enumerate(words):
-        # Keep a space before the word unless it starts with certain punctuation
-        if i > 0 and not word[0] in ',.!?;:"\'])}':
-            formatted.append(' ')
-        formatted.append(word)
-    
-    text = ''.join(formatted)
-    
-    # Apply regex transformations in specific order
-    # 1. Handle quotes and brackets
-    text = re.sub(r'([\[\“\‘])\s*(\w)', lambda m: m.group(1) + m.group(2).upper(), text)
-    text = re.sub(r'\s+([”\’\]])', r'\1', text)
-    
-    # 2. Handle special punctuation that needs space after
-    text = re.sub(r'([?!⟨:«])\s+(\w)', lambda m: m.group(1) + ' ' + m.group(2).upper(), text)
-    
-    # 3. Handle periods separately to maintain mapping
-    text = re.sub(r'\s*\.\s*(?=\w)', '. ', text)  # Ensure exactly one space after period
-    text = re.sub(r'(?<=\.)\s+(\w)', lambda m: ' ' + m.group(1).upper(), text)
-    
-    # 4. Handle other punctuation
-    text = re.sub(r'\s+([;:?!])', r'\1', text)
-    
-    return text
 
 def format_original_text(text: str) -> str:
     """Format original Chinese text (no spaces needed)."""
     return ''.join(text.split())  # Remove any existing spaces
 
 class TextSegment:
-    """Represents a segment of text with its mapping."""
-    def __init__(self, text: str, start_pos: int, is_original: bool, mapping_block: Optional[Block] = None):
+    """
+    Represents a segment of text with its mapping.
+    
+    Segments refer to their block by index in the paragraph mapping, so the
+    mapping keeps its blocks in columns and a Block is only created when a
+    segment is used.
+    """
+    __slots__ = ['text', 'start_pos', 'end_pos', 'is_original', 'mapping', 'block_index']
+
+    def __init__(self, text: str, start_pos: int, is_original: bool,
+                 mapping: Optional[TranslationMapping] = None, block_index: int = -1):
         self.text = text
         self.start_pos = start_pos
         self.end_pos = start_pos + len(text)
         self.is_original = is_original
-        self.mapping_block = mapping_block
+        self.mapping = mapping
+        self.block_index = block_index
+
+    @property
+    def mapping_block(self) -> Optional[Block]:
+        """Block of the mapping this segment shows, if any."""
+        if self.mapping is None:
+            return None
+        return self.mapping.block(self.block_index)
+
+    def same_block(self, other: 'TextSegment') -> bool:
+        """Check whether two segments show the same block."""
+        return self.mapping is not None and self.mapping is other.mapping and self.block_index == other.block_index
 
 class TranslationTextEdit(QPlainTextEdit):
     """Custom QPlainTextEdit that handles mouse events for dictionary lookup."""
@@ -68,6 +59,9 @@ class TranslationTextEdit(QPlainTextEdit):
         self.setReadOnly(True)
         self.segments: List[TextSegment] = []
         self.dictionary_manager = dictionary_manager
+        # Per displayed paragraph: start in the document, offset in the chapter text and mapping
+        self._paragraph_starts: List[int] = []
+        self._paragraphs: List[Tuple[int, TranslationMapping]] = []
         
         # Set up text formats
         self.highlight_format = QTextCharFormat()
@@ -131,7 +125,7 @@ class TranslationTextEdit(QPlainTextEdit):
         # Find corresponding Chinese text
         chinese_text = ''
         for _, segment in selected_segments:
-            if segment.mapping_block:
+            if segment.mapping is not None:
                 chinese_text += segment.mapping_block.original
         
         if chinese_text:
@@ -168,9 +162,10 @@ class TranslationTextEdit(QPlainTextEdit):
         pos = cursor.position()
         segment = self.find_segment_at_position(pos)
         
-        if segment and segment.mapping_block:
+        if segment and segment.mapping is not None:
             chinese_text = segment.mapping_block.original
             hanviet = self.dictionary_manager.convert_to_hanviet(chinese_text)
+            span = self.get_chapter_span(segment)
             
             # Add dictionary actions for highlighted block
             for dict_name in ["Names", "Names2", "VietPhrase"]:
@@ -179,15 +174,16 @@ class TranslationTextEdit(QPlainTextEdit):
                 action = QAction(action_text, self)
                 action.triggered.connect(
                     lambda checked, d=dict_name, c=chinese_text, h=hanviet, e=existing_def:
-                    self.show_dictionary_dialog(d, c, h, e)
+                    self.show_dictionary_dialog(d, c, h, e, span)
                 )
                 menu.addAction(action)
             
             menu.exec_(event.globalPos())
         
     def show_dictionary_dialog(self, dictionary_name: str, chinese_text: str, 
-                             hanviet: str, existing_def: Optional[str]):
-        """Show dialog for adding/editing dictionary entry."""
+                             hanviet: str, existing_def: Optional[str],
+                             span: Optional[Tuple[int, int]] = None):
+        """Show dialog for adding/editing dictionary entry, selecting span of the chapter text if given."""
         # Get current chapter text for context
         current_text = ""
         if self.chapter_manager.chapters:
@@ -200,7 +196,8 @@ class TranslationTextEdit(QPlainTextEdit):
             definition=existing_def or hanviet,  # Use hanviet as default definition
             dictionary_type=dictionary_name,
             is_edit=existing_def is not None,
-            context_text=current_text
+            context_text=current_text,
+            selection=span
         )
         
         # Connect the dialog's dictionary_updated signal to our signal
@@ -281,7 +278,7 @@ class TranslationTextEdit(QPlainTextEdit):
                             
                             # Try to find a matching block for the exact Vietnamese text
                             for segment in self.segments:
-                                if not segment.is_original and segment.mapping_block:
+                                if not segment.is_original and segment.mapping is not None:
                                     if viet_text == segment.text.strip():
                                         self.selection_lookup.emit(segment.mapping_block.original)
                                         break
@@ -310,7 +307,7 @@ class TranslationTextEdit(QPlainTextEdit):
             
             # Find segment at click position
             clicked_segment = self.find_segment_at_position(pos)
-            if clicked_segment and clicked_segment.mapping_block:
+            if clicked_segment and clicked_segment.mapping is not None:
                 # Select the entire segment text
                 cursor = self.textCursor()
                 cursor.setPosition(clicked_segment.start_pos)
@@ -368,7 +365,7 @@ class TranslationTextEdit(QPlainTextEdit):
                                 selected_segments.append(selected_text)
                             else:
                                 # For translated text, use the original Chinese text
-                                if segment.mapping_block:
+                                if segment.mapping is not None:
                                     selected_segments.append(segment.mapping_block.original)
             
             # Emit the combined selected text for dictionary lookup
@@ -394,7 +391,7 @@ class TranslationTextEdit(QPlainTextEdit):
             return direct_segment
             
         # For translated text, try to find compound words
-        if not direct_segment.is_original and direct_segment.mapping_block:
+        if not direct_segment.is_original and direct_segment.mapping is not None:
             # Get the full text and position within it
             text = direct_segment.text
             rel_pos = pos - direct_segment.start_pos
@@ -422,7 +419,8 @@ class TranslationTextEdit(QPlainTextEdit):
                     text[start:end],
                     direct_segment.start_pos + start,
                     False,
-                    direct_segment.mapping_block
+                    direct_segment.mapping,
+                    direct_segment.block_index
                 )
                 return new_segment
                 
@@ -431,8 +429,40 @@ class TranslationTextEdit(QPlainTextEdit):
     def clear_segments(self):
         """Clear all segments."""
         self.segments.clear()
+        self._paragraph_starts.clear()
+        self._paragraphs.clear()
         self.clear()
 
+    def add_paragraph(self, start_pos: int, chapter_offset: int, mapping: TranslationMapping):
+        """
+        Register a paragraph whose segments start at start_pos.
+        
+        Args:
+            start_pos (int): Document position of the first segment of the paragraph
+            chapter_offset (int): Offset of the paragraph in the chapter text
+            mapping (TranslationMapping): Mapping of the paragraph translation
+        """
+        self._paragraph_starts.append(start_pos)
+        self._paragraphs.append((chapter_offset, mapping))
+
+    def get_chapter_span(self, segment: TextSegment) -> Optional[Tuple[int, int]]:
+        """
+        Locate the block of a segment in the chapter text.
+        
+        Positions in the mapping refer to the converted text, the mapping's
+        source offsets bring them back to the chapter as read from the file.
+        
+        Returns:
+            Optional[Tuple[int, int]]: Start and end in the chapter text, or None
+        """
+        index = bisect_right(self._paragraph_starts, segment.start_pos) - 1
+        block = segment.mapping_block
+        if index < 0 or not block:
+            return None
+        chapter_offset, mapping = self._paragraphs[index]
+        start, end = mapping.get_source_span(block)
+        return chapter_offset + start, chapter_offset + end
+
     def add_segment(self, segment: TextSegment):
         """Add a new text segment."""
         self.segments.append(segment)
@@ -449,6 +479,8 @@ class TranslationTextEdit(QPlainTextEdit):
         cursor.insertText(segment.text)
 
 class MainTranslationPanel(QWidget):
+    chapter_titles_changed = pyqtSignal()  # Emits when chapter titles were translated again
+
     def __init__(self, parent: Optional[QWidget], chapter_manager: ChapterManager,
                  translation_manager: TranslationManager, dictionary_panel):
         super().__init__(parent)
@@ -483,6 +515,7 @@ class MainTranslationPanel(QWidget):
         self.text_edit.clear_segments()
         self.current_chapter_index = chapter_index  # Update current chapter index
         self.text_edit.current_chapter_index = chapter_index  # Update text edit's index too
+        self.chapter_manager.set_current_chapter(chapter_index)
         
         # Get original text and translate
         original_text = self.chapter_manager.get_chapter_text(chapter_index)
@@ -491,184 +524,93 @@ class MainTranslationPanel(QWidget):
             
         # Process each paragraph
         current_pos = 0
+        chapter_offset = 0
         paragraphs = original_text.splitlines()
-        for i, paragraph in enumerate(paragraphs):
+        for i, (paragraph, line) in enumerate(zip(paragraphs, original_text.splitlines(keepends=True))):
+            paragraph_offset = chapter_offset
+            chapter_offset += len(line)
             if not paragraph.strip():
                 continue
                 
             # Get translation and mapping
             translated_text = self.translation_manager.translate_text(paragraph)
             mapping = self.translation_manager.current_mapping
+            self.text_edit.add_paragraph(current_pos, paragraph_offset, mapping)
             
             if self.show_original:
                 # For original text, just add blocks directly without spacing
-                for block in mapping.blocks:
+                for block_index, original in enumerate(mapping.originals()):
                     self.text_edit.add_segment(TextSegment(
-                        block.original,
+                        original,
                         current_pos,
                         True,
-                        block
+                        mapping,
+                        block_index
                     ))
-                    current_pos += len(block.original)
+                    current_pos += len(original)
                 
                 # Add newline between original and translation
                 self.text_edit.add_segment(TextSegment("\n", current_pos, True))
                 current_pos += 1
-                
-                # Format and combine all translated text
-                trans_text = ' '.join(block.translated for block in mapping.blocks)
-                trans_text = format_translated_text(trans_text)
-                
-                # Capitalize first letter of paragraph if it's not already capitalized
-                if trans_text and not trans_text[0].isupper() and trans_text[0].isalpha():
-                    trans_text = trans_text[0].upper() + trans_text[1:]
-                
-                # Split back into blocks while preserving spacing
-                trans_parts = []
-                current_idx = 0
-                for block in mapping.blocks:
-                    # Find the formatted version of this block in the formatted text
-                    block_text = block.translated.strip()
-                    # Handle empty translations specially
-                    if not block_text:
-                        # For empty translations, just keep the mapping
-                        trans_parts.append(TextSegment(
-                            "",
-                            current_pos + current_idx,
-                            False,
-                            block
-                        ))
-                        continue
-                    
-                    # Look for the block text, considering potential punctuation
-                    search_idx = current_idx
-                    while True:
-                        idx = trans_text.lower().find(block_text.lower(), search_idx)
-                        if idx < 0:
-                            break
-                            
-                        # Check if this is the correct occurrence (not part of another word)
-                        is_word_boundary = True
-                        if idx > 0 and trans_text[idx-1].isalnum():
-                            is_word_boundary = False
-                        if idx + len(block_text) < len(trans_text) and trans_text[idx + len(block_text)].isalnum():
-                            is_word_boundary = False
-                            
-                        if is_word_boundary:
-                            # Add any spacing before this block
-                            if idx > current_idx:
-                                trans_parts.append(TextSegment(
-                                    trans_text[current_idx:idx],
-                                    current_pos + current_idx,
-                                    False
-                                ))
-                            # Add the block with proper capitalization from the formatted text
-                            actual_text = trans_text[idx:idx + len(block_text)]
-                            trans_parts.append(TextSegment(
-                                actual_text,
-                                current_pos + idx,
-                                False,
-                                block
-                            ))
-                            current_idx = idx + len(block_text)
-                            break
-                            
-                        search_idx = idx + 1
-                
-                # Add any remaining spacing
-                if current_idx < len(trans_text):
-                    trans_parts.append(TextSegment(
-                        trans_text[current_idx:],
-                        current_pos + current_idx,
-                        False
-                    ))
-                
-                # Add all translated segments
-                for segment in trans_parts:
-                    self.text_edit.add_segment(segment)
-                    current_pos += len(segment.text)
-            else:
-                # Format and combine all translated text
-                trans_text = ' '.join(block.translated for block in mapping.blocks)
-                trans_text = format_translated_text(trans_text)
-                
-                # Capitalize first letter of paragraph if it's not already capitalized
-                if trans_text and not trans_text[0].isupper() and trans_text[0].isalpha():
-                    trans_text = trans_text[0].upper() + trans_text[1:]
-                
-                # Split back into blocks while preserving spacing
-                trans_parts = []
-                current_idx = 0
-                for block in mapping.blocks:
-                    # Find the formatted version of this block in the formatted text
-                    block_text = block.translated.strip()
-                    # Handle empty translations specially
-                    if not block_text:
-                        # For empty translations, just keep the mapping
-                        trans_parts.append(TextSegment(
-                            "",
-                            current_pos + current_idx,
-                            False,
-                            block
-                        ))
-                        continue
-                    
-                    # Look for the block text, considering potential punctuation
-                    search_idx = current_idx
-                    while True:
-                        idx = trans_text.lower().find(block_text.lower(), search_idx)
-                        if idx < 0:
-                            break
-                            
-                        # Check if this is the correct occurrence (not part of another word)
-                        is_word_boundary = True
-                        if idx > 0 and trans_text[idx-1].isalnum():
-                            is_word_boundary = False
-                        if idx + len(block_text) < len(trans_text) and trans_text[idx + len(block_text)].isalnum():
-                            is_word_boundary = False
-                            
-                        if is_word_boundary:
-                            # Add any spacing before this block
-                            if idx > current_idx:
-                                trans_parts.append(TextSegment(
-                                    trans_text[current_idx:idx],
-                                    current_pos + current_idx,
-                                    False
-                                ))
-                            # Add the block with proper capitalization from the formatted text
-                            actual_text = trans_text[idx:idx + len(block_text)]
-                            trans_parts.append(TextSegment(
-                                actual_text,
-                                current_pos + idx,
-                                False,
-                                block
-                            ))
-                            current_idx = idx + len(block_text)
-                            break
-                            
-                        search_idx = idx + 1
-                
-                # Add any remaining spacing
-                if current_idx < len(trans_text):
-                    trans_parts.append(TextSegment(
-                        trans_text[current_idx:],
-                        current_pos + current_idx,
-                        False
-                    ))
-                
-                # Add all translated segments
-                for segment in trans_parts:
-                    self.text_edit.add_segment(segment)
-                    current_pos += len(segment.text)
+            
+            # Add all translated segments
+            for segment in self._build_translated_segments(translated_text, mapping, current_pos):
+                self.text_edit.add_segment(segment)
+                current_pos += len(segment.text)
             
             # Add paragraph break if not last paragraph
             if i < len(paragraphs) - 1:
                 self.text_edit.add_segment(TextSegment("\n\n", current_pos, False))
                 current_pos += 2
 
+    def _build_translated_segments(self, translated_text: str, mapping: TranslationMapping,
+                                   start_pos: int) -> List[TextSegment]:
+        """
+        Build the translated segments of a paragraph.
+        
+        The translation is formatted once by the engine, which records where
+        each block lands in it, so segments are cut directly at the spans
+        stored in the mapping, without creating its Block objects.
+        """
+        # Leading indentation is not shown
+        first = len(translated_text) - len(translated_text.lstrip())
+        trans_text = translated_text[first:]
+        
+        segments = []
+        current_idx = 0
+        for block_index, (start, end) in enumerate(mapping.translated_spans()):
+            start -= first
+            end -= first
+            # Add any spacing before this block
+            if start > current_idx:
+                segments.append(TextSegment(
+                    trans_text[current_idx:start],
+                    start_pos + current_idx,
+                    False
+                ))
+            # Empty translations still keep their mapping as an empty segment
+            segments.append(TextSegment(
+                trans_text[start:end],
+                start_pos + start,
+                False,
+                mapping,
+                block_index
+            ))
+            current_idx = end
+        
+        # Add any remaining text
+        if current_idx < len(trans_text):
+            segments.append(TextSegment(
+                trans_text[current_idx:],
+                start_pos + current_idx,
+                False
+            ))
+        return segments
+
     def handle_segment_click(self, segment: TextSegment):
         """Handle when a text segment is clicked."""
-        if not segment.mapping_block:
+        block = segment.mapping_block
+        if not block:
             return
         
         # Clear any existing highlights
@@ -678,14 +620,14 @@ class MainTranslationPanel(QWidget):
         
         # Highlight the clicked segment and its corresponding translation/original
         for other_segment in self.text_edit.segments:
-            if other_segment.mapping_block == segment.mapping_block:
+            if other_segment.same_block(segment):
                 cursor = self.text_edit.textCursor()
                 cursor.setPosition(other_segment.start_pos)
                 cursor.setPosition(other_segment.end_pos, QTextCursor.KeepAnchor)
                 cursor.setCharFormat(self.text_edit.highlight_format)
         
         # Look up the word - always use the original text from the mapping block
-        self.dictionary_panel.lookup_word(segment.mapping_block.original)
+        self.dictionary_panel.lookup_word(block.original)
 
     def handle_selection_lookup(self, text: str):
         """Handle dictionary lookup for selected text."""
@@ -699,12 +641,17 @@ class MainTranslationPanel(QWidget):
         if self.chapter_manager.chapters:
             self.set_chapter_text(self.current_chapter_index)  # Use current chapter index
 
-    def set_text(self, text: str):
-        """Set the entire text content."""
-        self.chapter_manager.set_text(text)
+    def set_text(self, text: str, file_path: Optional[str] = None, encoding: Optional[str] = None):
+        """Set the entire text content, resuming at the last chapter read if the file is known."""
+        self.chapter_manager.set_text(text, file_path, encoding)
         if self.chapter_manager.chapters:
-            self.set_chapter_text(0)
-            self.current_chapter_index = 0  # Reset chapter index when loading new text
+            self.set_chapter_text(self.chapter_manager.get_current_chapter_index())
+            
+    def open_file(self, file_path: str, encoding: str):
+        """Open a file chapter by chapter, resuming at the last chapter read."""
+        self.chapter_manager.open_file(file_path, encoding)
+        if self.chapter_manager.chapters:
+            self.set_chapter_text(self.chapter_manager.get_current_chapter_index())
             
     def handle_dictionary_update(self, specific_file: Optional[str] = None):
         """
@@ -736,242 +683,10 @@ class MainTranslationPanel(QWidget):
             specific_file=specific_file
         )
         
-        # Re-translate the current chapter with fresh data
+        # Re-translate the current chapter and the chapter titles with fresh data
         self.set_chapter_text(self.current_chapter_index)
+        if self.chapter_manager.refresh_translated_titles():
+            self.chapter_titles_changed.emit()
         
         # Restore scroll position
         self.text_edit.verticalScrollBar().setValue(scroll_value)
-
-    def _add_paragraph_segments(self, original_text, translated_text, mapping, start_pos):
-        """Add segments for a paragraph to the text edit with proper formatting."""
-        current_pos = start_pos
-        
-        # Handle original text if showing
-        if self.show_original:
-            for block in mapping.blocks:
-                self.text_edit.add_segment(TextSegment(
-                    block.original,
-                    current_pos,
-                    True,
-                    block
-                ))
-                current_pos += len(block.original)
-            self.text_edit.add_segment(TextSegment("\n", current_pos, True))
-            current_pos += 1
-
-        # Format and combine all translated text
-        trans_text = ' '.join(block.translated for block in mapping.blocks)
-        trans_text = format_translated_text(trans_text)
-        
-        # Capitalize first letter if needed
-        if trans_text and not trans_text[0].isupper() and trans_text[0].isalpha():
-            trans_text = trans_text[0].upper() + trans_text[1:]
-            
-        # Split back into blocks while preserving spacing
-        trans_parts = []
-        current_idx = 0
-        for block in mapping.blocks:
-            block_text = block.translated.strip()
-            if not block_text:
-                trans_parts.append(TextSegment(
-                    "",
-                    current_pos + current_idx,
-                    False,
-                    block
-                ))
-                continue
-            
-            # Find position in formatted text
-            idx = trans_text.lower().find(block_text.lower(), current_idx)
-            if idx >= 0:
-                # Add spacing before block
-                if idx > current_idx:
-                    trans_parts.append(TextSegment(
-                        trans_text[current_idx:idx],
-                        current_pos + current_idx,
-                        False
-                    ))
-                # Add block with proper formatting
-                actual_text = trans_text[idx:idx + len(block_text)]
-                trans_parts.append(TextSegment(
-                    actual_text,
-                    current_pos + idx,
-                    False,
-                    block
-                ))
-                current_idx = idx + len(block_text)
-        
-        # Add remaining spacing
-        if current_idx < len(trans_text):
-            trans_parts.append(TextSegment(
-                trans_text[current_idx:],
-                current_pos + current_idx,
-                False
-            ))
-        
-        # Add all translated segments
-        for segment in trans_parts:
-            self.text_edit.add_segment(segment)
-            current_pos += len(segment.text)
-
-        # Add paragraph break
-        self.text_edit.add_segment(TextSegment("\n\n", current_pos, False))
-    
-    def _split_text_into_chunks(self, text, chunk_size=1000):
-        """Split the text into smaller chunks for processing."""
-        return [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-    
-    def _process_chunks(self, chunks, index, scroll_value):
-        """Process text chunks incrementally to prevent UI freezing."""
-        from PyQt5.QtCore import QTimer
-        
-        if index < len(chunks):
-            chunk = chunks[index]
-            # Translate the chunk
-            translated_text = self.translation_manager.translate_text(chunk, force_refresh=True)
-            mapping = self.translation_manager.current_mapping
-            
-            # Update the text edit with the translated chunk
-            self._update_text_edit_with_chunk(translated_text, mapping, index == 0)
-            
-            # Schedule the next chunk processing
-            QTimer.singleShot(0, lambda: self._process_chunks(chunks, index + 1, scroll_value))
-        else:
-            # All chunks processed, restore scroll position
-            self.text_edit.verticalScrollBar().setValue(scroll_value)
-    
-    def _update_text_edit_with_chunk(self, translated_text, mapping, is_first_chunk):
-        """Update the text edit with a translated chunk."""
-        if is_first_chunk:
-            self.text_edit.clear_segments()
-        
-        current_pos = sum(len(segment.text) for segment in self.text_edit.segments)
-        
-        if mapping:
-            for block in mapping.blocks:
-                if self.show_original:
-                    self.text_edit.add_segment(TextSegment(
-                        block.original,
-                        current_pos,
-                        True,
-                        block
-                    ))
-                    current_pos += len(block.original)
-                    
-                    self.text_edit.add_segment(TextSegment("\n", current_pos, True))
-                    current_pos += 1
-                
-                self.text_edit.add_segment(TextSegment(
-                    block.translated,
-                    current_pos,
-                    False,
-                    block
-                ))
-                current_pos += len(block.translated)
-        else:
-            # If no mapping is available, add the translated text as a single segment
-            self.text_edit.add_segment(TextSegment(
-                translated_text,
-                current_pos,
-                False,
-                None
-            ))
-            current_pos += len(translated_text)
-        
-        if not is_first_chunk:
-            self.text_edit.add_segment(TextSegment("\n\n", current_pos, False))
-            current_pos += 2
-            
-    def _rebuild_chapter_text(self, text: str, mapping: TranslationMapping, 
-                            old_segments: Optional[Dict[str, TextSegment]] = None):
-        """Rebuild chapter text with optimized segment handling."""
-        current_pos = 0
-        paragraphs = text.splitlines()
-        
-        for i, paragraph in enumerate(paragraphs):
-            if not paragraph.strip():
-                continue
-                
-            if self.show_original:
-                # Add original text
-                for block in mapping.blocks:
-                    # Try to reuse segment formats from old mappings
-                    if old_segments and block.original in old_segments:
-                        old_seg = old_segments[block.original]
-                        self.text_edit.add_segment(TextSegment(
-                            block.original,
-                            current_pos,
-                            True,
-                            block
-                        ))
-                    else:
-                        self.text_edit.add_segment(TextSegment(
-                            block.original,
-                            current_pos,
-                            True,
-                            block
-                        ))
-                    current_pos += len(block.original)
-                
-                self.text_edit.add_segment(TextSegment("\n", current_pos, True))
-                current_pos += 1
-            
-            # Handle translated text efficiently
-            trans_text = ' '.join(block.translated for block in mapping.blocks)
-            trans_text = format_translated_text(trans_text)
-            
-            # Capitalize first letter if needed
-            if trans_text and not trans_text[0].isupper() and trans_text[0].isalpha():
-                trans_text = trans_text[0].upper() + trans_text[1:]
-            
-            # Optimized segment creation
-            trans_parts = []
-            current_idx = 0
-            for block in mapping.blocks:
-                block_text = block.translated.strip()
-                if not block_text:
-                    trans_parts.append(TextSegment(
-                        "",
-                        current_pos + current_idx,
-                        False,
-                        block
-                    ))
-                    continue
-                
-                idx = trans_text.lower().find(block_text.lower(), current_idx)
-                if idx >= 0:
-                    # Add spacing before block
-                    if idx > current_idx:
-                        trans_parts.append(TextSegment(
-                            trans_text[current_idx:idx],
-                            current_pos + current_idx,
-                            False
-                        ))
-                    
-                    # Add block with proper capitalization
-                    actual_text = trans_text[idx:idx + len(block_text)]
-                    trans_parts.append(TextSegment(
-                        actual_text,
-                        current_pos + idx,
-                        False,
-                        block
-                    ))
-                    current_idx = idx + len(block_text)
-            
-            # Add remaining text
-            if current_idx < len(trans_text):
-                trans_parts.append(TextSegment(
-                    trans_text[current_idx:],
-                    current_pos + current_idx,
-                    False
-                ))
-            
-            # Add all segments at once
-            for segment in trans_parts:
-                self.text_edit.add_segment(segment)
-                current_pos += len(segment.text)
-            
-            # Add paragraph break
-            if i < len(paragraphs) - 1:
-                self.text_edit.add_segment(TextSegment("\n\n", current_pos, False))
-                current_pos += 2
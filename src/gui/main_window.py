@@ -1,4 +1,4 @@
-from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QScrollArea, QFileDialog
+from PyQt5.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QScrollArea, QFileDialog, QMessageBox
 from PyQt5.QtCore import Qt, pyqtSignal
 from src.gui.file_info_panel import FileInfoPanel
 from src.gui.chapter_panel import ChapterPanel
@@ -53,14 +53,28 @@ class MainWindow(QMainWindow):
         self.menu_bar.file_opened.connect(self.set_file_info)
         self.chapter_panel.chapter_selected.connect(self.set_chapter_text)
         self.chapter_panel.chapter_changed.connect(self.set_chapter_list)
+        self.main_translation_panel.chapter_titles_changed.connect(self.chapter_panel.set_chapter_list)
     
     def open_file_dialog(self):
         file_path = self.file_handler.open_file_dialog()
         if file_path:
             self.set_file_info(file_path)
-            text = self.file_handler.read_file(file_path)
-            if text is not None:
-                self.main_translation_panel.set_text(text)
+            encoding = self.chapter_manager.get_cached_encoding(file_path)
+            if encoding is None:
+                # Unknown file, detect its encoding from samples
+                encoding = self.file_handler.detect_encoding(file_path)
+                if encoding is None:
+                    QMessageBox.critical(self, "Error", "Could not decode file with any supported encoding.")
+                    return
+            try:
+                self.main_translation_panel.open_file(file_path, encoding)
+            except (UnicodeDecodeError, LookupError):
+                # Fall back to reading the whole file into memory
+                text = self.file_handler.read_file(file_path)
+                if text is None:
+                    return
+                self.main_translation_panel.set_text(text, file_path, self.file_handler.last_detected_encoding)
+            self.chapter_panel.set_chapter_list()
     
     def set_file_info(self, file_path):
         self.file_info_panel.set_file_info(file_path)